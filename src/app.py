@@ -1,29 +1,54 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import folium
 import random
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from streamlit_folium import st_folium
 import sys
 import os
+from functools import partial
 
 # Add src directory to path for both local and cloud deployment
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from data_loader import load_data, merge_for_map
+from data_loader import (
+    load_geodata, load_district_index, load_district_adjacency, load_district_crosswalk, merge_for_map
+)
+from sketches import ALL_INDIA
+from flows import cached_migration_flows
+from hotspots import cached_update_hotspots
+from insights import cached_briefing
+from seasonal import MONTH_NAMES, cached_regional_seasonality
 from metrics import (
     calculate_update_intensity, calculate_age_distribution, detect_anomalies,
     get_seasonal_patterns, get_demographic_vs_biometric_seasonal,
     detect_migration_spikes, get_district_update_velocity, detect_geographic_clusters,
-    analyze_age_transitions, get_age_group_update_patterns, calculate_mbu_demand_forecast,
-    trivariate_analysis, get_state_month_heatmap_data, get_enrollment_update_correlation
+    analyze_age_transitions, get_age_group_update_patterns, get_age_milestone_correlation,
+    calculate_mbu_demand_forecast, trivariate_analysis, get_state_month_heatmap_data,
+    get_enrollment_update_correlation, get_district_rolling_correlation
+)
+from prefetch import SECTION_JOBS, fetch, prefetch_sections
+from figure_cache import cached_figure, get_figure_cache
+from progressive import estimate_caption, filter_samples, load_samples, progressive_fetch
+from export import EXPORT_FORMATS, EXPORT_TABLES, export_raw, export_table, filter_table, buffered_export
+from capacity import (
+    DISTRICT_CAPACITY_PATH, SAMPLE_CAPACITY_PATH, THROUGHPUT_PERCENTILE, VAN_DAILY_SLOTS,
+    cached_capacity_base, cached_capacity_plan, plan_summary
 )
+from velocity import top_k_velocity
+from time_index import date_bounds, date_window_presets, slice_dates
+from prefix_sums import range_totals, cumulative_series, combined_series
+from charts import bucket_sum, downsample_line, line_trace, scatter_figure
+from watcher import WATCH_ENABLED, WATCH_INTERVAL, get_store
+from profiling import span, start_span, end_span, start_run, finish_run, get_records, summarize, timed
 
 # Page Config
 st.set_page_config(page_title="Aadhaar-Drishti", layout="wide", page_icon="🇮🇳")
 
+# Profiling: every span recorded during this rerun is tagged with profile_run
+profile_run = start_run()
+plotly_chart = timed(st.plotly_chart, name='render:plotly_chart', kind='render')
+
 # Custom CSS for Dashboard Styling
 # Custom CSS for Dashboard Styling
 st.markdown("""
@@ -170,61 +195,45 @@ with col_header_2:
     # Let's just place the button here for functionality.
     gen_ai_btn = st.button("✨ Generate AI Insight", type="primary", width='stretch')
 
-# Load Data
-with st.spinner("Loading aggregated Aadhaar datasets..."):
-    df_enr, df_upd, gdf = load_data()
+# Load Data: the current version of the live dataset store (see watcher.py)
+with st.spinner("Loading aggregated Aadhaar datasets..."), span("load:cached_datasets", kind='load'):
+    data_store = get_store()
+    data_snapshot = data_store.snapshot()
+    df_enr, df_upd = data_snapshot['frames']
+    prefix_cubes = data_snapshot['cubes']
+data_version = data_snapshot['version']
+update_cubes = [prefix_cubes['Demographic'], prefix_cubes['Biometric']]
 
 # Store original unfiltered data for societal trends analysis
 df_enr_full = df_enr.copy()
 df_upd_full = df_upd.copy()
-gdf_full = gdf.copy()  # Keep full GeoJSON for map visualization
 
 # AI Analyst Logic (Triggered by main button)
+# Ranked national briefing from the rule library in insights.py, computed once per dataset version
 if gen_ai_btn:
     st.info("🤖 **AI Analyst Output**")
-    st.write("Analyzing patterns...")
-    
-    # Logic-based "GenAI" for Hackathon (Deterministic but smart)
-    insight_text = []
-    
-    # 1. Volume Insight
-    total_enr = df_enr['Enrolment_Count'].sum()
-    if total_enr > 1000000:
-        insight_text.append(f"📈 **High Volume**: Total enrolments exceed 1 Million ({total_enr:,}), indicating robust activity.")
-        
-    # 2. Update Ratio
-    total_upd = df_upd['Count'].sum() if not df_upd.empty else 0
-    ratio = total_upd / total_enr if total_enr > 0 else 0
-    if ratio > 0.5:
-        insight_text.append(f"🔄 **Maintenance Phase**: Updates ({total_upd:,}) are {ratio:.0%} of enrolments, suggesting a mature ecosystem.")
+    with st.spinner("Analyzing patterns..."):
+        briefing = cached_briefing(data_version, *data_snapshot['frames'])
+
+    st.success(" ".join(briefing['headline']))
+    findings = briefing['findings']
+    if not findings.empty:
+        st.markdown("\n".join(
+            f"{row.Rank}. **{row.Title}** — {row.District + ', ' if row.District else ''}{row.State}: {row.Finding}"
+            for row in findings.itertuples()
+        ))
+        with st.expander("Scoring details"):
+            st.dataframe(findings[['Rank', 'Title', 'District', 'State', 'Value', 'Score']], hide_index=True, width='stretch')
     else:
-        insight_text.append(f"🆕 **Acquisition Phase**: Focus is still largely on new enrolments over updates.")
-        
-    st.success(" ".join(insight_text))
+        st.info("No district or state stands out in the current data.")
 
 
 # ---------------------------------------------------------
 # KPI Cards Section
 # ---------------------------------------------------------
+# All-India totals over the date window, filled in below once the date filter is known
 col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    st.markdown(f"""
-    <div class="kpi-card">
-        <div class="kpi-title enrol-bg">🆔 Enrolment</div>
-        <div class="kpi-value">{df_enr['Enrolment_Count'].sum():,}</div>
-        <div class="kpi-sub">Total Enrolments</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col2:
-    st.markdown(f"""
-    <div class="kpi-card">
-        <div class="kpi-title update-bg">📝 Update</div>
-        <div class="kpi-value">{df_upd['Count'].sum():,}</div>
-        <div class="kpi-sub">Total Updates</div>
-    </div>
-    """, unsafe_allow_html=True)
+kpi_enrolment_card, kpi_update_card = col1.empty(), col2.empty()
 
 with col3:
     st.markdown(f"""
@@ -265,31 +274,91 @@ with st.expander("🔍 Filter Dashboard Data", expanded=True):
             selected_district = "All"
             st.selectbox("2️⃣ Select District", ["Select State First"], disabled=True)
 
+    with col_f3:
+        # Date Range Filter (presets relative to the latest record)
+        enr_first, enr_last = date_bounds(df_enr_full)
+        upd_first, upd_last = date_bounds(df_upd_full)
+        data_first = min((d for d in (enr_first, upd_first) if d is not None), default=None)
+        data_last = max((d for d in (enr_last, upd_last) if d is not None), default=None)
+
+        date_presets = date_window_presets(data_first, data_last)
+        selected_window = st.selectbox("3️⃣ Select Date Range", list(date_presets) + ["Custom Range"], key="date_filter_main")
+
+        if selected_window == "Custom Range" and data_first is not None:
+            picked = st.date_input("Custom Date Range", value=(data_first.date(), data_last.date()),
+                                   min_value=data_first.date(), max_value=data_last.date(), key="date_custom_main")
+            # While a range is being picked only the start date is returned
+            window_start = pd.Timestamp(picked[0]) if len(picked) > 0 else None
+            window_end = pd.Timestamp(picked[-1]) if len(picked) > 1 else None
+        else:
+            window_start, window_end = date_presets.get(selected_window, (None, None))
+
+# Date filter: rows are sorted by date at load time, so a window is a binary search + slice.
+# It applies to the all-India analyses as well.
+df_enr_full = slice_dates(df_enr_full, window_start, window_end)
+df_upd_full = slice_dates(df_upd_full, window_start, window_end)
+df_enr = slice_dates(df_enr, window_start, window_end)
+df_upd = slice_dates(df_upd, window_start, window_end)
+date_window = (str(window_start), str(window_end))
+
 # Filter logic
 if selected_state != "All":
     df_enr = df_enr[df_enr['State'] == selected_state]
     df_upd = df_upd[df_upd['State'] == selected_state]
-    gdf = gdf[gdf['state'] == selected_state]
-    
+
     if selected_district != "All":
         df_enr = df_enr[df_enr['District'] == selected_district]
         df_upd = df_upd[df_upd['District'] == selected_district]
-        # map filter logic if district specific map needed, usually district map shows specific district highlighted
-        # For this hackathon, we keep map focused on state or filter down
-        gdf = gdf[gdf['district'] == selected_district]
-
-# Layout: Tabs - Extended for Societal Trends Analysis
-tab_trends, tab_seasonal, tab_migration, tab_age18, tab1, tab2, tab3, tab_trivar = st.tabs([
-    "📈 Overall Trends",
-    "💒 Seasonal Patterns",
-    "🚚 Migration Detection",
-    "🎓 Age-18 Milestone",
-    "🏭 Operational Intensity",
-    "👥 Demographics",
-    "🛡️ System Integrity",
-    "🔬 Trivariate Analysis"
-])
-with tab_trends:
+
+# KPI totals: constant-time lookups on the prefix-sum cubes for the date window
+kpi_enrolments = range_totals(prefix_cubes['Enrolment'], window_start, window_end).get('Enrolment_Count', 0)
+kpi_updates = sum(range_totals(cube, window_start, window_end).get('Count', 0) for cube in update_cubes)
+
+kpi_enrolment_card.markdown(f"""
+    <div class="kpi-card">
+        <div class="kpi-title enrol-bg">🆔 Enrolment</div>
+        <div class="kpi-value">{kpi_enrolments:,.0f}</div>
+        <div class="kpi-sub">Total Enrolments · {selected_window}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+kpi_update_card.markdown(f"""
+    <div class="kpi-card">
+        <div class="kpi-title update-bg">📝 Update</div>
+        <div class="kpi-value">{kpi_updates:,.0f}</div>
+        <div class="kpi-sub">Total Updates · {selected_window}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+# Layout: Sections - Extended for Societal Trends Analysis
+# Only the selected section is rendered (st.tabs would run every tab body on each rerun);
+# the remaining sections are precomputed in the background once it has been drawn.
+SECTION_LABELS = {
+    'trends': "📈 Overall Trends",
+    'seasonal': "💒 Seasonal Patterns",
+    'migration': "🚚 Migration Detection",
+    'age18': "🎓 Age-18 Milestone",
+    'intensity': "🏭 Operational Intensity",
+    'demographics': "👥 Demographics",
+    'integrity': "🛡️ System Integrity",
+    'trivariate': "🔬 Trivariate Analysis"
+}
+active_section = st.radio("Dashboard Section", list(SECTION_LABELS), format_func=SECTION_LABELS.get,
+                          horizontal=True, label_visibility="collapsed", key="active_section")
+
+# Frames available to metric jobs (see prefetch.SECTION_JOBS); the crosswalk depends only on the dataset version
+district_crosswalk = load_district_crosswalk(data_version, *data_snapshot['frames'])
+metric_frames = {'enr': df_enr, 'upd': df_upd, 'enr_full': df_enr_full, 'upd_full': df_upd_full,
+                 'crosswalk_full': district_crosswalk}
+# The same frames from the stratified sample: cold sections draw an estimate first (see progressive.py)
+sample_frames = filter_samples(load_samples(data_version, *data_snapshot['frames']),
+                               window_start, window_end, selected_state, selected_district)
+# Dataset versions: full-data metrics follow the whole dataset, filtered ones only their State
+view_key = (date_window, selected_state, selected_district, data_version, data_store.state_version(selected_state))
+
+section_span = start_span(f"section:{active_section}", kind='section')
+
+if active_section == 'trends':
     # Use standard headers but we will wrap charts to look 'contained'
     # Streamlit doesn't support wrapping plots in arbitrary HTML divs easily, 
     # so we rely on Plotly's native white background we set below.
@@ -300,53 +369,69 @@ with tab_trends:
         st.markdown("#### Aadhaar Generation Trend")
         
         # 1. Enrolment Combo Chart
-        enr_trend = df_enr.groupby('Month')['Enrolment_Count'].sum().reset_index()
-        enr_trend['Month'] = enr_trend['Month'].astype(str)
-        enr_trend['Cumulative'] = enr_trend['Enrolment_Count'].cumsum()
+        # Built only when the figure cache has no copy for this filter (see figure_cache.py)
+        def build_enrolment_trend():
+            # Daily and cumulative values come straight from the prefix-sum cube
+            enr_trend = cumulative_series(prefix_cubes['Enrolment'], 'Enrolment_Count', window_start, window_end,
+                                          selected_state, selected_district)
+            enr_trend = enr_trend.rename(columns={'Daily': 'Enrolment_Count'})
+            # Bounded payload: bars merged into buckets, trendline reduced with LTTB
+            enr_bars = bucket_sum(enr_trend, 'Date', ['Enrolment_Count'])
+            enr_line = downsample_line(enr_trend, 'Date', 'Cumulative')
         
-        # Create Dual-Axis Plot with White Background Style
-        fig_enr = make_subplots(specs=[[{"secondary_y": True}]])
+            # Create Dual-Axis Plot with White Background Style
+            fig_enr = make_subplots(specs=[[{"secondary_y": True}]])
         
-        fig_enr.add_trace(go.Bar(x=enr_trend['Month'], y=enr_trend['Enrolment_Count'], name="Enrolments", marker_color='#26C6DA', opacity=0.8), secondary_y=False)
-        fig_enr.add_trace(go.Scatter(x=enr_trend['Month'], y=enr_trend['Cumulative'], name="Trendline", line=dict(color='#F1C40F', width=3), mode='lines+markers'), secondary_y=True)
+            fig_enr.add_trace(go.Bar(x=enr_bars['Date'], y=enr_bars['Enrolment_Count'], name="Enrolments", marker_color='#26C6DA', opacity=0.8), secondary_y=False)
+            fig_enr.add_trace(line_trace(enr_line['Date'], enr_line['Cumulative'], name="Trendline", line=dict(color='#F1C40F', width=3), mode='lines+markers'), secondary_y=True)
         
-        fig_enr.update_layout(
-            plot_bgcolor='white', paper_bgcolor='white', # White Card look
-            margin=dict(t=30, b=0, l=10, r=10), height=350,
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-        )
-        fig_enr.update_yaxes(showgrid=True, gridcolor='#f0f0f0', secondary_y=False)
-        fig_enr.update_yaxes(showgrid=False, secondary_y=True)
-        st.plotly_chart(fig_enr, width="stretch")
+            fig_enr.update_layout(
+                plot_bgcolor='white', paper_bgcolor='white', # White Card look
+                margin=dict(t=30, b=0, l=10, r=10), height=350,
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+            )
+            fig_enr.update_yaxes(showgrid=True, gridcolor='#f0f0f0', secondary_y=False)
+            fig_enr.update_yaxes(showgrid=False, secondary_y=True)
+            return fig_enr
+
+        plotly_chart(cached_figure('trend_enrolment', ('enr',), view_key, build_enrolment_trend), width="stretch")
         
         st.markdown("#### Update Transaction Trend")
         
         # 2. Update Combo Chart
-        upd_trend = df_upd.groupby('Month')['Count'].sum().reset_index()
-        upd_trend['Month'] = upd_trend['Month'].astype(str)
-        upd_trend['Cumulative'] = upd_trend['Count'].cumsum()
+        def build_update_trend():
+            upd_trend = combined_series(update_cubes, 'Count', window_start, window_end,
+                                        selected_state, selected_district)
+            upd_trend = upd_trend.rename(columns={'Daily': 'Count'})
+            upd_bars = bucket_sum(upd_trend, 'Date', ['Count'])
+            upd_line = downsample_line(upd_trend, 'Date', 'Cumulative')
         
-        fig_upd = make_subplots(specs=[[{"secondary_y": True}]])
-        fig_upd.add_trace(go.Bar(x=upd_trend['Month'], y=upd_trend['Count'], name="Updates", marker_color='#EF5350', opacity=0.8), secondary_y=False)
-        fig_upd.add_trace(go.Scatter(x=upd_trend['Month'], y=upd_trend['Cumulative'], name="Trendline", line=dict(color='#F1C40F', width=3), mode='lines+markers'), secondary_y=True)
+            fig_upd = make_subplots(specs=[[{"secondary_y": True}]])
+            fig_upd.add_trace(go.Bar(x=upd_bars['Date'], y=upd_bars['Count'], name="Updates", marker_color='#EF5350', opacity=0.8), secondary_y=False)
+            fig_upd.add_trace(line_trace(upd_line['Date'], upd_line['Cumulative'], name="Trendline", line=dict(color='#F1C40F', width=3), mode='lines+markers'), secondary_y=True)
         
-        fig_upd.update_layout(
-            plot_bgcolor='white', paper_bgcolor='white',
-            margin=dict(t=30, b=0, l=10, r=10), height=350,
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-        )
-        fig_upd.update_yaxes(showgrid=True, gridcolor='#f0f0f0', secondary_y=False)
-        st.plotly_chart(fig_upd, width="stretch")
+            fig_upd.update_layout(
+                plot_bgcolor='white', paper_bgcolor='white',
+                margin=dict(t=30, b=0, l=10, r=10), height=350,
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+            )
+            fig_upd.update_yaxes(showgrid=True, gridcolor='#f0f0f0', secondary_y=False)
+            return fig_upd
+
+        plotly_chart(cached_figure('trend_updates', ('upd',), view_key, build_update_trend), width="stretch")
 
     with col2:
         st.subheader("Update Type Distribution")
         
         if 'Type' in df_upd.columns:
-            update_counts = df_upd['Type'].value_counts()
-            fig_type = px.pie(names=update_counts.index, values=update_counts.values, hole=0.4,
-                             color_discrete_sequence=['#FF7043', '#42A5F5'])
-            fig_type.update_layout(height=350, margin=dict(t=30, b=0, l=0, r=0))
-            st.plotly_chart(fig_type, width="stretch")
+            def build_update_types():
+                update_counts = df_upd['Type'].value_counts()
+                fig_type = px.pie(names=update_counts.index, values=update_counts.values, hole=0.4,
+                                 color_discrete_sequence=['#FF7043', '#42A5F5'])
+                fig_type.update_layout(height=350, margin=dict(t=30, b=0, l=0, r=0))
+                return fig_type
+
+            plotly_chart(cached_figure('update_types', ('upd',), view_key, build_update_types), width="stretch")
         else:
             st.warning("Type breakdown not available.")
 
@@ -355,7 +440,7 @@ with tab_trends:
 # =============================================================================
 # NEW TAB: SEASONAL PATTERNS (Wedding Seasons, School Admissions)
 # =============================================================================
-with tab_seasonal:
+if active_section == 'seasonal':
     st.header("💒 Seasonal Patterns in Aadhaar Updates")
     st.markdown("""
     **Hypothesis**: Demographic updates spike during wedding seasons (Nov-Feb, Apr-May) due to name/address changes after marriage.
@@ -369,18 +454,19 @@ with tab_seasonal:
 
     with col1:
         st.subheader("Monthly Update Patterns")
-        seasonal_data = get_seasonal_patterns(df_upd_full, df_enr_full)
-
-        if not seasonal_data.empty:
-            # Color by season
-            color_map = {
-                'Wedding Season (Nov-Feb)': '#E91E63',
-                'Wedding Season (Apr-May)': '#FF5722',
-                'School Admission (Jun)': '#2196F3',
-                'Regular Period': '#9E9E9E'
-            }
-            seasonal_data['Color'] = seasonal_data['Season'].map(color_map)
-
+        # Color by season
+        color_map = {
+            'Wedding Season (Nov-Feb)': '#E91E63',
+            'Wedding Season (Apr-May)': '#FF5722',
+            'School Admission (Jun)': '#2196F3',
+            'Regular Period': '#9E9E9E'
+        }
+
+        def draw_seasonal(seasonal_data, estimate):
+            stage = 'estimate' if estimate else 'exact'
+            if seasonal_data.empty:
+                st.warning("Insufficient data for seasonal analysis.")
+                return
             fig_seasonal = go.Figure()
 
             for season in seasonal_data['Season'].unique():
@@ -401,7 +487,9 @@ with tab_seasonal:
                 barmode='group',
                 height=400
             )
-            st.plotly_chart(fig_seasonal, width='stretch')
+            plotly_chart(fig_seasonal, width='stretch', key=f"fig_seasonal_{stage}")
+            if estimate:
+                st.caption(estimate_caption(estimate))
 
             # Deviation chart
             st.subheader("Deviation from Average")
@@ -410,9 +498,10 @@ with tab_seasonal:
                             title="% Deviation from Average Monthly Updates")
             fig_dev.add_hline(y=0, line_dash="dash", line_color="gray")
             fig_dev.update_layout(plot_bgcolor='white', paper_bgcolor='white', height=300)
-            st.plotly_chart(fig_dev, width='stretch')
-        else:
-            st.warning("Insufficient data for seasonal analysis.")
+            plotly_chart(fig_dev, width='stretch', key=f"fig_dev_{stage}")
+
+        seasonal_data = progressive_fetch(get_seasonal_patterns, metric_frames, sample_frames,
+                                          ('upd_full', 'enr_full'), view_key, draw_seasonal)
 
     with col2:
         st.subheader("📊 Key Insights")
@@ -442,18 +531,82 @@ with tab_seasonal:
             """)
 
         st.subheader("Demographic vs Biometric by Season")
-        demo_bio_seasonal = get_demographic_vs_biometric_seasonal(df_upd_full)
+        demo_bio_seasonal = fetch(get_demographic_vs_biometric_seasonal, metric_frames, ('upd_full',), view_key)
         if not demo_bio_seasonal.empty:
             fig_type_season = px.line(demo_bio_seasonal, x='Month_Num', y='Count',
                                       color='Type', markers=True,
                                       title="Update Type Trend by Month")
             fig_type_season.update_layout(height=250, plot_bgcolor='white')
-            st.plotly_chart(fig_type_season, width='stretch')
+            plotly_chart(fig_type_season, width='stretch')
+
+    # Regional seasonality: every State and District is decomposed in one pass and cached,
+    # so switching the region below only looks up precomputed rows
+    st.subheader("🗺️ Regional Seasonality")
+    regional_seasonality = cached_regional_seasonality(data_version, date_window, df_upd_full)
+    default_level = "District" if selected_district != "All" else ("State" if selected_state != "All" else ALL_INDIA)
+    col_r1, col_r2 = st.columns([1, 2])
+    with col_r1:
+        season_levels = [ALL_INDIA, "State", "District"]
+        season_level = st.radio("Level", season_levels, index=season_levels.index(default_level),
+                                horizontal=True, key="season_level")
+    season_indices, season_components = regional_seasonality[season_level]
+
+    if not season_indices.empty:
+        unit_cols = [col for col in ['District', 'State'] if col in season_indices.columns]
+        region_labels = season_indices[unit_cols].astype(str).agg(", ".join, axis=1)
+        region_list = region_labels.tolist()
+        default_region = ", ".join([selected_district, selected_state] if season_level == "District" else [selected_state])
+        with col_r2:
+            season_region = st.selectbox("Region", region_list, key="season_region",
+                                         index=region_list.index(default_region) if default_region in region_list else 0)
+        region_row = season_indices[region_labels == season_region].iloc[0]
+        region_components = season_components.merge(region_row[unit_cols].to_frame().T, on=unit_cols)
+
+        col_s1, col_s2 = st.columns([1, 2])
+        with col_s1:
+            def build_season_index():
+                month_deviation = pd.DataFrame({'Month': MONTH_NAMES, 'Deviation_Pct': region_row[MONTH_NAMES].to_numpy(dtype=float)})
+                fig_index = px.bar(month_deviation, x='Month', y='Deviation_Pct', color='Deviation_Pct',
+                                   color_continuous_scale='RdBu_r', color_continuous_midpoint=0,
+                                   title=f"Seasonal index: {season_region}")
+                fig_index.add_hline(y=0, line_dash="dash", line_color="gray")
+                fig_index.update_layout(plot_bgcolor='white', height=350, coloraxis_showscale=False)
+                return fig_index
+
+            plotly_chart(cached_figure(('season_index', season_level, season_region), ('upd_full',), view_key,
+                                       build_season_index), width='stretch')
+            st.caption(f"% above/below trend per calendar month · {region_row['Method']} · "
+                       f"{region_row['Months_Observed']} months observed")
+        with col_s2:
+            def build_season_components():
+                fig_components = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.06,
+                                               subplot_titles=("Observed & Trend", "Seasonal", "Residual"))
+                fig_components.add_trace(go.Scatter(x=region_components['Date'], y=region_components['Observed'],
+                                                    name="Observed", line=dict(color='#42A5F5')), row=1, col=1)
+                fig_components.add_trace(go.Scatter(x=region_components['Date'], y=region_components['Trend'],
+                                                    name="Trend", line=dict(color='#F1C40F', width=3)), row=1, col=1)
+                fig_components.add_trace(go.Bar(x=region_components['Date'], y=region_components['Seasonal'],
+                                                name="Seasonal", marker_color='#E91E63'), row=2, col=1)
+                fig_components.add_trace(go.Scatter(x=region_components['Date'], y=region_components['Residual'],
+                                                    name="Residual", mode='markers', marker_color='#9E9E9E'), row=3, col=1)
+                fig_components.update_layout(plot_bgcolor='white', height=450, showlegend=False,
+                                             margin=dict(t=40, b=0, l=10, r=10))
+                return fig_components
+
+            plotly_chart(cached_figure(('season_components', season_level, season_region), ('upd_full',), view_key,
+                                       build_season_components), width='stretch')
+
+        if season_level != ALL_INDIA:
+            st.markdown(f"**Strongest seasonality by {season_level.lower()}**")
+            st.dataframe(season_indices.nlargest(10, 'Amplitude_Pct')[unit_cols + ['Peak_Month', 'Trough_Month', 'Amplitude_Pct', 'Months_Observed']],
+                         hide_index=True, width='stretch')
+    else:
+        st.info("No monthly update history to decompose.")
 
 # =============================================================================
 # NEW TAB: MIGRATION DETECTION (Disaster/Event-driven updates)
 # =============================================================================
-with tab_migration:
+if active_section == 'migration':
     st.header("🚚 Migration & Event-Driven Update Detection")
     st.markdown("""
     **Hypothesis**: Sudden spikes in address updates in specific districts may indicate:
@@ -469,24 +622,24 @@ with tab_migration:
 
     with col1:
         st.subheader("District Update Velocity (High = Potential Migration)")
-        velocity_data = get_district_update_velocity(df_upd_full)
+        velocity_data = fetch(get_district_update_velocity, metric_frames, ('upd_full',), view_key)
 
         if not velocity_data.empty:
-            # Top 20 by velocity
-            top_velocity = velocity_data.nlargest(20, 'Daily_Velocity')
+            # Top 20 by velocity (districts reporting on very few days are not ranked)
+            top_velocity = top_k_velocity(velocity_data, k=20, min_active_days=3)
 
             fig_velocity = px.bar(top_velocity, x='District', y='Daily_Velocity',
-                                  color='State', title="Top 20 Districts by Daily Update Velocity",
-                                  hover_data=['Total_Updates', 'Days_Active'])
+                                  color='State', title="Top 20 Districts by Daily Update Velocity (per active day)",
+                                  hover_data=['Total_Updates', 'Days_Active', 'Velocity_7d', 'Velocity_30d', 'Acceleration'])
             fig_velocity.update_layout(
                 plot_bgcolor='white', paper_bgcolor='white',
                 xaxis_tickangle=-45, height=400
             )
-            st.plotly_chart(fig_velocity, width='stretch')
+            plotly_chart(fig_velocity, width='stretch')
 
             # Spike detection
             st.subheader("⚠️ Month-over-Month Spike Detection")
-            spike_data = detect_migration_spikes(df_upd_full)
+            spike_data = fetch(detect_migration_spikes, metric_frames, ('upd_full',), view_key)
 
             if not spike_data.empty:
                 spikes = spike_data[spike_data['Is_Spike'] == True].dropna()
@@ -499,18 +652,19 @@ with tab_migration:
                     st.dataframe(top_spikes, width='stretch')
 
                     # Visualization
-                    fig_spikes = px.scatter(spikes.head(50), x='Year_Month', y='MoM_Change_Pct',
-                                           size='Count', color='State', hover_name='District',
-                                           title="Detected Spikes (>100% MoM Increase)")
+                    # All spikes are plotted; dense views are binned server-side
+                    fig_spikes = scatter_figure(spikes, x='Year_Month', y='MoM_Change_Pct',
+                                                size='Count', color='State', hover_name='District',
+                                                title="Detected Spikes (>100% MoM Increase)")
                     fig_spikes.update_layout(plot_bgcolor='white', height=350)
-                    st.plotly_chart(fig_spikes, width='stretch')
+                    plotly_chart(fig_spikes, width='stretch')
                 else:
                     st.success("No significant migration spikes detected in current data.")
 
     with col2:
         st.subheader("📍 Geographic Cluster Analysis")
 
-        state_updates, district_high = detect_geographic_clusters(df_upd_full)
+        state_updates, district_high = fetch(detect_geographic_clusters, metric_frames, ('upd_full',), view_key)
 
         if not state_updates.empty:
             # High activity states
@@ -524,11 +678,43 @@ with tab_migration:
                 st.info("No states with unusually high activity detected.")
 
             # State-wise distribution
-            fig_state = px.treemap(state_updates, path=['State'], values='Total_Updates',
-                                   title="State-wise Update Distribution",
-                                   color='Total_Updates', color_continuous_scale='Reds')
-            fig_state.update_layout(height=350)
-            st.plotly_chart(fig_state, width='stretch')
+            def build_state_treemap():
+                fig_state = px.treemap(state_updates, path=['State'], values='Total_Updates',
+                                       title="State-wise Update Distribution",
+                                       color='Total_Updates', color_continuous_scale='Reds')
+                fig_state.update_layout(height=350)
+                return fig_state
+
+            plotly_chart(cached_figure('state_treemap', ('upd_full',), view_key, build_state_treemap), width='stretch')
+
+        st.subheader("🔥 Spatial Hot-spots (Neighbouring Districts)")
+        district_adjacency = load_district_adjacency()
+        if district_adjacency is not None:
+            hotspot_data = cached_update_hotspots(data_version, date_window, df_upd_full, district_crosswalk)
+            hot = hotspot_data[hotspot_data['Hotspot'] == 'Hot spot']
+            if not hot.empty:
+                st.warning(f"**{len(hot)} districts** sit in statistically significant clusters of high address-update activity (Getis-Ord Gi*, p < 0.05).")
+                st.dataframe(hot[['district', 'state', 'Total_Updates', 'Gi_Z', 'Quadrant', 'Moran_p']].head(15),
+                             hide_index=True, width='stretch')
+            else:
+                st.info("No significant hot-spots of address updates among neighbouring districts.")
+        else:
+            st.info("Hot-spot analysis needs district boundaries (data/india_districts.geojson).")
+
+        st.subheader("🔀 Candidate Inter-District Flows")
+        flow_data = cached_migration_flows(data_version, date_window, df_upd_full)
+        if not flow_data.empty:
+            destinations = flow_data.drop_duplicates(['Destination', 'Destination_State'])
+            destination_labels = (destinations['Destination'] + ", " + destinations['Destination_State']).tolist()
+            flow_destination = st.selectbox("Destination district", destination_labels, key="flow_destination")
+            dest_district, dest_state = flow_destination.split(", ", 1)
+            dest_flows = flow_data[(flow_data['Destination'] == dest_district) & (flow_data['Destination_State'] == dest_state)]
+            st.dataframe(dest_flows[['Source', 'Source_State', 'Lag', 'Correlation', 'Pattern']],
+                         hide_index=True, width='stretch')
+            st.caption("Sources whose demographic updates lead this district's by `Lag` days (lagged correlation). "
+                       "Correlation is not proof of movement; treat these as leads to verify.")
+        else:
+            st.info("Not enough daily update history to infer flows between districts.")
 
         st.subheader("🔍 Interpretation Guide")
         st.info("""
@@ -546,7 +732,7 @@ with tab_migration:
 # =============================================================================
 # NEW TAB: AGE-18 MILESTONE TRACKING
 # =============================================================================
-with tab_age18:
+if active_section == 'age18':
     st.header("🎓 Age-18 Milestone & Lifecycle Tracking")
     st.markdown("""
     **Key Milestones in Aadhaar Lifecycle:**
@@ -562,9 +748,10 @@ with tab_age18:
 
     with col1:
         st.subheader("Enrollment to Update Transition Analysis")
-        transition_data = analyze_age_transitions(df_enr_full, df_upd_full)
-
-        if not transition_data.empty:
+        def draw_transitions(transition_data, estimate):
+            stage = 'estimate' if estimate else 'exact'
+            if transition_data.empty:
+                return
             # Update rate by state
             fig_transition = px.bar(transition_data.nlargest(15, 'Update_Rate'),
                                    x='State', y='Update_Rate',
@@ -572,20 +759,25 @@ with tab_age18:
                                    color_continuous_scale='Viridis',
                                    title="Update Rate vs Adult Enrollment Share by State")
             fig_transition.update_layout(plot_bgcolor='white', height=400, xaxis_tickangle=-45)
-            st.plotly_chart(fig_transition, width='stretch')
+            plotly_chart(fig_transition, width='stretch', key=f"fig_transition_{stage}")
+            if estimate:
+                st.caption(estimate_caption(estimate))
 
             # Scatter plot: Enrollment vs Updates
-            fig_scatter = px.scatter(transition_data, x='Enrolment_Count', y='Count',
-                                    size='age_18_greater', color='Update_Rate',
-                                    hover_name='State',
-                                    title="Enrollment vs Updates (Bubble size = 18+ Enrollments)",
-                                    color_continuous_scale='RdYlGn')
+            fig_scatter = scatter_figure(transition_data, x='Enrolment_Count', y='Count',
+                                         size='age_18_greater', color='Update_Rate',
+                                         hover_name='State',
+                                         title="Enrollment vs Updates (Bubble size = 18+ Enrollments)",
+                                         color_continuous_scale='RdYlGn')
             fig_scatter.update_layout(plot_bgcolor='white', height=400)
-            st.plotly_chart(fig_scatter, width='stretch')
+            plotly_chart(fig_scatter, width='stretch', key=f"fig_age_scatter_{stage}")
+
+        transition_data = progressive_fetch(analyze_age_transitions, metric_frames, sample_frames,
+                                            ('enr_full', 'upd_full'), view_key, draw_transitions)
 
     with col2:
         st.subheader("MBU Demand Forecast by State")
-        mbu_forecast = calculate_mbu_demand_forecast(df_enr_full)
+        mbu_forecast = fetch(calculate_mbu_demand_forecast, metric_frames, ('enr_full',), view_key)
 
         if not mbu_forecast.empty:
             # Top states by MBU demand
@@ -602,7 +794,7 @@ with tab_age18:
                 plot_bgcolor='white', paper_bgcolor='white',
                 height=400, xaxis_tickangle=-45
             )
-            st.plotly_chart(fig_mbu, width='stretch')
+            plotly_chart(fig_mbu, width='stretch')
 
             # Key metrics
             total_immediate = mbu_forecast['MBU_Immediate'].sum()
@@ -632,10 +824,30 @@ with tab_age18:
         - Driving license application
         """)
 
+    st.subheader("🔗 5-17 Enrolment Cohorts → Later 17+ Updates")
+    milestone_summary, milestone_profile = fetch(get_age_milestone_correlation, metric_frames,
+                                                 ('enr_full', 'upd_full'), view_key)
+    if not milestone_summary.empty:
+        lag_unit = milestone_profile['Lag_Unit'].iloc[0]
+        col_m1, col_m2 = st.columns([2, 3])
+        with col_m1:
+            fig_lag = px.bar(milestone_profile, x='Lag', y='Mean_Corr', color='Districts_Peaking',
+                             color_continuous_scale='Blues',
+                             labels={'Lag': f"Lag ({lag_unit})", 'Mean_Corr': "Mean correlation"},
+                             title="Cohort → 17+ update correlation by lag (all districts)")
+            fig_lag.update_layout(plot_bgcolor='white', height=350)
+            plotly_chart(fig_lag, width='stretch')
+        with col_m2:
+            st.dataframe(milestone_summary.nlargest(15, 'Best_Corr'), hide_index=True, width='stretch')
+        st.caption(f"Districts whose 17+ updates follow their own 5-17 enrolments by `Best_Lag` {lag_unit} "
+                   "(FFT cross-correlation after removing the all-India calendar pattern).")
+    else:
+        st.info("Not enough dated 5-17 enrolment and 17+ update history per district to relate cohorts to later updates.")
+
 # =============================================================================
 # NEW TAB: TRIVARIATE ANALYSIS (Age × Geography × Time)
 # =============================================================================
-with tab_trivar:
+if active_section == 'trivariate':
     st.header("🔬 Trivariate Analysis: Age × Geography × Time")
     st.markdown("Multi-dimensional analysis combining age groups, geographic regions, and temporal patterns.")
 
@@ -646,28 +858,39 @@ with tab_trivar:
 
     with col1:
         st.subheader("State × Month Heatmap (Updates)")
-        heatmap_data = get_state_month_heatmap_data(df_upd_full)
-
-        if not heatmap_data.empty:
-            # Limit to top 15 states for readability
-            top_states = df_upd_full.groupby('State')['Count'].sum().nlargest(15).index
-            heatmap_filtered = heatmap_data.loc[heatmap_data.index.isin(top_states)]
-
-            fig_heatmap = px.imshow(heatmap_filtered,
-                                    labels=dict(x="Month", y="State", color="Updates"),
-                                    x=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                                       'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'][:len(heatmap_filtered.columns)],
-                                    y=heatmap_filtered.index,
-                                    color_continuous_scale='YlOrRd',
-                                    title="Update Intensity Heatmap (Top 15 States)")
-            fig_heatmap.update_layout(height=500)
-            st.plotly_chart(fig_heatmap, width='stretch')
-        else:
-            st.warning("Insufficient data for heatmap.")
+        def draw_heatmap(heatmap_data, estimate):
+            if heatmap_data.empty:
+                st.warning("Insufficient data for heatmap.")
+                return
+
+            def build_heatmap():
+                # Limit to top 15 states for readability
+                top_states = heatmap_data.sum(axis=1).nlargest(15).index
+                heatmap_filtered = heatmap_data.loc[heatmap_data.index.isin(top_states)]
+
+                fig_heatmap = px.imshow(heatmap_filtered,
+                                        labels=dict(x="Month", y="State", color="Updates"),
+                                        x=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                                           'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'][:len(heatmap_filtered.columns)],
+                                        y=heatmap_filtered.index,
+                                        color_continuous_scale='YlOrRd',
+                                        title="Update Intensity Heatmap (Top 15 States)")
+                fig_heatmap.update_layout(height=500)
+                return fig_heatmap
+
+            # Estimates are transient; only the exact figure is cached
+            fig_heatmap = build_heatmap() if estimate else \
+                cached_figure('state_month_heatmap', ('upd_full',), view_key, build_heatmap)
+            plotly_chart(fig_heatmap, width='stretch', key=f"fig_heatmap_{'estimate' if estimate else 'exact'}")
+            if estimate:
+                st.caption(estimate_caption(estimate))
+
+        progressive_fetch(get_state_month_heatmap_data, metric_frames, sample_frames,
+                          ('upd_full',), view_key, draw_heatmap)
 
     with col2:
         st.subheader("Enrollment vs Update Correlation")
-        correlation_data, corr_value = get_enrollment_update_correlation(df_enr_full, df_upd_full)
+        correlation_data, corr_value = fetch(get_enrollment_update_correlation, metric_frames, ('enr_full', 'upd_full'), view_key)
 
         if not correlation_data.empty:
             st.metric("Correlation Coefficient", f"{corr_value:.3f}")
@@ -679,15 +902,49 @@ with tab_trivar:
             else:
                 st.warning("Weak correlation: Updates may be event-driven (migration, disasters)")
 
-            fig_corr = px.scatter(correlation_data, x='Enrollments', y='Updates',
-                                  size='Update_to_Enrollment_Ratio', hover_name='State',
-                                  title="Enrollment vs Update Correlation by State")
+            fig_corr = scatter_figure(correlation_data, x='Enrollments', y='Updates',
+                                      size='Update_to_Enrollment_Ratio', hover_name='State',
+                                      title="Enrollment vs Update Correlation by State")
             fig_corr.update_layout(plot_bgcolor='white', height=400)
-            st.plotly_chart(fig_corr, width='stretch')
+            plotly_chart(fig_corr, width='stretch')
+
+    st.subheader("District Rolling Enrollment/Update Correlation")
+    rolling_summary, rolling_heatmap = fetch(get_district_rolling_correlation, metric_frames, ('enr_full', 'upd_full'), view_key)
+
+    if not rolling_summary.empty and rolling_summary['Latest_Corr'].notna().any():
+        sort_labels = {
+            'Weakest mean correlation': ('Mean_Corr', True),
+            'Highest update-to-enrollment ratio': ('Update_to_Enrollment_Ratio', False),
+            'Most updates': ('Updates', False),
+        }
+        sort_choice = st.selectbox("Rank districts by", list(sort_labels), key="rolling_corr_sort")
+        sort_col, ascending = sort_labels[sort_choice]
+        ranked = rolling_summary.dropna(subset=['Mean_Corr']).sort_values(sort_col, ascending=ascending)
+
+        col_rc1, col_rc2 = st.columns([2, 3])
+        with col_rc1:
+            st.dataframe(ranked, hide_index=True, width='stretch', height=450)
+        with col_rc2:
+            # Heatmap of the 25 highest-ranked districts
+            def build_rolling_heatmap():
+                top_rows = (ranked['District'] + ", " + ranked['State']).head(25)
+                fig_rolling = px.imshow(rolling_heatmap.loc[top_rows],
+                                        labels=dict(x="Window end", y="District", color="Correlation"),
+                                        color_continuous_scale='RdBu', zmin=-1, zmax=1, aspect='auto',
+                                        title="Rolling 7-day Correlation (Top 25 Districts)")
+                fig_rolling.update_layout(height=450)
+                return fig_rolling
+
+            plotly_chart(cached_figure(('rolling_corr_heatmap', sort_choice), ('enr_full', 'upd_full'), view_key,
+                                       build_rolling_heatmap), width='stretch')
+        st.caption("Districts whose updates stop tracking enrollments (low or negative correlation, high ratio) "
+                   "are candidates for event-driven updates.")
+    else:
+        st.info("Not enough overlapping enrollment and update history for rolling correlations.")
 
     # Trivariate: Age × State × Month
     st.subheader("Age Group × State × Time Analysis")
-    trivar_enr, trivar_upd = trivariate_analysis(df_enr_full, df_upd_full)
+    trivar_enr, trivar_upd = fetch(trivariate_analysis, metric_frames, ('enr_full', 'upd_full'), view_key)
 
     if not trivar_enr.empty:
         col3, col4 = st.columns(2)
@@ -713,7 +970,7 @@ with tab_trivar:
                 plot_bgcolor='white', paper_bgcolor='white',
                 height=350, xaxis_tickangle=-45
             )
-            st.plotly_chart(fig_age_time, width='stretch')
+            plotly_chart(fig_age_time, width='stretch')
 
         with col4:
             # Update type trend over time
@@ -722,7 +979,7 @@ with tab_trivar:
                                        color='Type', markers=True,
                                        title="Update Type Over Time")
                 fig_upd_time.update_layout(plot_bgcolor='white', height=350, xaxis_tickangle=-45)
-                st.plotly_chart(fig_upd_time, width='stretch')
+                plotly_chart(fig_upd_time, width='stretch')
 
     st.subheader("🎯 Multi-Dimensional Insights Summary")
     col5, col6, col7 = st.columns(3)
@@ -751,11 +1008,11 @@ with tab_trivar:
         - 18+: Life event updates (marriage, job)
         """)
 
-with tab1:
+if active_section == 'intensity':
     st.header("Operational Intensity (Updates vs Enrolments)")
     
     # Calculate Metric
-    intensity_df = calculate_update_intensity(df_upd, df_enr)
+    intensity_df = fetch(calculate_update_intensity, metric_frames, ('upd', 'enr'), view_key)
     
     # Visualization: Map
     col1, col2 = st.columns([2, 1])
@@ -763,22 +1020,38 @@ with tab1:
     with col1:
         st.subheader("District-wise Update Intensity")
         # Merge for map - use full GeoJSON for all-India visualization
-        map_df = merge_for_map(gdf_full, intensity_df, 'Update_Intensity')
+        # (names missing from the GeoJSON are matched spatially via pincode centroids)
+        map_df = merge_for_map(load_geodata(), intensity_df, 'Update_Intensity', crosswalk=district_crosswalk)
 
         if not map_df.empty:
+            # Map libraries are imported only when a map is actually drawn
+            import folium
+            from streamlit_folium import st_folium
+            from spatial import locate_district
+            folium_chart = timed(st_folium, name='render:folium_map', kind='render')
+
             m = folium.Map(location=[20, 78], zoom_start=5)
             folium.Choropleth(
                 geo_data=map_df.__geo_interface__,
                 name="choropleth",
                 data=map_df,
-                columns=["District", "Update_Intensity"],
+                columns=["district", "Update_Intensity"],
                 key_on="feature.properties.district",
                 fill_color="YlGnBu",
                 fill_opacity=0.7,
                 line_opacity=0.2,
                 legend_name="Update Intensity (Updates per 1k Enrolments)"
             ).add_to(m)
-            st_folium(m, height=400, returned_objects=[], use_container_width=True)
+            map_state = folium_chart(m, height=400, returned_objects=["last_clicked"], use_container_width=True)
+
+            # Map click → district via the STRtree (no scan over all polygons)
+            clicked = (map_state or {}).get("last_clicked")
+            if clicked:
+                hit = locate_district(load_district_index(), clicked['lng'], clicked['lat'])
+                if hit is not None:
+                    clicked_row = map_df[map_df['district'] == hit[0]]
+                    clicked_value = clicked_row['Update_Intensity'].iloc[0] if not clicked_row.empty else float('nan')
+                    st.caption(f"📍 **{hit[0]}, {hit[1]}** — Update Intensity: {clicked_value:,.0f}")
         else:
             # Alternative visualization when no GeoJSON available
             st.info("📊 Showing bar chart (GeoJSON map data not available)")
@@ -788,7 +1061,7 @@ with tab1:
                                       color='State', title="Top 20 Districts by Update Intensity",
                                       labels={'Update_Intensity': 'Updates per 1k Enrollments'})
                 fig_intensity.update_layout(plot_bgcolor='white', height=400, xaxis_tickangle=-45)
-                st.plotly_chart(fig_intensity, width='stretch')
+                plotly_chart(fig_intensity, width='stretch')
             
     with col2:
         st.subheader("Priority Actions")
@@ -807,10 +1080,28 @@ with tab1:
         else:
             st.write("No data available.")
 
-with tab2:
+        # Sketch-based statistics over the full shard history (approximate, constant memory)
+        sketches = data_store.sketches()
+        st.markdown("**Active Centres (distinct pincodes, all history)**")
+        centres = sketches.distinct_pincodes()
+        if selected_state != "All":
+            centres = centres[centres['State'] == selected_state]
+        if selected_district != "All":
+            centres = centres[centres['District'] == selected_district]
+        st.dataframe(centres.sort_values('Pincodes_Est', ascending=False).head(10), hide_index=True)
+
+        sizes = sketches.update_size_percentiles()
+        size_row = sizes[sizes['State'] == (selected_state if selected_state != "All" else ALL_INDIA)]
+        if not size_row.empty:
+            size_row = size_row.iloc[0]
+            st.caption(f"Updates per record — median {size_row['P50']:.0f}, "
+                       f"90th pct {size_row['P90']:.0f}, 99th pct {size_row['P99']:.0f} "
+                       f"({size_row['Records']:,} records, HyperLogLog/KLL estimates)")
+
+if active_section == 'demographics':
     st.header("Demographic Profile (Age Distribution)")
     
-    age_dist = calculate_age_distribution(df_enr)
+    age_dist = fetch(calculate_age_distribution, metric_frames, ('enr',), view_key)
     
     # Visualization: Pie Chart
     col1, col2 = st.columns([2, 1])
@@ -819,12 +1110,12 @@ with tab2:
         fig = px.pie(values=list(age_dist.values()), names=list(age_dist.keys()), hole=0.3,
                      title="Enrolment Share by Age Group",
                      color_discrete_sequence=px.colors.sequential.RdBu)
-        st.plotly_chart(fig, width="stretch")
+        plotly_chart(fig, width="stretch")
         
     with col2:
         st.info("**Policy Note**: \n\n- **0-5 Years**: Mandatory Biometric Update (MBU) pending at age 5.\n- **5-17 Years**: MBU pending at age 15.\n- **18+**: General updates.")
 
-with tab3:
+if active_section == 'integrity':
     st.header("System Integrity & MBU Demand Forecasting")
     
     col1, col2 = st.columns(2)
@@ -833,7 +1124,7 @@ with tab3:
         st.subheader("⚠️ Anomalous Enrolment Volume")
         st.markdown("Detected using **Isolation Forest** on Enrolment Counts.")
         
-        anomalies = detect_anomalies(df_enr)
+        anomalies = fetch(detect_anomalies, metric_frames, ('enr',), view_key)
         
         if not anomalies.empty:
             # -1 is anomaly, map to string for color
@@ -843,25 +1134,120 @@ with tab3:
                              color="Status", size="Enrolment_Count",
                              color_discrete_map={'Anomaly': 'red', 'Normal': 'blue'},
                              hover_name="District", title="Outliers: Unusual Enrolment Volume")
-            st.plotly_chart(fig)
+            plotly_chart(fig)
             st.error(f"**Action Required**: {len(anomalies[anomalies['anomaly']==-1])} Districts flagged for audit due to deviation from state norms.")
         else:
             st.success("No significant anomalies detected in the current view.")
             
     with col2:
-        st.subheader("Alert: 40% Surge in Child Updates Expected")
-        st.markdown("**Predicting Mandatory Biometric Updates (Age 5/15) for next quarter.**")
-        # Dummy forecast viz for hackathon prototype
-        dates = pd.date_range(start="2025-01-01", periods=6, freq="ME")
-        forecast_vals = [1200, 1350, 1100, 2200, 2400, 2350] # Seasonal spike
-        forecast_df = pd.DataFrame({'Date': dates, 'Predicted_Updates': forecast_vals})
-        
-        fig = px.line(forecast_df, x='Date', y='Predicted_Updates', markers=True, title="Forecasted Demand")
-        fig.add_annotation(x=dates[4], y=2400, text="Peak Demand", showarrow=True, arrowhead=1)
-        st.plotly_chart(fig)
-        
-        st.warning("⚡ **Staffing Increase Required**: projected demand exceeds current capacity by 1,200 slots/day in May.")
+        st.subheader("Update-Centre Capacity Plan")
+        st.markdown("**Recent update demand plus projected MBU demand per district, against centre capacity.**")
+        # Slots and mobile vans are allocated across all districts in one solve (see capacity.py);
+        # the demand/capacity base is cached per dataset version, each budget's plan separately
+        plan_col1, plan_col2, plan_col3 = st.columns(3)
+        plan_horizon = plan_col1.selectbox("MBU horizon (days)", [30, 90, 180, 365], index=2, key="plan_horizon")
+        plan_slots = plan_col2.number_input("Extra slots/day", min_value=0, value=500, step=50, key="plan_slots")
+        plan_vans = plan_col3.number_input(f"Mobile vans ({VAN_DAILY_SLOTS}/day)", min_value=0, value=20, step=5,
+                                           key="plan_vans")
+
+        capacity_inputs = cached_capacity_base(data_version, date_window, df_enr_full, df_upd_full)
+        capacity_plan, plan_info = cached_capacity_plan(data_version, date_window, plan_horizon, int(plan_slots),
+                                                        int(plan_vans), capacity_inputs)
+        national = plan_summary(capacity_plan)
+        scope_plan = filter_table(capacity_plan, selected_state, selected_district)
+        scope = plan_summary(scope_plan)
+        scope_name = "All India" if selected_state == "All" else \
+            (selected_state if selected_district == "All" else f"{selected_district}, {selected_state}")
+
+        metric_col1, metric_col2, metric_col3 = st.columns(3)
+        metric_col1.metric("Demand (slots/day)", f"{scope['demand']:,.0f}")
+        metric_col2.metric("Capacity (slots/day)", f"{scope['capacity']:,.0f}")
+        metric_col3.metric("Unmet after plan", f"{scope['shortfall']:,.0f}",
+                           f"{scope['shortfall'] - scope['gap']:,.0f} vs today", delta_color="inverse")
+
+        if scope['short_after']:
+            st.warning(f"⚡ **Staffing Increase Required** ({scope_name}): projected demand exceeds current capacity by "
+                       f"{scope['gap']:,.0f} slots/day in {scope['short_before']} districts; with this budget "
+                       f"{scope['shortfall']:,.0f} slots/day remain unmet in {scope['short_after']}.")
+        elif scope['short_before']:
+            st.success(f"✅ The plan covers the {scope['gap']:,.0f} slots/day shortfall of {scope['short_before']} "
+                       f"districts in {scope_name} with {scope['extra_slots']:,} extra slots and {scope['vans']} vans.")
+        else:
+            st.success(f"✅ Current centre capacity covers projected demand in {scope_name} "
+                       f"(MBU demand spread over {plan_horizon} days).")
+
+        short_plan = scope_plan[scope_plan['Gap'] > 0.5].nlargest(15, 'Gap')
+        if not short_plan.empty:
+            fig = go.Figure()
+            for col, label, color in [('Extra_Slots', 'Extra slots', '#2563eb'), ('Van_Slots', 'Mobile vans', '#16a34a'),
+                                      ('Shortfall', 'Unmet', '#dc2626')]:
+                fig.add_bar(x=short_plan['District'], y=short_plan[col], name=label, marker_color=color)
+            fig.update_layout(barmode='stack', title="Largest Shortfalls: How the Gap Is Covered",
+                              yaxis_title="Slots/day", legend_orientation='h')
+            plotly_chart(fig)
+            st.dataframe(short_plan[['District', 'State', 'Demand', 'Capacity', 'Gap', 'Extra_Slots', 'Vans', 'Shortfall']]
+                         .round(1), hide_index=True, width='stretch')
+
+        table_districts = int((capacity_inputs['Capacity_Source'] == 'table').sum())
+        if not table_districts:
+            st.info(f"ℹ️ **Capacity is inferred**: no district is listed in {os.path.basename(DISTRICT_CAPACITY_PATH)}, "
+                    f"so each district's capacity is the {THROUGHPUT_PERCENTILE}th percentile of its own daily updates. "
+                    "Demand comes from the same history, so gaps only show demand above past peaks. "
+                    f"Set DRISHTI_CAPACITY_TABLE to a centre slot table (format: data/{os.path.basename(SAMPLE_CAPACITY_PATH)}).")
+        st.caption(f"Budgets are allocated across all {national['districts']:,} districts "
+                   f"({national['extra_slots']:,} slots and {national['vans']} vans used, {plan_info['solver']} solver, "
+                   f"{plan_info['seconds'] * 1000:.0f} ms). Capacity: {table_districts:,} districts from "
+                   f"{os.path.basename(DISTRICT_CAPACITY_PATH)}, the rest from observed daily throughput.")
+
+end_span(section_span)
+
+# Export: the tables behind the charts and raw shard rows for the current filter (see export.py).
+# Files are written only when a download button is clicked.
+with st.sidebar.expander("📥 Export data"):
+    export_format = st.radio("Format", list(EXPORT_FORMATS), horizontal=True, key="export_format")
+    export_scope = selected_state if selected_district == "All" else f"{selected_district}, {selected_state}"
+    export_suffix = "_".join(part.replace(" ", "-") for part in (selected_state, selected_district) if part != "All") or "india"
+
+    export_name = st.selectbox("Metric table", list(EXPORT_TABLES), format_func=lambda name: EXPORT_TABLES[name][0],
+                               key="export_table")
+    st.download_button("Download table", key="export_table_download", mime=EXPORT_FORMATS[export_format],
+                       file_name=f"{export_name}_{export_suffix}.{export_format}", on_click="ignore",
+                       data=partial(buffered_export, export_table, export_name, metric_frames, view_key,
+                                    fmt=export_format, state=selected_state, district=selected_district))
+
+    raw_dataset = st.selectbox("Raw shard rows", ['enrolment', 'demographic', 'biometric'], key="export_raw")
+    st.caption(f"{export_scope if selected_state != 'All' else 'All India'}, {selected_window}")
+    st.download_button("Download raw rows", key="export_raw_download", mime=EXPORT_FORMATS[export_format],
+                       file_name=f"{raw_dataset}_{export_suffix}.{export_format}", on_click="ignore",
+                       data=partial(buffered_export, export_raw, raw_dataset, fmt=export_format,
+                                    states=[selected_state] if selected_state != "All" else None,
+                                    districts=[selected_district] if selected_district != "All" else None,
+                                    start=window_start, end=window_end))
+
+# Warm the metrics cache for the sections that are not on screen
+prefetch_sections([section for section in SECTION_JOBS if section != active_section], metric_frames, view_key)
 
 # Footer
 st.markdown("---")
 st.caption("UIDAI Data Hackathon 2026 | Team Arya")
+
+# Live data: poll the store and rerun when the watcher has swapped in a new version
+if WATCH_ENABLED:
+    @st.fragment(run_every=WATCH_INTERVAL)
+    def refresh_on_new_data(shown_version):
+        if get_store().version != shown_version:
+            st.rerun(scope="app")
+
+    refresh_on_new_data(data_version)
+
+# Performance breakdown (records are also appended to DRISHTI_PROFILE_LOG when set)
+run_records = finish_run(profile_run)
+with st.sidebar:
+    if st.checkbox("🛠️ Show performance breakdown", key="show_profile"):
+        st.markdown(f"**This rerun**: {run_records.loc[run_records['kind'] == 'section', 'seconds'].sum():.2f}s in sections")
+        st.dataframe(summarize(run_records)[['name', 'calls', 'total_s', 'max_s', 'peak_kb']], hide_index=True)
+        figure_stats = get_figure_cache().stats()
+        st.caption(f"Figure cache: {figure_stats['figures']} figures, {figure_stats['mb']} MB, "
+                   f"{figure_stats['hits']} hits / {figure_stats['misses']} misses")
+        with st.expander("All recent reruns & background jobs"):
+            st.dataframe(summarize(get_records()), hide_index=True)
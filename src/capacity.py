@@ -0,0 +1,259 @@
+import os
+import time
+
+import pandas as pd
+import numpy as np
+import streamlit as st
+
+from ingest import BASE_DIR, DATA_DIR
+from metrics import calculate_mbu_demand_forecast
+from profiling import timed
+from velocity import build_velocity_panel
+
+
+# =============================================================================
+# UPDATE-CENTRE CAPACITY PLANNING
+# Daily demand per district = recent update rate (mean updates/day over the last
+# DEMAND_WINDOW_DAYS of the update history) + the district's projected MBU demand
+# (metrics.calculate_mbu_demand_forecast) spread over a planning horizon.
+# Current capacity comes from the local capacity table (data/district_capacity.csv
+# under the data root, ingest.DATA_DIR: District, State, Daily_Slots; optional
+# Max_Extra_Slots, Max_Vans); districts it
+# does not list fall back to their demonstrated throughput, the
+# THROUGHPUT_PERCENTILE of their daily updates on reporting days. That fallback
+# is derived from the same update history as the demand, so without a table a
+# district only shows a gap when its demand exceeds its past peaks; the app says
+# so. data/district_capacity.sample.csv (illustrative slots for a few bundled
+# districts) shows the table format; point DRISHTI_CAPACITY_TABLE at it to try it.
+#
+# Extra fixed-centre slots (x) and mobile vans (v, VAN_DAILY_SLOTS each) are then
+# allocated across all districts in one mixed-integer program:
+#   min  Σ w_i u_i + ε Σ (x_i + V v_i)
+#   s.t. x_i + V v_i + u_i ≥ gap_i          (u_i: unmet slots/day)
+#        Σ x_i ≤ slot budget,  Σ v_i ≤ van budget
+#        0 ≤ x_i ≤ max extra slots_i,  v_i ∈ {0, .., max vans_i}
+# with w_i = 1 + MBU share of the district's demand (mandatory updates first) and
+# ε a small resource cost, so budgets are not spent past a district's gap. Only
+# districts with a gap enter the program; it is solved with HiGHS
+# (scipy.optimize.milp), or by a vectorized greedy with the same bounds when
+# scipy is unavailable or the solver fails.
+#
+# Environment:
+#   DRISHTI_CAPACITY_TABLE=<path>        capacity table (default <data root>/data/district_capacity.csv)
+#   DRISHTI_VAN_DAILY_SLOTS=<slots>      slots/day served by one mobile van (default 60)
+#   DRISHTI_CAPACITY_SOLVER=greedy       skip the MILP and use the greedy allocation
+# =============================================================================
+
+DISTRICT_CAPACITY_PATH = os.environ.get('DRISHTI_CAPACITY_TABLE',
+                                        os.path.join(DATA_DIR, 'data', 'district_capacity.csv'))
+# Example table shipped with the repo (illustrative values, not loaded unless configured)
+SAMPLE_CAPACITY_PATH = os.path.join(BASE_DIR, 'data', 'district_capacity.sample.csv')
+
+VAN_DAILY_SLOTS = int(os.environ.get('DRISHTI_VAN_DAILY_SLOTS', '60'))
+CAPACITY_SOLVER = os.environ.get('DRISHTI_CAPACITY_SOLVER', 'milp')
+
+DEMAND_WINDOW_DAYS = 30
+THROUGHPUT_PERCENTILE = 90
+# Bounds for districts the capacity table does not constrain
+MAX_EXPANSION_SHARE = 0.5
+MAX_VANS_PER_DISTRICT = 3
+# Objective cost per slot/day added (well below the smallest shortfall weight of 1)
+RESOURCE_COST = 1e-3
+SOLVER_TIME_LIMIT = 5.0
+
+
+def load_capacity_table(path=DISTRICT_CAPACITY_PATH):
+    """
+    Loads the local centre capacity table (columns: District, State, Daily_Slots; optional
+    Max_Extra_Slots, Max_Vans). Returns an empty frame when the file is not present.
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['District', 'State', 'Daily_Slots'])
+    table = pd.read_csv(path)
+    missing = {'District', 'State', 'Daily_Slots'} - set(table.columns)
+    if missing:
+        raise ValueError(f"{path} is missing column(s): {', '.join(sorted(missing))}")
+    return table.drop_duplicates(['District', 'State'], keep='last')
+
+
+@timed
+def capacity_base(df_enr, df_upd, capacity_table=None):
+    """
+    Per-district planning inputs that do not depend on the budgets.
+
+    Returns DataFrame: District, State, Update_Daily, Total_MBU_Demand, Capacity,
+    Capacity_Source ('table' / 'observed'), Max_Extra_Slots, Max_Vans.
+    """
+    units, days, counts = build_velocity_panel(df_upd)
+    units = units.copy()
+    window = min(DEMAND_WINDOW_DAYS, counts.shape[1])
+    units['Update_Daily'] = counts[:, -window:].sum(axis=1) / window if window else 0.0
+    # Demonstrated throughput: a high percentile of the days the district reported updates
+    reported = np.where(counts > 0, counts, np.nan)
+    observed = np.zeros(len(units))
+    has_days = (counts > 0).any(axis=1) if counts.size else np.zeros(len(units), dtype=bool)
+    if has_days.any():
+        observed[has_days] = np.nanpercentile(reported[has_days], THROUGHPUT_PERCENTILE, axis=1)
+    units['Observed_Capacity'] = observed
+
+    mbu = calculate_mbu_demand_forecast(df_enr, by=('District', 'State'))[['District', 'State', 'Total_MBU_Demand']] \
+        if not df_enr.empty else pd.DataFrame(columns=['District', 'State', 'Total_MBU_Demand'])
+    base = units.merge(mbu, on=['District', 'State'], how='outer')
+    base[['Update_Daily', 'Observed_Capacity', 'Total_MBU_Demand']] = \
+        base[['Update_Daily', 'Observed_Capacity', 'Total_MBU_Demand']].fillna(0).astype(float)
+
+    if capacity_table is not None and not capacity_table.empty:
+        base = base.merge(capacity_table, on=['District', 'State'], how='left')
+    for col in ['Daily_Slots', 'Max_Extra_Slots', 'Max_Vans']:
+        if col not in base.columns:
+            base[col] = np.nan
+    listed = base['Daily_Slots'].notna()
+    base['Capacity'] = base['Daily_Slots'].where(listed, base['Observed_Capacity']).astype(float)
+    base['Capacity_Source'] = np.where(listed, 'table', 'observed')
+    base['Max_Extra_Slots'] = base['Max_Extra_Slots'].fillna(base['Capacity'] * MAX_EXPANSION_SHARE).astype(float)
+    base['Max_Vans'] = base['Max_Vans'].fillna(MAX_VANS_PER_DISTRICT).astype(int)
+
+    base = base.sort_values(['State', 'District']).reset_index(drop=True)
+    return base[['District', 'State', 'Update_Daily', 'Total_MBU_Demand', 'Capacity', 'Capacity_Source',
+                 'Max_Extra_Slots', 'Max_Vans']]
+
+
+def _solve_milp(gap, weight, max_slots, max_vans, extra_slots, vans, van_slots):
+    # Variables [x (n), v (n), u (n)]; None when scipy or the solver gives no solution
+    try:
+        from scipy import sparse
+        from scipy.optimize import Bounds, LinearConstraint, milp
+    except ImportError:
+        return None
+
+    n = len(gap)
+    eye = sparse.identity(n, format='csr')
+    cover = sparse.hstack([eye, van_slots * eye, eye])
+    budgets = sparse.vstack([
+        sparse.hstack([np.ones((1, n)), sparse.csr_matrix((1, 2 * n))]),
+        sparse.hstack([sparse.csr_matrix((1, n)), np.ones((1, n)), sparse.csr_matrix((1, n))]),
+    ])
+    constraints = [
+        LinearConstraint(cover, lb=gap, ub=np.inf),
+        LinearConstraint(budgets, lb=-np.inf, ub=[extra_slots, vans]),
+    ]
+    cost = np.r_[np.full(n, RESOURCE_COST), np.full(n, RESOURCE_COST * van_slots), weight]
+    bounds = Bounds(np.zeros(3 * n), np.r_[max_slots, max_vans, gap])
+    integrality = np.r_[np.zeros(n), np.ones(n), np.zeros(n)]
+    result = milp(cost, constraints=constraints, bounds=bounds, integrality=integrality,
+                  options={'time_limit': SOLVER_TIME_LIMIT})
+    if result.x is None:
+        return None
+    return result.x[:n], np.round(result.x[n:2 * n])
+
+
+def _solve_greedy(gap, weight, max_slots, max_vans, extra_slots, vans, van_slots):
+    # Vans first, as whole units: the k-th van of a district covers what is left of its gap
+    # after k - 1 vans, and units are taken by weighted cover until the fleet is used up
+    useful = np.minimum(max_vans, np.ceil(gap / van_slots)).astype(np.int64)
+    district = np.repeat(np.arange(len(gap)), useful)
+    k = np.arange(len(district)) - np.repeat(np.cumsum(useful) - useful, useful)
+    cover = np.minimum(van_slots, gap[district] - k * van_slots)
+    taken = np.argsort(-(weight[district] * cover), kind='stable')[:int(vans)]
+    v = np.bincount(district[taken], minlength=len(gap)).astype(float)
+
+    # Then slots, by weight, up to each district's remaining gap and expansion bound
+    need = np.minimum(np.maximum(gap - v * van_slots, 0), max_slots)
+    order = np.argsort(-weight, kind='stable')
+    before = np.cumsum(need[order]) - need[order]
+    x = np.zeros(len(gap))
+    x[order] = np.clip(extra_slots - before, 0, need[order])
+    return x, v
+
+
+@timed
+def plan_capacity(base, horizon_days=180, extra_slots=0, vans=0, van_slots=VAN_DAILY_SLOTS, solver=CAPACITY_SOLVER):
+    """
+    Allocates `extra_slots` slots/day to fixed centres and `vans` mobile vans across all districts
+    of `base` (see capacity_base), with the projected MBU demand spread over `horizon_days`.
+
+    Returns (plan, info): plan adds MBU_Daily, Demand, Gap, Extra_Slots, Vans, Van_Slots and
+    Shortfall (unmet slots/day after the allocation) to `base`; info = {'solver', 'seconds'}.
+    """
+    plan = base.copy()
+    plan['MBU_Daily'] = plan['Total_MBU_Demand'] / max(horizon_days, 1)
+    plan['Demand'] = plan['Update_Daily'] + plan['MBU_Daily']
+    plan['Gap'] = np.maximum(plan['Demand'] - plan['Capacity'], 0)
+
+    start = time.perf_counter()
+    short = np.flatnonzero(plan['Gap'].to_numpy() > 0)
+    gap = plan['Gap'].to_numpy()[short]
+    weight = 1 + plan['MBU_Daily'].to_numpy()[short] / plan['Demand'].to_numpy()[short]
+    bounds = (plan['Max_Extra_Slots'].to_numpy(dtype=float)[short], plan['Max_Vans'].to_numpy(dtype=float)[short])
+
+    allocation, used = None, 'greedy'
+    if len(short) and solver == 'milp':
+        allocation, used = _solve_milp(gap, weight, *bounds, extra_slots, vans, van_slots), 'milp'
+    if allocation is None:
+        allocation, used = _solve_greedy(gap, weight, *bounds, extra_slots, vans, van_slots), 'greedy'
+    x, v = allocation
+
+    # Slots are whole; rounding down keeps the allocation within budget
+    plan['Extra_Slots'] = 0
+    plan['Vans'] = 0
+    plan.loc[short, 'Extra_Slots'] = np.floor(x + 1e-6).astype(int)
+    plan.loc[short, 'Vans'] = v.astype(int)
+    plan['Van_Slots'] = plan['Vans'] * van_slots
+    plan['Shortfall'] = np.maximum(plan['Gap'] - plan['Extra_Slots'] - plan['Van_Slots'], 0)
+    return plan, {'solver': used if len(short) else 'none', 'seconds': time.perf_counter() - start}
+
+
+def plan_summary(plan):
+    """
+    Totals of a capacity plan (slots/day): demand, capacity, gap before and shortfall after the
+    allocation, resources used, and the number of districts short before / after.
+    """
+    return {
+        'districts': len(plan),
+        'demand': float(plan['Demand'].sum()),
+        'capacity': float(plan['Capacity'].sum()),
+        'gap': float(plan['Gap'].sum()),
+        'shortfall': float(plan['Shortfall'].sum()),
+        'extra_slots': int(plan['Extra_Slots'].sum()),
+        'vans': int(plan['Vans'].sum()),
+        'short_before': int((plan['Gap'] > 0.5).sum()),
+        'short_after': int((plan['Shortfall'] > 0.5).sum()),
+    }
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def cached_capacity_base(dataset_version, date_window, _df_enr, _df_upd):
+    """
+    capacity_base (with the local capacity table) cached per (dataset version, date window).
+    """
+    return capacity_base(_df_enr, _df_upd, load_capacity_table())
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_capacity_plan(dataset_version, date_window, horizon_days, extra_slots, vans, _base):
+    """
+    plan_capacity cached per budget, so moving a slider back to an earlier budget is free.
+    """
+    return plan_capacity(_base, horizon_days, extra_slots, vans)
+
+
+if __name__ == '__main__':
+    from data_loader import load_data
+
+    df_enr, df_upd = load_data()
+    base = capacity_base(df_enr, df_upd, load_capacity_table())
+    sample = capacity_base(df_enr, df_upd, load_capacity_table(SAMPLE_CAPACITY_PATH))
+    # Stress instances: capacity cut to a fifth, and the districts repeated under renamed states
+    tight = base.assign(Capacity=base['Capacity'] * 0.2, Max_Extra_Slots=base['Max_Extra_Slots'] * 0.2)
+    scaled = pd.concat([tight.assign(State=tight['State'] + f' #{i}') for i in range(8)], ignore_index=True)
+
+    for name, frame in [('bundled', base), ('sample table', sample), ('capacity/5', tight), ('capacity/5 8x', scaled)]:
+        probe, _ = plan_capacity(frame, solver='greedy')
+        gap = probe['Gap'].sum()
+        budget = (int(gap * 0.3), int(gap * 0.3 / VAN_DAILY_SLOTS))
+        for solver in ['milp', 'greedy']:
+            plan, info = plan_capacity(frame, extra_slots=budget[0], vans=budget[1], solver=solver)
+            summary = plan_summary(plan)
+            print(f"{name:<14} {summary['short_before']:>5} short districts  gap {summary['gap']:>9,.0f}  "
+                  f"{solver:<6} {info['seconds'] * 1000:7.1f} ms  shortfall {summary['shortfall']:>9,.0f}  "
+                  f"slots {summary['extra_slots']:>7,}  vans {summary['vans']:>4,}")
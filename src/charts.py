@@ -0,0 +1,164 @@
+import pandas as pd
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+# =============================================================================
+# CHART DATA LAYER
+# Bounds the number of points sent to the browser: long series are reduced with
+# LTTB (lines) or bucket sums (bars), dense scatters are binned server-side, and
+# traces switch to WebGL above a point threshold.
+# =============================================================================
+
+MAX_LINE_POINTS = 1000
+MAX_BAR_POINTS = 400
+MAX_SCATTER_POINTS = 2000
+# Below MAX_LINE_POINTS, so a line kept at the downsampling limit is still drawn with WebGL
+WEBGL_THRESHOLD = 500
+
+
+def _as_numeric(values):
+    # LTTB needs a numeric x axis; datetimes are compared as int64 nanoseconds
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').to_numpy(dtype=float)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float)
+    return np.arange(len(values), dtype=float)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of the n_out points that best preserve the line's shape.
+    Always keeps the first and last point.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (the last bucket averages just the final point)
+        nlo, nhi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+
+        area = np.abs((x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev]))
+        prev = lo + int(area.argmax())
+        selected[i + 1] = prev
+
+    return selected
+
+
+def downsample_line(df, x, y, max_points=MAX_LINE_POINTS):
+    """
+    Returns at most `max_points` rows of a line series, chosen by LTTB on column `y`.
+    """
+    if len(df) <= max_points:
+        return df
+    return df.iloc[lttb_indices(_as_numeric(df[x]), df[y].to_numpy(dtype=float), max_points)]
+
+
+def bucket_sum(df, x, y_cols, max_points=MAX_BAR_POINTS):
+    """
+    Merges consecutive rows into at most `max_points` buckets, summing `y_cols`
+    (bar heights stay true totals). Each bucket is labelled with its first x value.
+    """
+    if len(df) <= max_points:
+        return df
+    bucket = np.arange(len(df)) * max_points // len(df)
+    grouped = df.groupby(bucket, sort=True)
+    out = grouped[list(y_cols)].sum()
+    out[x] = grouped[x].first()
+    return out.reset_index(drop=True)[[x] + list(y_cols)]
+
+
+def _bin_cells(data, x, y, size, color, hover_name, order_col, bins):
+    # One row per (x bin, y bin[, colour]) cell of rows already sorted by `order_col`, largest first
+    data = data.copy()
+    keys = []
+    for axis in (x, y):
+        if pd.api.types.is_numeric_dtype(data[axis]):
+            data[f'_{axis}_bin'] = pd.cut(data[axis], bins=bins, labels=False, include_lowest=True)
+        else:
+            data[f'_{axis}_bin'] = data[axis]
+        keys.append(f'_{axis}_bin')
+    # Categorical colours split cells; continuous colours are averaged within a cell
+    color_is_numeric = color is not None and pd.api.types.is_numeric_dtype(data[color])
+    if color is not None and not color_is_numeric:
+        keys.append(color)
+    grouped = data.groupby(keys, sort=False, dropna=False)
+
+    agg = {}
+    for axis in (x, y):
+        agg[axis] = (axis, 'mean') if pd.api.types.is_numeric_dtype(data[axis]) else (axis, 'first')
+    if size is not None:
+        agg[size] = (size, 'sum')
+    if color_is_numeric:
+        agg[color] = (color, 'mean')
+    if hover_name is not None:
+        agg[hover_name] = (hover_name, 'first')
+    agg['Points'] = (order_col, 'size')
+    return grouped.agg(**agg).reset_index().drop(columns=[k for k in keys if k.startswith('_')])
+
+
+def bin_scatter(df, x, y, size=None, color=None, hover_name=None, max_points=MAX_SCATTER_POINTS, bins=60):
+    """
+    Aggregates a dense scatter onto a bins × bins grid (per colour group), returning at most
+    `max_points` cells. Numeric axes are binned; categorical axes keep their categories.
+    Each cell is drawn at the mean position with summed `size`, a 'Points' count,
+    and the hover name of its largest member.
+    Categories multiply the cells, so the bins are halved until the cells fit; when the
+    categories alone exceed the bound, only the largest colour groups (then cells) are kept.
+    """
+    if len(df) <= max_points:
+        return df
+
+    # Representative row per cell: the largest point (by size) keeps its hover name
+    order_col = size if size is not None else y
+    data = df.sort_values(order_col, ascending=False, kind='stable')
+    cells = _bin_cells(data, x, y, size, color, hover_name, order_col, bins)
+    while len(cells) > max_points and bins > 1:
+        bins //= 2
+        cells = _bin_cells(data, x, y, size, color, hover_name, order_col, bins)
+
+    weight = size if size is not None else 'Points'
+    if len(cells) > max_points and color is not None and not pd.api.types.is_numeric_dtype(cells[color]):
+        # Colour groups by total weight; keep as many whole groups as fit
+        totals = cells.groupby(color, dropna=False)[weight].sum().sort_values(ascending=False)
+        counts = cells[color].value_counts(dropna=False).reindex(totals.index)
+        kept = totals.index[(counts.cumsum() <= max_points).to_numpy()]
+        if len(kept):
+            cells = cells[cells[color].isin(kept)]
+    if len(cells) > max_points:
+        cells = cells.nlargest(max_points, weight)
+    assert len(cells) <= max_points
+    return cells.reset_index(drop=True)
+
+
+def scatter_figure(df, x, y, size=None, color=None, hover_name=None, max_points=MAX_SCATTER_POINTS, **px_kwargs):
+    """
+    px.scatter with server-side binning above `max_points` and WebGL rendering above WEBGL_THRESHOLD.
+    """
+    data = bin_scatter(df, x, y, size=size, color=color, hover_name=hover_name, max_points=max_points)
+    if 'Points' in data.columns:
+        px_kwargs.setdefault('hover_data', ['Points'])
+
+    render_mode = 'webgl' if len(data) > WEBGL_THRESHOLD else 'auto'
+    return px.scatter(data, x=x, y=y, size=size, color=color, hover_name=hover_name,
+                      render_mode=render_mode, **px_kwargs)
+
+
+def line_trace(x, y, **trace_kwargs):
+    """
+    go.Scatter line, or go.Scattergl when there are more than WEBGL_THRESHOLD points.
+    """
+    trace_cls = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+    return trace_cls(x=x, y=y, **trace_kwargs)
@@ -1,84 +1,167 @@
 import pandas as pd
-import geopandas as gpd
 import streamlit as st
 import os
 
-@st.cache_data
-def load_data():
+from ingest import read_shards, list_shards, iter_shard_chunks, DATASET_DIRS, VALUE_COLS
+from profiling import timed
+from time_index import sort_by_date
+from kernel import add_key_codes
+from prefix_sums import build_prefix_cube, ENROLMENT_COLS, UPDATE_COLS
+
+def prepare_enrolment(df_enr):
     """
-    Loads Enrolment, Demographic, and Biometric data from split CSVs.
+    Raw enrolment shard rows → dashboard schema (State, District, Month, Date, Enrolment_Count, ...).
+    """
+    # Calculate Total Enrolment
+    # Fill NaNs with 0 just in case
+    df_enr.fillna(0, inplace=True)
+    df_enr['Enrolment_Count'] = df_enr['age_0_5'] + df_enr['age_5_17'] + df_enr['age_18_greater']
+
+    # Standardize columns for merging/plotting
+    # Rename 'date' -> 'Month' or ensure format if needed.
+    # The CSV has 'date' like '09-03-2025'.
+    # For uniformity with app logic, let's keep 'State' and 'District' proper case if needed.
+    # Column names in CSV: 'state', 'district'. App uses 'State'.
+    df_enr.rename(columns={'state': 'State', 'district': 'District', 'date': 'Month'}, inplace=True)
+    # Parse dates once and keep rows in date order (see time_index.slice_dates)
+    return sort_by_date(df_enr)
+
+def prepare_updates(df, update_type):
+    """
+    Raw demographic/biometric shard rows → dashboard schema (Count, Type, Age_5_17, Age_17_Plus, ...).
+    Not date-sorted: the update types are combined first.
+    """
+    prefix = 'demo' if update_type == 'Demographic' else 'bio'
+    df.fillna(0, inplace=True)
+    df['Count'] = df[f'{prefix}_age_5_17'] + df[f'{prefix}_age_17_']
+    df.rename(columns={'state': 'State', 'district': 'District', 'date': 'Month'}, inplace=True)
+    df['Type'] = update_type
+    # Preserve age columns for detailed analysis
+    df.rename(columns={f'{prefix}_age_5_17': 'Age_5_17', f'{prefix}_age_17_': 'Age_17_Plus'}, inplace=True)
+    return df
+
+def read_datasets(only=None):
+    """
+    Reads and prepares Enrolment and combined Demographic/Biometric updates from the shards.
+    With `only` (a set of shard paths), just those shards are read (see ingest.read_shards).
     """
-    import glob
-    
-    # Base Path
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
     # 1. Load Enrolment Data
-    enr_path = os.path.join(base_dir, 'api_data_aadhar_enrolment', '*.csv')
-    enr_files = glob.glob(enr_path)
+    enr_files = list_shards(DATASET_DIRS['enrolment'])
     if enr_files:
-        df_enr = pd.concat((pd.read_csv(f) for f in enr_files), ignore_index=True)
-        # Calculate Total Enrolment
-        # Fill NaNs with 0 just in case
-        df_enr.fillna(0, inplace=True)
-        df_enr['Enrolment_Count'] = df_enr['age_0_5'] + df_enr['age_5_17'] + df_enr['age_18_greater']
-        
-        # Standardize columns for merging/plotting
-        # Rename 'date' -> 'Month' or ensure format if needed. 
-        # The CSV has 'date' like '09-03-2025'.
-        # For uniformity with app logic, let's keep 'State' and 'District' proper case if needed.
-        # Column names in CSV: 'state', 'district'. App uses 'State'.
-        df_enr.rename(columns={'state': 'State', 'district': 'District', 'date': 'Month'}, inplace=True)
+        df_enr = read_shards(enr_files, 'enrolment', only=only)
+        df_enr = prepare_enrolment(df_enr) if not df_enr.empty else pd.DataFrame()
     else:
         st.error("No Enrolment Data Found!")
         df_enr = pd.DataFrame()
 
-    # 2. Load Demographic Update Data
-    demo_path = os.path.join(base_dir, 'api_data_aadhar_demographic', '*.csv')
-    demo_files = glob.glob(demo_path)
-    if demo_files:
-        df_demo = pd.concat((pd.read_csv(f) for f in demo_files), ignore_index=True)
-        df_demo.fillna(0, inplace=True)
-        df_demo['Count'] = df_demo['demo_age_5_17'] + df_demo['demo_age_17_']
-        df_demo.rename(columns={'state': 'State', 'district': 'District', 'date': 'Month'}, inplace=True)
-        df_demo['Type'] = 'Demographic'
-        # Preserve age columns for detailed analysis
-        df_demo.rename(columns={'demo_age_5_17': 'Age_5_17', 'demo_age_17_': 'Age_17_Plus'}, inplace=True)
-    else:
-        df_demo = pd.DataFrame()
-
-    # 3. Load Biometric Update Data
-    bio_path = os.path.join(base_dir, 'api_data_aadhar_biometric', '*.csv')
-    bio_files = glob.glob(bio_path)
-    if bio_files:
-        df_bio = pd.concat((pd.read_csv(f) for f in bio_files), ignore_index=True)
-        df_bio.fillna(0, inplace=True)
-        df_bio['Count'] = df_bio['bio_age_5_17'] + df_bio['bio_age_17_']
-        df_bio.rename(columns={'state': 'State', 'district': 'District', 'date': 'Month'}, inplace=True)
-        df_bio['Type'] = 'Biometric'
-        # Preserve age columns for detailed analysis
-        df_bio.rename(columns={'bio_age_5_17': 'Age_5_17', 'bio_age_17_': 'Age_17_Plus'}, inplace=True)
-    else:
-        df_bio = pd.DataFrame()
+    # 2./3. Load Demographic and Biometric Update Data
+    updates = []
+    for dataset, update_type in [('demographic', 'Demographic'), ('biometric', 'Biometric')]:
+        files = list_shards(DATASET_DIRS[dataset])
+        df = read_shards(files, dataset, only=only) if files else pd.DataFrame()
+        updates.append(prepare_updates(df, update_type) if not df.empty else pd.DataFrame())
 
     # Combine Updates into one DataFrame (similar to original df_upd)
-    df_upd = pd.concat([df_demo, df_bio], ignore_index=True)
+    df_upd = sort_by_date(pd.concat(updates, ignore_index=True))
+
+    # Integer group keys for the aggregation kernel (see kernel.py)
+    return add_key_codes(df_enr), add_key_codes(df_upd)
+
+@st.cache_data
+@timed
+def load_data():
+    """
+    Loads Enrolment, Demographic, and Biometric data from split CSVs.
+    """
+    return read_datasets()
+
+@st.cache_data
+@timed
+def load_geodata():
+    """
+    Loads the district GeoJSON. Kept out of load_data so geopandas is only imported
+    by the sections that draw or analyse district polygons.
+    """
+    import geopandas as gpd
 
-    # 4. Load GeoJSON
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     geojson_path = os.path.join(base_dir, 'data', 'india_districts.geojson')
     if os.path.exists(geojson_path):
-        gdf = gpd.read_file(geojson_path)
-    else:
-        gdf = gpd.GeoDataFrame()
-    
-    return df_enr, df_upd, gdf
+        return gpd.read_file(geojson_path)
+    return gpd.GeoDataFrame()
+
+@timed
+def build_prefix_cubes(df_enr, df_upd):
+    """
+    Builds prefix-sum cubes over (district, day) for Enrolment, Demographic and Biometric counts.
+    The arrays are read-only, so one set is shared by all sessions without copying.
+    """
+    cubes = {'Enrolment': build_prefix_cube(df_enr, ENROLMENT_COLS)}
+    for update_type in ['Demographic', 'Biometric']:
+        df_type = df_upd[df_upd['Type'] == update_type] if 'Type' in df_upd.columns else pd.DataFrame()
+        cubes[update_type] = build_prefix_cube(df_type, UPDATE_COLS)
+
+    return cubes
+
+@timed
+def build_sketches(files_by_dataset=None):
+    """
+    Distinct-pincode and update-size sketches (see sketches.py), built by streaming the shards
+    in chunks so the full history never has to be held in memory.
+    `files_by_dataset` ({dataset: [paths]}) defaults to every shard.
+    """
+    from sketches import SketchSet
+
+    if files_by_dataset is None:
+        files_by_dataset = {dataset: list_shards(shard_dir) for dataset, shard_dir in DATASET_DIRS.items()}
+    sketches = SketchSet()
+    for dataset, files in files_by_dataset.items():
+        for _, chunk in iter_shard_chunks(files, dataset):
+            sketches.update(chunk, dataset, VALUE_COLS[dataset])
+    return sketches
 
-def merge_for_map(gdf, df_metrics, metric_col):
+@st.cache_resource
+@timed
+def load_district_index():
+    """
+    STRtree over the GeoJSON district polygons (see spatial.py), built once per process.
+    """
+    from spatial import build_district_index
+    return build_district_index(load_geodata())
+
+@st.cache_resource
+@timed
+def load_district_adjacency():
+    """
+    Sparse contiguity matrix between GeoJSON districts (see hotspots.build_adjacency), built once per process.
+    """
+    from hotspots import build_adjacency
+    return build_adjacency(load_district_index())
+
+@st.cache_data(max_entries=2)
+@timed
+def load_district_crosswalk(dataset_version, _df_enr, _df_upd):
+    """
+    Data district → GeoJSON district mapping derived from pincode centroids (data/pincode_centroids.csv),
+    cached per dataset version. Empty when the GeoJSON or the centroid lookup is missing.
+    """
+    from spatial import build_district_crosswalk, load_pincode_centroids
+
+    df_enr, df_upd = _df_enr, _df_upd
+    df_all = pd.concat([df[['District', 'State', 'pincode']] for df in (df_enr, df_upd) if 'pincode' in df.columns],
+                       ignore_index=True) if not (df_enr.empty and df_upd.empty) else pd.DataFrame()
+    return build_district_crosswalk(df_all, load_district_index(), load_pincode_centroids())
+
+@timed
+def merge_for_map(gdf, df_metrics, metric_col, crosswalk=None):
     """
     Merges metric dataframe with GeoDataFrame for plotting.
+    Districts whose name has no match in the GeoJSON are matched through the
+    spatial `crosswalk` (see load_district_crosswalk) when one is given.
     """
     # Handle empty GeoDataFrame (no GeoJSON file)
     if gdf.empty or 'district' not in gdf.columns:
+        import geopandas as gpd
         return gpd.GeoDataFrame()
 
     # Create copies for case-insensitive matching
@@ -87,7 +170,21 @@ def merge_for_map(gdf, df_metrics, metric_col):
 
     # Normalize district names for better matching
     gdf_copy['district_lower'] = gdf_copy['district'].str.lower().str.strip()
-    df_copy['District_lower'] = df_copy['District'].str.lower().str.strip()
+    df_copy['District_lower'] = df_copy['District'].astype(str).str.lower().str.strip()
+
+    # Fall back to the spatial crosswalk for names the GeoJSON does not know
+    if crosswalk is not None and not crosswalk.empty:
+        # Positional alignment with the merge result below needs a fresh RangeIndex
+        df_copy = df_copy.reset_index(drop=True)
+        unmatched = ~df_copy['District_lower'].isin(set(gdf_copy['district_lower']))
+        lookup = crosswalk[['District', 'State', 'Geo_District']].drop_duplicates(['District', 'State'])
+        geo_names = df_copy[['District', 'State']].merge(lookup, on=['District', 'State'], how='left')['Geo_District']
+        geo_names = geo_names.astype(str).str.lower().str.strip().where(geo_names.notna())
+        df_copy.loc[unmatched, 'District_lower'] = geo_names[unmatched].fillna(df_copy.loc[unmatched, 'District_lower'])
+        # A polygon keeps its direct name match; otherwise only the first crosswalk match is drawn
+        direct_names = set(df_copy.loc[~unmatched, 'District_lower'])
+        redundant = unmatched & (df_copy['District_lower'].isin(direct_names) | df_copy['District_lower'].where(unmatched).duplicated())
+        df_copy = df_copy[~redundant]
 
     # Merge on normalized names
     merged = gdf_copy.merge(df_copy, left_on='district_lower', right_on='District_lower', how='left')
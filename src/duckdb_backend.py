@@ -0,0 +1,481 @@
+import glob
+import os
+
+import pandas as pd
+import numpy as np
+
+try:
+    import duckdb
+except ImportError:  # optional dependency
+    duckdb = None
+
+from ingest import DATA_DIR, DATASET_DIRS, VALUE_COLS
+from velocity import build_velocity_panel, compute_velocity
+from metrics import get_district_rolling_correlation as _rolling_correlation_from_frames
+from metrics import get_age_milestone_correlation as _milestone_correlation_from_frames
+
+
+# =============================================================================
+# DUCKDB QUERY BACKEND (OPTIONAL)
+# SQL versions of the metrics.py functions that scan the raw shards directly
+# (Parquet when present, else CSV) with DuckDB's multi-threaded engine. The
+# State/District/date filters are WHERE clauses on the shard views, so they are
+# pushed into the scans instead of being applied to materialized frames. Only
+# small aggregated results come back to pandas for the final derived columns,
+# which keep the exact formulas (and rounding) of metrics.py.
+#
+# Enable in the app with DRISHTI_BACKEND=duckdb (see prefetch.py); compare with
+# the pandas path with `python src/duckdb_backend.py`. `--fixture` runs the same
+# comparison on overlapping shards that arrive out of name order (exit status 1
+# on a mismatch, for CI): both backends must keep the first shard's copy of a key.
+# =============================================================================
+
+def is_available():
+    return duckdb is not None
+
+
+# Dedup key expressions, normalized like ingest.normalize_keys (stripped text, dd-mm-YYYY dates as
+# YYYY-MM-DD, numeric pincodes as integers) so both backends agree on which rows repeat
+_KEY_EXPRS = (
+    "coalesce(strftime(try_strptime(trim(CAST(date AS VARCHAR)), '%d-%m-%Y'), '%Y-%m-%d'), "
+    "trim(CAST(date AS VARCHAR)))",
+    "trim(state)",
+    "trim(district)",
+    "coalesce(CAST(CAST(round(try_cast(trim(CAST(pincode AS VARCHAR)) AS DOUBLE)) AS BIGINT) AS VARCHAR), "
+    "trim(CAST(pincode AS VARCHAR)))",
+)
+
+
+def _shard_source(dataset, base_dir):
+    """
+    FROM clause over one dataset's shards, deduplicated like ingest.read_shards:
+    a (date, state, district, pincode) key is kept only by the first shard (file name order) holding it.
+    """
+    dataset_dir = os.path.join(base_dir, DATASET_DIRS[dataset])
+    parquet = sorted(glob.glob(os.path.join(dataset_dir, '*.parquet')))
+    csv = sorted(glob.glob(os.path.join(dataset_dir, '*.csv')))
+    values = ", ".join(f"coalesce(try_cast({col} AS DOUBLE), 0) AS {col}" for col in VALUE_COLS[dataset])
+
+    if not (parquet or csv):
+        empty = ", ".join(f"0::DOUBLE AS {col}" for col in VALUE_COLS[dataset])
+        return (f"(SELECT NULL::VARCHAR AS date, NULL::VARCHAR AS state, NULL::VARCHAR AS district, "
+                f"NULL::VARCHAR AS pincode, {empty} WHERE false)")
+
+    files = "[" + ", ".join("'" + path.replace("'", "''") + "'" for path in (parquet or csv)) + "]"
+    reader = (f"read_parquet({files}, filename = true, union_by_name = true)" if parquet else
+              f"read_csv({files}, all_varchar = true, filename = true, union_by_name = true)")
+    return (f"(SELECT CAST(date AS VARCHAR) AS date, state, district, CAST(pincode AS VARCHAR) AS pincode, {values} "
+            f"FROM {reader} "
+            f"QUALIFY filename = min(filename) OVER (PARTITION BY {', '.join(_KEY_EXPRS)}))")
+
+
+def connect(base_dir=DATA_DIR, threads=None):
+    """
+    In-memory DuckDB connection with the views `enrolment` and `updates`, shaped like the
+    frames returned by data_loader.load_data (State, District, Date, age columns, counts, Type).
+    Use one cursor per thread (the query functions below call con.cursor()).
+    """
+    if duckdb is None:
+        raise ImportError("The DuckDB backend needs the optional 'duckdb' package (pip install duckdb)")
+
+    con = duckdb.connect(database=':memory:')
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+
+    con.execute(f"""
+        CREATE VIEW enrolment AS
+        SELECT state AS State, district AS District, try_cast(pincode AS BIGINT) AS pincode,
+               CAST(try_strptime(date, '%d-%m-%Y') AS DATE) AS Date,
+               age_0_5, age_5_17, age_18_greater,
+               age_0_5 + age_5_17 + age_18_greater AS Enrolment_Count
+        FROM {_shard_source('enrolment', base_dir)}
+    """)
+    con.execute(f"""
+        CREATE VIEW updates AS
+        SELECT state AS State, district AS District, try_cast(pincode AS BIGINT) AS pincode,
+               CAST(try_strptime(date, '%d-%m-%Y') AS DATE) AS Date,
+               demo_age_5_17 AS Age_5_17, demo_age_17_ AS Age_17_Plus,
+               demo_age_5_17 + demo_age_17_ AS Count, 'Demographic' AS Type
+        FROM {_shard_source('demographic', base_dir)}
+        UNION ALL
+        SELECT state, district, try_cast(pincode AS BIGINT),
+               CAST(try_strptime(date, '%d-%m-%Y') AS DATE),
+               bio_age_5_17, bio_age_17_, bio_age_5_17 + bio_age_17_, 'Biometric'
+        FROM {_shard_source('biometric', base_dir)}
+    """)
+    return con
+
+
+def _filters(state=None, district=None, start=None, end=None, dated=False):
+    """
+    WHERE clause and parameters for the dashboard filters ('All'/None = no filter).
+    `dated` also drops rows without a parseable date (pandas drops NaT group keys).
+    """
+    clauses, params = [], []
+    if state and state != 'All':
+        clauses.append("State = ?")
+        params.append(state)
+    if district and district != 'All':
+        clauses.append("District = ?")
+        params.append(district)
+    if start is not None:
+        clauses.append("Date >= CAST(? AS DATE)")
+        params.append(str(pd.Timestamp(start).date()))
+    if end is not None:
+        clauses.append("Date <= CAST(? AS DATE)")
+        params.append(str(pd.Timestamp(end).date()))
+    if dated:
+        clauses.append("Date IS NOT NULL")
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _query(con, sql, params=()):
+    return con.cursor().execute(sql, list(params)).df()
+
+
+def _grouped(con, view, keys, sums, dated=False, extra_where=None, **filters):
+    # SELECT keys, sum(col) AS col ... GROUP BY keys ORDER BY keys (pandas groupby order)
+    where, params = _filters(dated=dated, **filters)
+    if extra_where:
+        where = (where + " AND " if where else "WHERE ") + extra_where
+    select = ", ".join(list(keys) + [f"sum({col}) AS {col}" for col in sums])
+    group = ", ".join(str(i + 1) for i in range(len(keys)))
+    grouping = f"GROUP BY {group} ORDER BY {group}" if keys else ""
+    return _query(con, f"SELECT {select} FROM {view} {where} {grouping}", params)
+
+
+# -----------------------------------------------------------------------------
+# Metric equivalents (same outputs as the metrics.py function of the same name)
+# -----------------------------------------------------------------------------
+
+def calculate_update_intensity(con, **filters):
+    where_u, params_u = _filters(**filters)
+    where_e, params_e = _filters(**filters)
+    return _query(con, f"""
+        WITH upd AS (SELECT District, State, sum(Count) AS Total_Updates FROM updates {where_u} GROUP BY 1, 2),
+             enr AS (SELECT District, sum(Enrolment_Count) AS Enrolment_Count FROM enrolment {where_e} GROUP BY 1)
+        SELECT upd.District, upd.State, upd.Total_Updates,
+               CASE WHEN enr.Enrolment_Count = 0 THEN 1 ELSE enr.Enrolment_Count END AS Enrolment_Count,
+               upd.Total_Updates / CASE WHEN enr.Enrolment_Count = 0 THEN 1 ELSE enr.Enrolment_Count END * 1000
+                   AS Update_Intensity
+        FROM upd LEFT JOIN enr USING (District)
+        ORDER BY upd.District, upd.State
+    """, params_u + params_e)
+
+
+def calculate_age_distribution(con, **filters):
+    totals = _grouped(con, 'enrolment', [], ['age_0_5', 'age_5_17', 'age_18_greater'], **filters).iloc[0].fillna(0)
+    return {"0-5 Years": totals['age_0_5'], "5-17 Years": totals['age_5_17'], "18+ Years": totals['age_18_greater']}
+
+
+def detect_anomalies(con, **filters):
+    from sklearn.ensemble import IsolationForest
+
+    df_agg = _grouped(con, 'enrolment', ['District'], ['Enrolment_Count'], **filters).fillna(0)
+    if len(df_agg) <= 5:
+        return pd.DataFrame()
+    model = IsolationForest(contamination=0.05, random_state=42)
+    df_agg['anomaly'] = model.fit_predict(df_agg[['Enrolment_Count']])
+    return df_agg[df_agg['anomaly'] == -1]
+
+
+def get_seasonal_patterns(con, **filters):
+    monthly = _grouped(con, 'updates', ['CAST(month(Date) AS INTEGER) AS Month_Num'], ['Count'], dated=True, **filters)
+    monthly.columns = ['Month_Num', 'Total_Updates']
+    avg_updates = monthly['Total_Updates'].mean()
+    monthly['Deviation_Pct'] = ((monthly['Total_Updates'] - avg_updates) / avg_updates * 100).round(1)
+    monthly['Season'] = np.select(
+        [monthly['Month_Num'].isin([11, 12, 1, 2]), monthly['Month_Num'].isin([4, 5]), monthly['Month_Num'] == 6],
+        ['Wedding Season (Nov-Feb)', 'Wedding Season (Apr-May)', 'School Admission (Jun)'], default='Regular Period')
+    monthly['Month_Name'] = pd.to_datetime(monthly['Month_Num'].astype(str), format='%m').dt.strftime('%b')
+    return monthly
+
+
+def get_demographic_vs_biometric_seasonal(con, **filters):
+    return _grouped(con, 'updates', ['CAST(month(Date) AS INTEGER) AS Month_Num', 'Type'], ['Count'], dated=True, **filters)
+
+
+def detect_migration_spikes(con, **filters):
+    where, params = _filters(dated=True, **filters)
+    spikes = _query(con, f"""
+        WITH monthly AS (
+            SELECT District, State, strftime(Date, '%Y-%m') AS Year_Month, sum(Count) AS Count
+            FROM updates {where} GROUP BY 1, 2, 3
+        )
+        SELECT *, lag(Count) OVER (PARTITION BY District ORDER BY Year_Month, State) AS Prev_Count
+        FROM monthly ORDER BY District, Year_Month, State
+    """, params)
+    spikes['MoM_Change'] = spikes['Count'] - spikes['Prev_Count']
+    spikes['MoM_Change_Pct'] = (spikes['MoM_Change'] / spikes['Prev_Count'] * 100).round(1)
+    spikes['Is_Spike'] = spikes['MoM_Change_Pct'] > 100
+    return spikes
+
+
+def get_district_update_velocity(con, **filters):
+    # Daily district totals from SQL; the window arithmetic runs on the (small) panel
+    daily = _grouped(con, 'updates', ['District', 'State', 'Date'], ['Count'], dated=True, **filters)
+    units, days, counts = build_velocity_panel(daily)
+    return compute_velocity(units, days, counts)
+
+
+def detect_geographic_clusters(con, threshold_percentile=90, **filters):
+    state_updates = _grouped(con, 'updates', ['State'], ['Count'], **filters)
+    state_updates.columns = ['State', 'Total_Updates']
+    threshold = state_updates['Total_Updates'].quantile(threshold_percentile / 100)
+    state_updates['Is_High_Activity'] = state_updates['Total_Updates'] > threshold
+
+    high_states = state_updates.loc[state_updates['Is_High_Activity'], 'State'].tolist()
+    if not high_states:
+        return state_updates, pd.DataFrame(columns=['State', 'District', 'Count'])
+    placeholders = ", ".join("?" * len(high_states))
+    where, params = _filters(**filters)
+    where = (where + " AND " if where else "WHERE ") + f"State IN ({placeholders})"
+    district_in_high = _query(con, f"SELECT State, District, sum(Count) AS Count FROM updates {where} "
+                                   f"GROUP BY 1, 2 ORDER BY 1, 2", params + high_states)
+    return state_updates, district_in_high
+
+
+def analyze_age_transitions(con, **filters):
+    enr_by_age = _grouped(con, 'enrolment', ['State'], ['age_0_5', 'age_5_17', 'age_18_greater', 'Enrolment_Count'],
+                          **filters)
+    demo_age = _grouped(con, 'updates', ['State'], ['Count'], extra_where="Type = 'Demographic'", **filters)
+    upd_by_age = _grouped(con, 'updates', ['State'], ['Age_5_17', 'Age_17_Plus'], **filters)
+    upd_by_age = upd_by_age.rename(columns={'Age_5_17': 'Updates_5_17', 'Age_17_Plus': 'Updates_17_Plus'})
+    transition = enr_by_age.merge(demo_age, on='State', how='left', suffixes=('', '_upd'))
+    transition = transition.merge(upd_by_age, on='State', how='left')
+    transition[['Count', 'Updates_5_17', 'Updates_17_Plus']] = transition[['Count', 'Updates_5_17', 'Updates_17_Plus']].fillna(0)
+    transition['Update_Rate'] = (transition['Count'] / transition['Enrolment_Count'] * 100).round(2)
+    transition['Adult_Enrollment_Share'] = (transition['age_18_greater'] / transition['Enrolment_Count'] * 100).round(2)
+    age_updates = transition['Updates_5_17'] + transition['Updates_17_Plus']
+    transition['Adult_Update_Share'] = (transition['Updates_17_Plus'] / age_updates.replace(0, np.nan) * 100).round(2)
+    transition['Milestone_Ratio'] = (transition['Updates_17_Plus'] / transition['age_5_17'].replace(0, np.nan) * 100).round(2)
+    return transition
+
+
+def get_age_group_update_patterns(con, **filters):
+    return _grouped(con, 'updates', ["strftime(Date, '%Y-%m') AS Year_Month", 'Type'],
+                    ['Count', 'Age_5_17', 'Age_17_Plus'], dated=True, **filters)
+
+
+def get_age_milestone_correlation(con, **filters):
+    # District × date totals of the 5-17 cohort and the 17+ updates; the FFT pass runs on those
+    enr = _grouped(con, 'enrolment', ['District', 'State', 'Date'], ['age_5_17'], dated=True, **filters)
+    upd = _grouped(con, 'updates', ['District', 'State', 'Date'], ['Age_17_Plus', 'Count'], dated=True, **filters)
+    return _milestone_correlation_from_frames(enr, upd)
+
+
+def calculate_mbu_demand_forecast(con, **filters):
+    forecast = _grouped(con, 'enrolment', ['State'], ['age_0_5', 'age_5_17', 'age_18_greater'], **filters)
+    forecast['MBU_Immediate'] = (forecast['age_0_5'] * 0.2).round(0)
+    forecast['MBU_ShortTerm'] = (forecast['age_5_17'] * 0.1).round(0)
+    forecast['MBU_LongTerm'] = (forecast['age_18_greater'] * 0.1).round(0)
+    forecast['Total_MBU_Demand'] = forecast['MBU_Immediate'] + forecast['MBU_ShortTerm'] + forecast['MBU_LongTerm']
+    return forecast
+
+
+def trivariate_analysis(con, **filters):
+    year_month = "strftime(Date, '%Y-%m') AS Year_Month"
+    trivar_enr = _grouped(con, 'enrolment', ['State', year_month],
+                          ['age_0_5', 'age_5_17', 'age_18_greater', 'Enrolment_Count'], dated=True, **filters)
+    trivar_upd = _grouped(con, 'updates', ['State', year_month, 'Type'], ['Count'], dated=True, **filters)
+    return trivar_enr, trivar_upd
+
+
+def get_state_month_heatmap_data(con, **filters):
+    heatmap_data = _grouped(con, 'updates', ['State', 'CAST(month(Date) AS INTEGER) AS Month_Num'], ['Count'],
+                            dated=True, **filters)
+    return heatmap_data.pivot(index='State', columns='Month_Num', values='Count').fillna(0)
+
+
+def get_enrollment_update_correlation(con, **filters):
+    where_e, params_e = _filters(**filters)
+    where_u, params_u = _filters(**filters)
+    merged = _query(con, f"""
+        WITH enr AS (SELECT State, sum(Enrolment_Count) AS Enrollments FROM enrolment {where_e} GROUP BY 1),
+             upd AS (SELECT State, sum(Count) AS Updates FROM updates {where_u} GROUP BY 1)
+        SELECT State, coalesce(Enrollments, 0) AS Enrollments, coalesce(Updates, 0) AS Updates
+        FROM enr FULL OUTER JOIN upd USING (State) ORDER BY State
+    """, params_e + params_u)
+    merged['Update_to_Enrollment_Ratio'] = (merged['Updates'] / merged['Enrollments']).round(3)
+    return merged, merged['Enrollments'].corr(merged['Updates'])
+
+
+def get_district_rolling_correlation(con, **filters):
+    # The rolling statistics only need daily district totals, which SQL reduces the shards to
+    enr = _grouped(con, 'enrolment', ['District', 'State', 'Date'], ['Enrolment_Count'], dated=True, **filters)
+    upd = _grouped(con, 'updates', ['District', 'State', 'Date'], ['Count'], dated=True, **filters)
+    return _rolling_correlation_from_frames(enr, upd)
+
+
+# metrics.py function name → DuckDB equivalent
+QUERIES = {fn.__name__: fn for fn in [
+    calculate_update_intensity, calculate_age_distribution, detect_anomalies,
+    get_seasonal_patterns, get_demographic_vs_biometric_seasonal,
+    detect_migration_spikes, get_district_update_velocity, detect_geographic_clusters,
+    analyze_age_transitions, get_age_group_update_patterns, get_age_milestone_correlation,
+    calculate_mbu_demand_forecast, trivariate_analysis, get_state_month_heatmap_data,
+    get_enrollment_update_correlation, get_district_rolling_correlation,
+]}
+
+
+# -----------------------------------------------------------------------------
+# Parity with the pandas path
+# -----------------------------------------------------------------------------
+
+def _filter_frame(df, state=None, district=None, start=None, end=None):
+    # The same filters the dashboard applies to the in-memory frames
+    if state and state != 'All':
+        df = df[df['State'] == state]
+    if district and district != 'All':
+        df = df[df['District'] == district]
+    if start is not None or end is not None:
+        from time_index import slice_dates
+        df = slice_dates(df, start, end)
+    return df
+
+
+def _compare(expected, actual, path='result'):
+    """
+    Returns None when two metric results match (values within float tolerance), else a description.
+    """
+    if isinstance(expected, tuple):
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            problem = _compare(e, a, f'{path}[{i}]')
+            if problem:
+                return problem
+        return None
+    if isinstance(expected, dict):
+        return _compare(pd.Series(expected, dtype=float), pd.Series(actual, dtype=float), path)
+    if isinstance(expected, (pd.DataFrame, pd.Series)):
+        if expected.empty and actual.empty:
+            return None
+        # Positional row labels (filtered/sorted frames) are not compared; named indexes (pivots) are
+        labelled = expected.index.name is not None
+        e = expected if labelled else expected.reset_index(drop=True)
+        a = actual if labelled else actual.reset_index(drop=True)
+        if isinstance(e, pd.DataFrame):
+            e, a = e.sort_index(axis=1), a.sort_index(axis=1)
+        try:
+            if isinstance(e, pd.DataFrame):
+                pd.testing.assert_frame_equal(e, a, check_dtype=False, check_exact=False, rtol=1e-6,
+                                              check_index_type=False, check_column_type=False)
+            else:
+                pd.testing.assert_series_equal(e, a, check_dtype=False, check_exact=False, rtol=1e-6,
+                                               check_index_type=False)
+        except AssertionError as exc:
+            return f"{path}: {str(exc).splitlines()[0]}"
+        return None
+    if not np.isclose(float(expected), float(actual), rtol=1e-6, equal_nan=True):
+        return f"{path}: {expected!r} != {actual!r}"
+    return None
+
+
+def check_parity(con, df_enr, df_upd, **filters):
+    """
+    Runs every metric on both backends and compares the outputs.
+    `df_enr`/`df_upd` are the unfiltered frames from data_loader.load_data.
+    Returns DataFrame: Metric, Pandas_s, DuckDB_s, Match, Detail.
+    """
+    import time
+    import metrics
+
+    enr, upd = _filter_frame(df_enr, **filters), _filter_frame(df_upd, **filters)
+    pandas_args = {
+        'calculate_update_intensity': (upd, enr), 'calculate_age_distribution': (enr,), 'detect_anomalies': (enr,),
+        'get_seasonal_patterns': (upd, enr), 'get_demographic_vs_biometric_seasonal': (upd,),
+        'detect_migration_spikes': (upd,), 'get_district_update_velocity': (upd,),
+        'detect_geographic_clusters': (upd,), 'analyze_age_transitions': (enr, upd),
+        'get_age_group_update_patterns': (upd,), 'get_age_milestone_correlation': (enr, upd),
+        'calculate_mbu_demand_forecast': (enr,),
+        'trivariate_analysis': (enr, upd), 'get_state_month_heatmap_data': (upd,),
+        'get_enrollment_update_correlation': (enr, upd), 'get_district_rolling_correlation': (enr, upd),
+    }
+
+    rows = []
+    for name, query in QUERIES.items():
+        t0 = time.perf_counter()
+        expected = getattr(metrics, name)(*pandas_args[name])
+        t1 = time.perf_counter()
+        actual = query(con, **filters)
+        t2 = time.perf_counter()
+        problem = _compare(expected, actual)
+        rows.append({'Metric': name, 'Pandas_s': round(t1 - t0, 4), 'DuckDB_s': round(t2 - t1, 4),
+                     'Match': problem is None, 'Detail': problem or ''})
+    return pd.DataFrame(rows)
+
+
+def write_overlap_fixture(target_dir, source_dir=DATA_DIR):
+    """
+    Splits each dataset's shards from `source_dir` into two overlapping shards under `target_dir`:
+    part_0.csv (first two thirds of the rows) and part_1.csv (last two thirds). The middle third
+    is in both, with different counts in part_0, so the deduplication rule shows in every total.
+    Returns {dataset: [part_0 path, part_1 path]}; only part_1 is written yet (see run_fixture).
+    """
+    parts = {}
+    for dataset, shard_dir in DATASET_DIRS.items():
+        files = sorted(glob.glob(os.path.join(source_dir, shard_dir, '*.csv')))
+        if not files:
+            continue
+        df = pd.concat([pd.read_csv(path, dtype=str) for path in files], ignore_index=True)
+        n = len(df)
+        early, late = df.iloc[:2 * n // 3].copy(), df.iloc[n // 3:]
+        overlap = early.index >= n // 3
+        for col in VALUE_COLS[dataset]:
+            counts = pd.to_numeric(early[col], errors='coerce').fillna(0).astype('int64')
+            early[col] = counts.where(~overlap, counts + 1).astype(str)
+
+        out_dir = os.path.join(target_dir, shard_dir)
+        os.makedirs(out_dir, exist_ok=True)
+        parts[dataset] = [os.path.join(out_dir, 'part_0.csv'), os.path.join(out_dir, 'part_1.csv')]
+        late.to_csv(parts[dataset][1], index=False)
+        early.to_csv(parts[dataset][0] + '.pending', index=False)
+    return parts
+
+
+def run_fixture(threads=None):
+    """
+    Parity on the overlap fixture, in two steps like a live data directory: first with only the
+    later-named shard (it takes ownership of the shared keys in the pandas index), then after the
+    earlier-named shard arrives. Each step runs this script against the fixture in a subprocess
+    (DRISHTI_DATA_DIR is read at import). Returns True when both steps match.
+    """
+    import subprocess
+    import sys
+    import tempfile
+
+    command = [sys.executable, os.path.abspath(__file__)] + (['--threads', str(threads)] if threads else [])
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        parts = write_overlap_fixture(fixture_dir)
+        env = dict(os.environ, DRISHTI_DATA_DIR=fixture_dir)
+        ok = True
+        for step in ["later-named shard only", "both shards"]:
+            if step == "both shards":
+                for early, _ in parts.values():
+                    os.replace(early + '.pending', early)
+            print(f"== fixture: {step}", flush=True)
+            ok &= subprocess.run(command, env=env).returncode == 0
+    return ok
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare the DuckDB backend with the pandas metrics.")
+    parser.add_argument('--state')
+    parser.add_argument('--district')
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--fixture', action='store_true', help="check overlapping out-of-order shards instead")
+    args = parser.parse_args()
+
+    if args.fixture:
+        raise SystemExit(0 if run_fixture(args.threads) else 1)
+
+    from data_loader import load_data
+
+    df_enr, df_upd = load_data()
+    report = check_parity(connect(threads=args.threads), df_enr, df_upd, state=args.state, district=args.district,
+                          start=args.start, end=args.end)
+    print(report.to_string(index=False))
+    raise SystemExit(0 if report['Match'].all() else 1)
@@ -0,0 +1,250 @@
+import io
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: CSV export works without it
+    pa = pq = None
+
+from ingest import DATASET_DIRS, iter_shard_chunks, list_shards, relevant_shards
+from metrics import (
+    calculate_update_intensity, get_district_update_velocity, detect_migration_spikes,
+    calculate_mbu_demand_forecast
+)
+from prefetch import fetch
+from profiling import timed
+
+
+# =============================================================================
+# STREAMING EXPORT
+# Two kinds of extract, both written chunk by chunk (CSV: header once, then
+# appended rows; Parquet: one row group per chunk), so an extract written to a
+# file is never assembled in memory (dashboard downloads are, as Streamlit sends
+# bytes):
+# - metric tables behind the charts, for the current date window and
+#   State/District filter; they come from the shared metric cache (prefetch.fetch),
+#   so exporting what is on screen does not recompute it;
+# - raw shard rows for states and a date range. The shard manifest
+#   (ingest.shard_manifest) records each shard's date range and states, so only
+#   shards that can hold matching rows are opened, and those are streamed in chunks.
+#
+#   python src/export.py table velocity --state Karnataka -o velocity.parquet
+#   python src/export.py raw demographic --state Karnataka --start 2025-12-01 -o ka.csv
+#   python src/export.py check    # download callables produce data st.download_button accepts
+#
+# Environment:
+#   DRISHTI_EXPORT_CHUNK_ROWS=<rows>     rows per written chunk (default 100000)
+# =============================================================================
+
+EXPORT_CHUNK_ROWS = int(os.environ.get('DRISHTI_EXPORT_CHUNK_ROWS', '100000'))
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+# table name → (label, metric, frame names as in prefetch.SECTION_JOBS)
+EXPORT_TABLES = {
+    'intensity': ("Update intensity", calculate_update_intensity, ('upd', 'enr')),
+    'velocity': ("District update velocity", get_district_update_velocity, ('upd_full',)),
+    'spikes': ("Month-over-month spikes", detect_migration_spikes, ('upd_full',)),
+    'mbu_forecast': ("MBU demand forecast", calculate_mbu_demand_forecast, ('enr_full',)),
+}
+
+
+def iter_frame_chunks(df, chunksize=EXPORT_CHUNK_ROWS):
+    """
+    Positional slices of `df` with at most `chunksize` rows (an empty frame yields itself once).
+    """
+    if df.empty:
+        yield df
+        return
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def write_chunks(chunks, out, fmt='csv'):
+    """
+    Writes an iterable of DataFrames with the same columns to `out` (path or binary file object)
+    as one CSV or Parquet file. Returns the number of rows written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)})")
+    if fmt == 'parquet' and pq is None:
+        raise ImportError("Parquet export needs the optional 'pyarrow' package (pip install pyarrow)")
+
+    rows, writer, first = 0, None, True
+    fh = open(out, 'wb') if isinstance(out, (str, os.PathLike)) else out
+    try:
+        for chunk in chunks:
+            # Empty chunks only matter as the first one (header / schema of an empty result)
+            if chunk.empty and not first:
+                continue
+            if fmt == 'csv':
+                fh.write(chunk.to_csv(index=False, header=first).encode('utf-8'))
+            else:
+                if writer is None:
+                    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    writer = pq.ParquetWriter(fh, schema)
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+            first = False
+    finally:
+        if writer is not None:
+            writer.close()
+        if fh is not out:
+            fh.close()
+    return rows
+
+
+def filter_table(table, state='All', district='All'):
+    """
+    Rows of a metric table for the State/District filter (tables without those columns are kept whole).
+    """
+    if state != 'All' and 'State' in table.columns:
+        table = table[table['State'] == state]
+        if district != 'All' and 'District' in table.columns:
+            table = table[table['District'] == district]
+    return table
+
+
+def metric_table(name, frames, view_key, state='All', district='All'):
+    """
+    The table behind an exported chart, for the current filter.
+    All-India metrics are restricted to the selected State/District after the (cached) computation.
+    """
+    _, fn, frame_names = EXPORT_TABLES[name]
+    return filter_table(fetch(fn, frames, frame_names, view_key), state, district)
+
+
+@timed
+def export_table(name, frames, view_key, out, fmt='csv', state='All', district='All', chunksize=EXPORT_CHUNK_ROWS):
+    """
+    Writes a metric table (see EXPORT_TABLES) for the current filter to `out`. Returns rows written.
+    """
+    table = metric_table(name, frames, view_key, state, district)
+    return write_chunks(iter_frame_chunks(table, chunksize), out, fmt)
+
+
+def iter_raw_rows(dataset, states=None, districts=None, start=None, end=None, chunksize=EXPORT_CHUNK_ROWS):
+    """
+    Streams the deduplicated raw shard rows of a dataset (shard columns as in the CSVs) for the
+    given states / districts (None = all) between `start` and `end` (inclusive, None = open),
+    opening only the shards whose manifest entry overlaps the request.
+    """
+    files = list_shards(DATASET_DIRS[dataset])
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    only = set(relevant_shards(files, dataset, states, start, end))
+    states = set(states) if states is not None else None
+    districts = set(districts) if districts is not None else None
+
+    if not only:
+        # No shard can match: an empty extract, with the shard columns (none when the dataset has no shards)
+        yield pd.read_csv(files[0], nrows=0) if files else pd.DataFrame()
+        return
+    for _, chunk in iter_shard_chunks(files, dataset, chunksize=chunksize, only=only):
+        keep = pd.Series(True, index=chunk.index)
+        if states is not None:
+            keep &= chunk['state'].isin(states)
+        if districts is not None:
+            keep &= chunk['district'].isin(districts)
+        if start is not None or end is not None:
+            dates = pd.to_datetime(chunk['date'], format='%d-%m-%Y', errors='coerce')
+            if start is not None:
+                keep &= dates >= start
+            if end is not None:
+                keep &= dates <= end
+        yield chunk[keep]
+
+
+@timed
+def export_raw(dataset, out, fmt='csv', states=None, districts=None, start=None, end=None, chunksize=EXPORT_CHUNK_ROWS):
+    """
+    Writes a raw-row extract (see iter_raw_rows) to `out`. Returns rows written.
+    """
+    return write_chunks(iter_raw_rows(dataset, states, districts, start, end, chunksize), out, fmt)
+
+
+def buffered_export(export, *args, **kwargs):
+    """
+    Runs `export(..., out=<in-memory buffer>, ...)` and returns the io.BytesIO, for a deferred
+    st.download_button (Streamlit reads the whole file into memory either way, so the chunks
+    are written to a buffer rather than a temporary file).
+    """
+    buffer = io.BytesIO()
+    export(*args, out=buffer, **kwargs)
+    return buffer
+
+
+def check_downloads(frames, view_key):
+    """
+    Runs the download callables built like the app's (every table and dataset, both formats) through
+    Streamlit's download conversion and reads each file back. Returns one row per download.
+    """
+    from functools import partial
+    from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+    downloads = [(f"table {name}", partial(buffered_export, export_table, name, frames, view_key))
+                 for name in EXPORT_TABLES]
+    downloads += [(f"raw {dataset}", partial(buffered_export, export_raw, dataset)) for dataset in DATASET_DIRS]
+    rows = []
+    for label, callable_data in downloads:
+        for fmt in EXPORT_FORMATS:
+            if fmt == 'parquet' and pq is None:
+                continue
+            data, _ = convert_data_to_bytes_and_infer_mime(
+                callable_data(fmt=fmt), TypeError(f"{label}: unsupported download type"))
+            if fmt == 'csv':
+                read_back = pd.read_csv(io.BytesIO(data)) if data.strip() else pd.DataFrame()
+            else:
+                read_back = pq.read_table(io.BytesIO(data)).to_pandas()
+            rows.append({'Download': label, 'Format': fmt, 'Bytes': len(data), 'Rows': len(read_back)})
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export metric tables or raw shard rows, streamed in chunks.")
+    parser.add_argument('kind', choices=['table', 'raw', 'check'])
+    parser.add_argument('name', nargs='?',
+                        help=f"table ({', '.join(EXPORT_TABLES)}) or dataset ({', '.join(DATASET_DIRS)})")
+    parser.add_argument('-o', '--output', help="output file (.csv or .parquet)")
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), help="default: from the output file extension")
+    parser.add_argument('--state', action='append', help="State filter (raw extracts: repeatable)")
+    parser.add_argument('--district', action='append', help="District filter (raw extracts: repeatable)")
+    parser.add_argument('--start', help="first date (YYYY-MM-DD)")
+    parser.add_argument('--end', help="last date (YYYY-MM-DD)")
+    parser.add_argument('--chunk-rows', type=int, default=EXPORT_CHUNK_ROWS)
+    args = parser.parse_args()
+    if args.kind != 'check' and not (args.name and args.output):
+        parser.error("table and raw exports need a name and -o/--output")
+
+    import logging
+    # Outside `streamlit run` the metric caches warn on every access
+    logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
+    logging.getLogger('streamlit.runtime.caching.cache_data_api').setLevel(logging.ERROR)
+
+    fmt = args.format or ('parquet' if (args.output or '').endswith('.parquet') else 'csv')
+    if args.kind == 'raw':
+        written = export_raw(args.name, args.output, fmt, args.state, args.district, args.start, args.end,
+                             chunksize=args.chunk_rows)
+        print(f"Wrote {written:,} rows to {args.output}")
+    else:
+        from data_loader import load_data
+        from time_index import slice_dates
+
+        window = (pd.Timestamp(args.start) if args.start else None, pd.Timestamp(args.end) if args.end else None)
+        df_enr_full, df_upd_full = (slice_dates(df, *window) for df in load_data())
+        state = args.state[0] if args.state else 'All'
+        district = args.district[0] if args.district and state != 'All' else 'All'
+        df_enr, df_upd = filter_table(df_enr_full, state, district), filter_table(df_upd_full, state, district)
+        frames = {'enr': df_enr, 'upd': df_upd, 'enr_full': df_enr_full, 'upd_full': df_upd_full}
+        view_key = (tuple(str(bound) for bound in window), state, district, 'export', 'export')
+        if args.kind == 'check':
+            print(check_downloads(frames, view_key).to_string(index=False))
+        else:
+            written = export_table(args.name, frames, view_key, args.output, fmt, state, district,
+                                   chunksize=args.chunk_rows)
+            print(f"Wrote {written:,} rows to {args.output}")
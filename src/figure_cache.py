@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+from prefetch import data_scope
+
+
+# =============================================================================
+# SERIALIZED FIGURE CACHE
+# Building a plotly figure (px.treemap, px.imshow, make_subplots, ...) and
+# serializing it costs tens of milliseconds per chart on every rerun, even when
+# the numbers behind it have not changed. Figures are therefore stored as their
+# JSON spec, keyed by (chart id, data scope): the chart id names the chart and
+# any widget choices it depends on, the data scope is the date window /
+# State / District / dataset version it was computed from (prefetch.data_scope).
+# A hit skips the build and hands st.plotly_chart a figure that only replays
+# its JSON. The cache is shared by all sessions and evicts least recently used
+# figures beyond a total size in bytes.
+#
+# Environment:
+#   DRISHTI_FIGURE_CACHE_MB=<MB>         size bound (default 64; 0 disables the cache)
+# =============================================================================
+
+FIGURE_CACHE_MAX_BYTES = int(float(os.environ.get('DRISHTI_FIGURE_CACHE_MB', '64')) * 1024 * 1024)
+
+
+class SerializedFigure(go.Figure):
+    """
+    A figure replayed from its JSON spec. Only meant to be passed to st.plotly_chart, which
+    reads it through to_dict(); it carries no traces of its own, so it must not be modified.
+    """
+
+    def __init__(self, spec):
+        super().__init__()
+        self._spec = spec
+
+    def to_dict(self):
+        return json.loads(self._spec)
+
+
+class FigureCache:
+    """
+    Thread-safe LRU of figure specs (JSON strings) bounded by their total size.
+    """
+
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.specs = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            spec = self.specs.get(key)
+            if spec is None:
+                self.misses += 1
+                return None
+            self.specs.move_to_end(key)
+            self.hits += 1
+            return spec
+
+    def put(self, key, spec):
+        # A spec larger than the whole cache is not kept
+        if len(spec) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.specs.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.specs[key] = spec
+            self.size += len(spec)
+            while self.size > self.max_bytes:
+                _, evicted = self.specs.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.specs.clear()
+            self.size = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """
+        {'figures', 'mb', 'hits', 'misses', 'hit_rate'} since the cache was created.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'figures': len(self.specs),
+                'mb': round(self.size / 1024 / 1024, 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+@st.cache_resource
+def get_figure_cache():
+    """
+    The figure cache shared by all sessions (one per server process).
+    """
+    return FigureCache()
+
+
+def cached_figure(chart_id, frame_names, view_key, build):
+    """
+    The figure of `chart_id` for the data scope of `frame_names` in `view_key` (see
+    prefetch.data_scope): replayed from the cache, or built with `build()` and stored.
+    `chart_id` must include every input of `build` that is not part of the data scope
+    (widget choices, top-N sizes, ...).
+    """
+    cache = get_figure_cache()
+    if cache.max_bytes <= 0:
+        return build()
+    key = (chart_id, data_scope(frame_names, view_key))
+    spec = cache.get(key)
+    if spec is None:
+        # Same serialization as st.plotly_chart (validated dict, trace uids removed)
+        spec = pio.to_json(build().to_dict(), validate=False)
+        cache.put(key, spec)
+    return SerializedFigure(spec)
@@ -0,0 +1,115 @@
+import pandas as pd
+import numpy as np
+import streamlit as st
+
+from panel import build_panel
+from profiling import timed
+
+
+# =============================================================================
+# INTER-DISTRICT MIGRATION FLOW INFERENCE
+# Migration shows up as paired patterns: address updates in a destination follow
+# changes in the source districts. For every (source, destination) pair and lag L
+# the Pearson correlation of source[t] with destination[t + L] is computed as a
+# normalized matrix product, in destination blocks so memory stays bounded.
+# =============================================================================
+
+FLOW_LAGS = (1, 2, 3, 5, 7)
+FLOW_BLOCK_SIZE = 256
+FLOW_TOP_K = 5
+
+
+def _normalize_rows(series):
+    # Center each row and scale to unit norm, so a dot product of two rows is their Pearson correlation
+    centered = series - series.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=1, keepdims=True)
+    return np.divide(centered, norms, out=np.zeros_like(centered), where=norms > 0)
+
+
+def lagged_cross_correlation(series, lags=FLOW_LAGS, block_size=FLOW_BLOCK_SIZE):
+    """
+    Best lagged correlation for every (source, destination) pair of rows of `series` (units × periods).
+
+    Returns (best_corr, best_lag): n × n arrays where best_corr[i, j] is the correlation of
+    source i leading destination j with the largest magnitude over `lags`, and best_lag the lag.
+    Pairs are processed in blocks of `block_size` destinations.
+    """
+    n, t = series.shape
+    best_corr = np.zeros((n, n))
+    best_lag = np.zeros((n, n), dtype=np.int16)
+
+    lags = [lag for lag in lags if 0 < lag <= t - 3]
+    # Normalized source/destination windows per lag are computed once and reused for every block
+    windows = {lag: (_normalize_rows(series[:, :t - lag]), _normalize_rows(series[:, lag:])) for lag in lags}
+
+    for lo in range(0, n, block_size):
+        hi = min(lo + block_size, n)
+        block_corr = best_corr[:, lo:hi]
+        block_lag = best_lag[:, lo:hi]
+        for lag in lags:
+            sources, destinations = windows[lag]
+            corr = sources @ destinations[lo:hi].T
+            better = np.abs(corr) > np.abs(block_corr)
+            block_corr[better] = corr[better]
+            block_lag[better] = lag
+
+    return best_corr, best_lag
+
+
+@timed
+def infer_migration_flows(df_upd, top_k=FLOW_TOP_K, lags=FLOW_LAGS, freq='D', min_active_periods=5,
+                          update_type='Demographic'):
+    """
+    Returns the top-k candidate source districts for every destination district.
+
+    Columns: Destination, Destination_State, Source, Source_State, Lag, Correlation, Pattern.
+    Districts with fewer than `min_active_periods` periods of updates are left out (too sparse
+    for a meaningful correlation).
+    """
+    columns = ['Destination', 'Destination_State', 'Source', 'Source_State', 'Lag', 'Correlation', 'Pattern']
+    df = df_upd[df_upd['Type'] == update_type] if update_type and 'Type' in df_upd.columns else df_upd
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    units, _, series = build_panel(df, 'Count', unit_cols=('District', 'State'), freq=freq)
+    active = (series > 0).sum(axis=1) >= min_active_periods
+    units, series = units[active].reset_index(drop=True), series[active]
+    n = len(units)
+    if n < 2:
+        return pd.DataFrame(columns=columns)
+
+    # Every district follows the same calendar (weekdays, holidays, camps); that shared pattern is
+    # removed so the correlations reflect district-specific movements only
+    shapes = _normalize_rows(series)
+    best_corr, best_lag = lagged_cross_correlation(shapes - shapes.mean(axis=0), lags=lags)
+    np.fill_diagonal(best_corr, 0)
+
+    # Top-k sources per destination (columns) by |correlation|, via argpartition
+    k = min(top_k, n - 1)
+    strength = np.abs(best_corr)
+    top_sources = np.argpartition(-strength, k - 1, axis=0)[:k]
+    destinations = np.broadcast_to(np.arange(n), top_sources.shape)
+
+    src, dst = top_sources.ravel(), destinations.ravel()
+    corr = best_corr[src, dst]
+    flows = pd.DataFrame({
+        'Destination': units['District'].to_numpy()[dst],
+        'Destination_State': units['State'].to_numpy()[dst],
+        'Source': units['District'].to_numpy()[src],
+        'Source_State': units['State'].to_numpy()[src],
+        'Lag': best_lag[src, dst],
+        'Correlation': corr.round(3),
+        'Pattern': np.where(corr < 0, 'Source falls, destination rises', 'Moves together (source leads)'),
+    })
+    flows = flows[flows['Correlation'] != 0]
+    flows['_strength'] = flows['Correlation'].abs()
+    flows = flows.sort_values(['Destination', 'Destination_State', '_strength'], ascending=[True, True, False])
+    return flows.drop(columns='_strength').reset_index(drop=True)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_migration_flows(dataset_version, date_window, _df_upd, top_k=FLOW_TOP_K):
+    """
+    infer_migration_flows cached per (dataset version, date window); the frame itself is not hashed.
+    """
+    return infer_migration_flows(_df_upd, top_k=top_k)
@@ -0,0 +1,186 @@
+import pandas as pd
+import numpy as np
+from scipy import sparse
+from scipy.stats import norm
+import streamlit as st
+
+from data_loader import merge_for_map, load_geodata, load_district_adjacency
+from profiling import timed
+
+
+# =============================================================================
+# SPATIAL AUTOCORRELATION (HOT-SPOT) ANALYSIS
+# A sparse contiguity matrix between district polygons (from the STRtree) is
+# built once; Local Moran's I with conditional permutation tests and Getis-Ord
+# Gi* z-scores are then computed for all districts in a few array operations.
+# =============================================================================
+
+PERMUTATIONS = 999
+PERMUTATION_CHUNK = 100
+SIGNIFICANCE = 0.05
+
+
+def build_adjacency(index):
+    """
+    Queen contiguity between district polygons: districts are neighbours when their polygons touch.
+    Returns a symmetric binary scipy.sparse CSR matrix (n_polygons × n_polygons), or None without an index.
+    """
+    if index is None:
+        return None
+    geoms = index['geoms']
+    left, right = index['tree'].query(geoms, predicate='intersects')
+    off_diagonal = left != right
+    left, right = left[off_diagonal], right[off_diagonal]
+
+    n = len(geoms)
+    adjacency = sparse.csr_matrix((np.ones(len(left)), (left, right)), shape=(n, n))
+    adjacency = ((adjacency + adjacency.T) > 0).astype(float)
+    return adjacency.tocsr()
+
+
+def _row_standardize(adjacency):
+    k = np.asarray(adjacency.sum(axis=1)).ravel()
+    inv = np.divide(1.0, k, out=np.zeros_like(k), where=k > 0)
+    return sparse.diags(inv) @ adjacency, k.astype(int)
+
+
+def local_morans_i(values, adjacency, permutations=PERMUTATIONS, seed=42):
+    """
+    Local Moran's I for every unit with row-standardized weights.
+
+    Significance uses conditional permutations: for each unit its neighbours are replaced
+    by k_i values drawn from the other units (with replacement), vectorized over units and
+    processed in chunks of permutations. Returns (I, lag, pseudo p-values).
+    """
+    x = np.asarray(values, dtype=float)
+    n = len(x)
+    std = x.std()
+    z = (x - x.mean()) / std if std > 0 else np.zeros(n)
+
+    weights, k = _row_standardize(adjacency)
+    lag = weights @ z
+    local_i = z * lag
+
+    k_max = int(k.max()) if n else 0
+    if n < 3 or k_max == 0 or permutations <= 0:
+        return local_i, lag, np.ones(n)
+
+    rng = np.random.default_rng(seed)
+    neighbour_mask = np.arange(k_max)[None, :] < k[:, None]
+    k_safe = np.maximum(k, 1)
+    larger = np.zeros(n, dtype=np.int64)
+
+    for done in range(0, permutations, PERMUTATION_CHUNK):
+        chunk = min(PERMUTATION_CHUNK, permutations - done)
+        # Draw from the n - 1 other units: shift indices at or above i by one
+        draws = rng.integers(0, n - 1, size=(chunk, n, k_max))
+        draws += draws >= np.arange(n)[None, :, None]
+        perm_lag = (z[draws] * neighbour_mask).sum(axis=2) / k_safe
+        larger += (z * perm_lag >= local_i).sum(axis=0)
+
+    # Folded (two-sided) pseudo p-value as in PySAL
+    larger = np.minimum(larger, permutations - larger)
+    p_values = (larger + 1) / (permutations + 1)
+    p_values[k == 0] = 1.0
+    return local_i, lag, p_values
+
+
+def getis_ord_gi_star(values, adjacency):
+    """
+    Getis-Ord Gi* z-scores (binary weights including the unit itself) and two-sided p-values.
+    """
+    x = np.asarray(values, dtype=float)
+    n = len(x)
+    if n < 3:
+        return np.zeros(n), np.ones(n)
+
+    weights = adjacency + sparse.identity(n, format='csr')
+    w_sum = np.asarray(weights.sum(axis=1)).ravel()
+    w_sq_sum = np.asarray(weights.multiply(weights).sum(axis=1)).ravel()
+
+    mean, std = x.mean(), x.std()
+    numerator = weights @ x - mean * w_sum
+    denominator = std * np.sqrt(np.maximum(n * w_sq_sum - w_sum ** 2, 0) / (n - 1))
+    gi_z = np.divide(numerator, denominator, out=np.zeros(n), where=denominator > 0)
+    return gi_z, 2 * norm.sf(np.abs(gi_z))
+
+
+def detect_hotspots(district_values, gdf, adjacency, value_col, permutations=PERMUTATIONS, seed=42):
+    """
+    Runs Local Moran's I and Gi* on a district metric aligned to the GeoJSON polygons.
+
+    `district_values` must hold one row per polygon position in column 'Geo_Pos' (see
+    align_to_polygons). Polygons without a value are left out, together with their links.
+    """
+    columns = ['district', 'state', value_col, 'Neighbours', 'Local_I', 'Moran_p', 'Quadrant',
+               'Gi_Z', 'Gi_p', 'Hotspot']
+    if adjacency is None or district_values.empty:
+        return pd.DataFrame(columns=columns)
+
+    pos = district_values['Geo_Pos'].to_numpy()
+    x = district_values[value_col].to_numpy(dtype=float)
+    sub = adjacency[pos][:, pos]
+
+    local_i, lag, moran_p = local_morans_i(x, sub, permutations=permutations, seed=seed)
+    gi_z, gi_p = getis_ord_gi_star(x, sub)
+
+    z = x - x.mean()
+    quadrant = np.select([(z > 0) & (lag > 0), (z < 0) & (lag < 0), (z < 0) & (lag > 0), (z > 0) & (lag < 0)],
+                         ['High-High', 'Low-Low', 'Low-High', 'High-Low'], default='None')
+
+    result = pd.DataFrame({
+        'district': gdf['district'].to_numpy()[pos] if 'district' in gdf.columns else pos,
+        'state': gdf['state'].to_numpy()[pos] if 'state' in gdf.columns else None,
+        value_col: x,
+        'Neighbours': np.asarray(sub.sum(axis=1)).ravel().astype(int),
+        'Local_I': local_i.round(3),
+        'Moran_p': moran_p.round(4),
+        'Quadrant': np.where(moran_p < SIGNIFICANCE, quadrant, 'Not significant'),
+        'Gi_Z': gi_z.round(2),
+        'Gi_p': gi_p.round(4),
+    })
+    result['Hotspot'] = np.select([(gi_p < SIGNIFICANCE) & (gi_z > 0), (gi_p < SIGNIFICANCE) & (gi_z < 0)],
+                                  ['Hot spot', 'Cold spot'], default='Not significant')
+    return result.sort_values('Gi_Z', ascending=False).reset_index(drop=True)
+
+
+def align_to_polygons(gdf, df_metrics, value_col, crosswalk=None):
+    """
+    Sums a district metric onto GeoJSON polygon positions (0..n-1) using the map merge.
+    Returns DataFrame: Geo_Pos, value_col.
+    """
+    if gdf.empty:
+        return pd.DataFrame(columns=['Geo_Pos', value_col])
+    geo = gdf.reset_index(drop=True).copy()
+    geo['Geo_Pos'] = np.arange(len(geo))
+    merged = merge_for_map(geo, df_metrics, value_col, crosswalk=crosswalk)
+    if merged.empty or value_col not in merged.columns:
+        return pd.DataFrame(columns=['Geo_Pos', value_col])
+    merged = merged.dropna(subset=[value_col])
+    return merged.groupby('Geo_Pos')[value_col].sum().reset_index()
+
+
+@timed
+def district_update_hotspots(df_upd, gdf, adjacency, crosswalk=None, update_type='Demographic'):
+    """
+    Hot-spot analysis of district update volumes (default: demographic/address updates,
+    the migration signal). See detect_hotspots for the output columns.
+    """
+    df = df_upd[df_upd['Type'] == update_type] if update_type and 'Type' in df_upd.columns else df_upd
+    totals = df.groupby(['District', 'State'])['Count'].sum().reset_index()
+    totals.rename(columns={'Count': 'Total_Updates'}, inplace=True)
+
+    district_values = align_to_polygons(gdf, totals, 'Total_Updates', crosswalk=crosswalk)
+    return detect_hotspots(district_values, gdf.reset_index(drop=True), adjacency, 'Total_Updates')
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_update_hotspots(dataset_version, date_window, _df_upd, _crosswalk=None):
+    """
+    district_update_hotspots over the district boundaries, cached per (dataset version, date window);
+    the frames themselves are not hashed. Empty without district boundaries.
+    """
+    adjacency = load_district_adjacency()
+    if adjacency is None:
+        return pd.DataFrame()
+    return district_update_hotspots(_df_upd, load_geodata(), adjacency, crosswalk=_crosswalk)
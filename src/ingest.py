@@ -0,0 +1,330 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+import numpy as np
+
+
+# =============================================================================
+# SHARD INGEST WITH CROSS-SHARD DEDUPLICATION
+# API shards are named by row range; re-downloads and overlapping ranges repeat
+# rows, which pd.concat would silently double-count. Each row is hashed on its
+# key (date, state, district, pincode) and a persistent index records which shard
+# owns each key: a row is kept only by the shard that owns it, the first shard in
+# file-name order holding the key (as in duckdb_backend). Shards are read in name
+# order, so a shard takes over keys owned by a later-named one, which has not been
+# read yet in that pass (the watcher re-reads everything when a new shard does not
+# sort after the existing ones). The index also
+# records each shard's size and mtime; a shard rewritten under the same name
+# gives up its keys and is deduplicated afresh. The check per shard
+# is a vectorized binary search against the sorted index, so there is never a
+# pairwise drop_duplicates over the concatenated table.
+# =============================================================================
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Root holding the api_data_aadhar_* shard directories (overridable, e.g. for synthetic load-test data)
+DATA_DIR = os.environ.get('DRISHTI_DATA_DIR', BASE_DIR)
+CACHE_DIR = os.path.join(DATA_DIR, '.cache')
+
+# Raw CSV column names identifying one record
+DEDUP_KEY_COLS = ['date', 'state', 'district', 'pincode']
+# Version of the key hashing; persisted indexes with another version are rebuilt
+INDEX_VERSION = 2
+
+# Shard directory and raw count columns of each dataset
+DATASET_DIRS = {
+    'enrolment': 'api_data_aadhar_enrolment',
+    'demographic': 'api_data_aadhar_demographic',
+    'biometric': 'api_data_aadhar_biometric',
+}
+VALUE_COLS = {
+    'enrolment': ['age_0_5', 'age_5_17', 'age_18_greater'],
+    'demographic': ['demo_age_5_17', 'demo_age_17_'],
+    'biometric': ['bio_age_5_17', 'bio_age_17_'],
+}
+
+
+def list_shards(dataset_dir):
+    """
+    Returns the CSV shards of a dataset directory in row-range (file name) order.
+    """
+    path = os.path.join(DATA_DIR, dataset_dir)
+    if not os.path.isdir(path):
+        return []
+    return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.csv'))
+
+
+def dataset_fingerprint(files):
+    """
+    Short fingerprint of a set of shard files (name, size, mtime); changes whenever a shard does.
+    """
+    digest = hashlib.sha1()
+    for path in sorted(files):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}|{stat.st_size}|{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def normalize_keys(df, key_cols=DEDUP_KEY_COLS):
+    """
+    The key columns as normalized strings, so a record hashes the same in every shard:
+    surrounding whitespace stripped, dd-mm-YYYY dates as YYYY-MM-DD, numeric pincodes as
+    integers (a shard with a blank pincode reads the column as float: 110001.0 → '110001').
+    Values that do not parse keep their stripped text.
+    """
+    keys = pd.DataFrame(index=df.index)
+    for col in key_cols:
+        raw = df[col].astype(str).str.strip()
+        if col == 'date':
+            parsed = pd.to_datetime(raw, format='%d-%m-%Y', errors='coerce')
+            keys[col] = parsed.dt.strftime('%Y-%m-%d').where(parsed.notna(), raw)
+        elif col == 'pincode':
+            numeric = pd.to_numeric(df[col], errors='coerce')
+            keys[col] = numeric.round().astype('Int64').astype(str).where(numeric.notna(), raw)
+        else:
+            keys[col] = raw
+    return keys
+
+
+def row_hashes(df, key_cols=DEDUP_KEY_COLS):
+    """
+    64-bit hash per row over the normalized key columns (see normalize_keys).
+    """
+    return pd.util.hash_pandas_object(normalize_keys(df, key_cols), index=False).to_numpy(dtype=np.uint64)
+
+
+def _index_path(dataset):
+    return os.path.join(CACHE_DIR, f'row_index_{dataset}.npz')
+
+
+def load_row_index(dataset):
+    """
+    Loads the persistent hash index of a dataset: sorted hashes, owning shard id per hash, shard names
+    and the (size, mtime_ns) of each shard when it was indexed.
+    """
+    path = _index_path(dataset)
+    if os.path.exists(path):
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if 'version' not in data.files or int(data['version']) != INDEX_VERSION:
+                    raise ValueError("row index written with another key hashing")
+                shards = [str(name) for name in data['shards']]
+                # Indexes written before stats were recorded match no shard, so they are rebuilt
+                stats = [tuple(int(value) for value in row) for row in data['stats']] \
+                    if 'stats' in data.files else [(-1, -1)] * len(shards)
+                return {'hashes': data['hashes'], 'owners': data['owners'], 'shards': shards, 'stats': stats}
+        except (OSError, KeyError, ValueError):
+            # A corrupt or outdated index is rebuilt from the shards
+            pass
+    return {'hashes': np.empty(0, dtype=np.uint64), 'owners': np.empty(0, dtype=np.int32), 'shards': [], 'stats': []}
+
+
+def save_row_index(dataset, index):
+    """
+    Writes the index atomically (temp file + rename) so readers never see a partial file.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _index_path(dataset)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, hashes=index['hashes'], owners=index['owners'],
+             shards=np.array(index['shards'], dtype=str),
+             stats=np.array(index['stats'], dtype=np.int64).reshape(-1, 2), version=INDEX_VERSION)
+    os.replace(tmp_path, path)
+
+
+def shard_stats(files):
+    """
+    {shard file name: (size, mtime_ns)} of shard paths.
+    """
+    stats = {}
+    for path in files:
+        stat = os.stat(path)
+        stats[os.path.basename(path)] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+
+def _forget_stale_shards(index, stats):
+    # Keys owned by deleted or rewritten shards (size / mtime differ from `stats`) are released, so
+    # the next shard containing them takes ownership; those names are dropped and the remaining
+    # owner ids renumbered to match
+    present = np.array([stats.get(name) == tuple(stat) for name, stat in zip(index['shards'], index['stats'])],
+                       dtype=bool)
+    if present.all():
+        return index, False
+    keep = present[index['owners']] if len(index['owners']) else np.empty(0, dtype=bool)
+    new_ids = (np.cumsum(present) - 1).astype(np.int32)
+    return {
+        'hashes': index['hashes'][keep],
+        'owners': new_ids[index['owners'][keep]],
+        'shards': [name for name, alive in zip(index['shards'], present) if alive],
+        'stats': [stat for stat, alive in zip(index['stats'], present) if alive],
+    }, True
+
+
+def _add_keys(index, new_hashes, owner_id):
+    # Merge newly owned hashes into the sorted index
+    hashes = np.concatenate([index['hashes'], new_hashes])
+    owners = np.concatenate([index['owners'], np.full(len(new_hashes), owner_id, dtype=np.int32)])
+    order = np.argsort(hashes, kind='stable')
+    index['hashes'], index['owners'] = hashes[order], owners[order]
+
+
+def deduplicate_shard(df, shard_name, index, key_cols=DEDUP_KEY_COLS, stat=(-1, -1)):
+    """
+    Drops the rows of one shard whose key is owned by another shard, registering unseen keys
+    as owned by this shard (`stat`: its (size, mtime_ns), recorded when it is first indexed).
+    Keys owned by a shard later in file-name order are taken over, so shards must be
+    deduplicated in name order. Rows repeated within a single shard are left as they are.
+    Returns (deduplicated frame, number of rows dropped).
+    """
+    if shard_name not in index['shards']:
+        index['shards'].append(shard_name)
+        index['stats'].append(tuple(stat))
+    owner_id = index['shards'].index(shard_name)
+
+    hashes = row_hashes(df, key_cols)
+    found = np.zeros(len(hashes), dtype=bool)
+    keep = np.ones(len(hashes), dtype=bool)
+    if len(index['hashes']):
+        pos = np.minimum(np.searchsorted(index['hashes'], hashes), len(index['hashes']) - 1)
+        found = index['hashes'][pos] == hashes
+        later = np.array([name > shard_name for name in index['shards']], dtype=bool)
+        owners = index['owners'][pos[found]]
+        claim = later[owners]
+        keep[found] = (owners == owner_id) | claim
+        if claim.any():
+            # A new array, so read_shards sees that ownership changed
+            index['owners'] = index['owners'].copy()
+            index['owners'][pos[found][claim]] = owner_id
+
+    new_hashes = np.unique(hashes[~found])
+    if len(new_hashes):
+        _add_keys(index, new_hashes, owner_id)
+
+    return df[keep], int((~keep).sum())
+
+
+def read_shards(files, dataset, key_cols=DEDUP_KEY_COLS, only=None):
+    """
+    Reads and concatenates shard CSVs, dropping rows already contributed by another shard.
+    The ownership index is persisted under .cache/ and updated only when it changes.
+    `files` must list every shard of the dataset; with `only`, just those paths are read
+    (e.g. shards added since the last load).
+    """
+    files = sorted(files)
+    stats = shard_stats(files)
+    index = load_row_index(dataset)
+    index, changed = _forget_stale_shards(index, stats)
+    owners, n_shards = index['owners'], len(index['shards'])
+
+    frames = []
+    for path in files:
+        if only is not None and path not in only:
+            continue
+        name = os.path.basename(path)
+        df, _ = deduplicate_shard(pd.read_csv(path), name, index, key_cols, stats[name])
+        frames.append(df)
+
+    if changed or index['owners'] is not owners or len(index['shards']) != n_shards:
+        try:
+            save_row_index(dataset, index)
+        except OSError:
+            # Read-only checkouts still deduplicate, just without persisting the index
+            pass
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def iter_shard_chunks(files, dataset, chunksize=200_000, key_cols=DEDUP_KEY_COLS, only=None):
+    """
+    Streams deduplicated shard rows in chunks of at most `chunksize` (constant memory).
+    Yields (shard file name, chunk). Uses the persisted ownership index read-only.
+    As in read_shards, `files` lists every shard and `only` restricts which are read.
+    """
+    stats = shard_stats(files)
+    index = load_row_index(dataset)
+    index, _ = _forget_stale_shards(index, stats)
+    for path in sorted(files):
+        if only is not None and path not in only:
+            continue
+        name = os.path.basename(path)
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            chunk, _ = deduplicate_shard(chunk, name, index, key_cols, stats[name])
+            yield name, chunk
+
+
+def _manifest_path(dataset):
+    return os.path.join(CACHE_DIR, f'shard_manifest_{dataset}.json')
+
+
+def _describe_shard(path, chunksize=500_000):
+    # First/last date and the states of one shard, reading only those two columns
+    first, last, states = None, None, set()
+    for chunk in pd.read_csv(path, usecols=['date', 'state'], chunksize=chunksize):
+        dates = pd.to_datetime(chunk['date'], format='%d-%m-%Y', errors='coerce').dropna()
+        if len(dates):
+            first = min(first, dates.min()) if first is not None else dates.min()
+            last = max(last, dates.max()) if last is not None else dates.max()
+        states.update(chunk['state'].dropna().astype(str).unique())
+    return {
+        'first': first.strftime('%Y-%m-%d') if first is not None else None,
+        'last': last.strftime('%Y-%m-%d') if last is not None else None,
+        'states': sorted(states),
+    }
+
+
+def shard_manifest(files, dataset):
+    """
+    Date range and states of each shard: {shard file name: {'first', 'last', 'states'}}.
+    Persisted under .cache/ and re-scanned only for shards whose size or mtime changed,
+    so range queries can skip shards without opening them (see relevant_shards).
+    """
+    path = _manifest_path(dataset)
+    try:
+        with open(path) as fh:
+            cached = json.load(fh)
+    except (OSError, ValueError):
+        cached = {}
+
+    manifest, changed = {}, False
+    for shard in sorted(files):
+        name, stat = os.path.basename(shard), os.stat(shard)
+        entry = cached.get(name)
+        if entry is None or entry.get('size') != stat.st_size or entry.get('mtime_ns') != stat.st_mtime_ns:
+            entry = dict(_describe_shard(shard), size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            changed = True
+        manifest[name] = entry
+    changed = changed or set(cached) != set(manifest)
+
+    if changed:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as fh:
+                json.dump(manifest, fh)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+    return manifest
+
+
+def relevant_shards(files, dataset, states=None, start=None, end=None):
+    """
+    The shards of `files` that can hold rows of `states` (None = any) between `start` and `end`
+    (Timestamps, inclusive; None = open). Shards with no parseable dates are always kept.
+    """
+    manifest = shard_manifest(files, dataset)
+    states = set(states) if states is not None else None
+    selected = []
+    for shard in sorted(files):
+        entry = manifest[os.path.basename(shard)]
+        if states is not None and not states.intersection(entry['states']):
+            continue
+        if entry['first'] is not None:
+            if end is not None and pd.Timestamp(entry['first']) > end:
+                continue
+            if start is not None and pd.Timestamp(entry['last']) < start:
+                continue
+        selected.append(shard)
+    return selected
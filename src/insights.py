@@ -0,0 +1,229 @@
+import pandas as pd
+import numpy as np
+import streamlit as st
+
+from metrics import calculate_mbu_demand_forecast
+from panel import build_panel
+from profiling import timed
+
+
+# =============================================================================
+# RULE-BASED INSIGHT ENGINE
+# The national briefing behind "Generate AI Insight". The data is reduced once
+# to a district × reporting-day panel (updates, 5-17 and 17+ updates) plus
+# per-district enrolment totals; every rule is then an array expression over all
+# districts (or states) at once and returns its findings with a z-like score.
+# Findings are ranked by weighted |score| across rules and the briefing is cached
+# per dataset version, so the button does not rescan the data.
+# =============================================================================
+
+INSIGHT_WINDOW = 7           # recent reporting days compared against the days before them
+INSIGHT_MIN_UPDATES = 100    # districts with fewer updates are not scored
+INSIGHT_MAX_PER_RULE = 4     # keeps one rule from filling the whole briefing
+BRIEFING_SIZE = 12
+
+FINDING_COLUMNS = ['Rule', 'Title', 'District', 'State', 'Value', 'Score', 'Finding']
+
+
+def _robust_z(values):
+    # (x - median) / (1.4826 * MAD): outliers do not inflate their own yardstick
+    values = np.asarray(values, dtype=float)
+    median = np.nanmedian(values)
+    mad = 1.4826 * np.nanmedian(np.abs(values - median))
+    if not np.isfinite(mad) or mad == 0:
+        return np.zeros_like(values)
+    return (values - median) / mad
+
+
+def _findings(rule, units, mask, value, score, text):
+    # Rows of `units` where `mask` holds, as a findings frame (text: one string per flagged row)
+    if not mask.any():
+        return pd.DataFrame(columns=FINDING_COLUMNS)
+    flagged = units[mask].reset_index(drop=True)
+    return pd.DataFrame({
+        'Rule': rule,
+        'Title': INSIGHT_RULES[rule][2],
+        'District': flagged['District'] if 'District' in flagged.columns else '',
+        'State': flagged['State'],
+        'Value': np.asarray(value)[mask],
+        'Score': np.round(np.asarray(score)[mask], 2),
+        'Finding': text,
+    })
+
+
+def build_insight_base(df_enr, df_upd, window=INSIGHT_WINDOW):
+    """
+    The shared inputs of all rules: district × reporting-day update panel (Count, Age_5_17, Age_17_Plus),
+    enrolments per district, the state MBU forecast and biometric updates per state.
+    """
+    value_cols = ['Count', 'Age_5_17', 'Age_17_Plus']
+    units, days, values = build_panel(df_upd, value_cols) if not df_upd.empty else \
+        (pd.DataFrame(columns=['District', 'State']), pd.DatetimeIndex([]), np.zeros((0, 0, 3)))
+
+    # Days on which no district reported anything (holidays, gaps between API pulls) are dropped
+    reported = values[..., 0].sum(axis=0) > 0
+    days, values = days[reported], values[:, reported]
+
+    enrolments = df_enr.groupby(['District', 'State'])['Enrolment_Count'].sum() if not df_enr.empty else pd.Series(dtype=float)
+    biometric = df_upd[df_upd['Type'] == 'Biometric'].groupby('State')['Count'].sum() \
+        if 'Type' in df_upd.columns else pd.Series(dtype=float)
+
+    return {
+        'units': units,
+        'days': days,
+        'updates': values[..., 0],
+        'adult': values[..., 2],
+        'enrolments': enrolments.reindex(pd.MultiIndex.from_frame(units)).fillna(0).to_numpy() if len(units) else np.zeros(0),
+        'mbu': calculate_mbu_demand_forecast(df_enr) if not df_enr.empty else pd.DataFrame(),
+        'biometric': biometric,
+        'window': window,
+    }
+
+
+def intensity_outliers(base, threshold=3.0):
+    """
+    Districts whose updates per 1,000 enrolments sit far from the national norm (robust z of the log).
+    """
+    totals, enrolments = base['updates'].sum(axis=1), base['enrolments']
+    eligible = (totals >= INSIGHT_MIN_UPDATES) & (enrolments > 0)
+    intensity = np.divide(totals * 1000, enrolments, out=np.zeros_like(totals), where=enrolments > 0)
+    z = np.zeros_like(totals)
+    z[eligible] = _robust_z(np.log(intensity[eligible]))
+    mask = eligible & (np.abs(z) >= threshold)
+    text = [f"{value:,.0f} updates per 1,000 enrolments, {'far above' if score > 0 else 'far below'} the national norm"
+            for value, score in zip(intensity[mask], z[mask])]
+    return _findings('intensity_outliers', base['units'], mask, intensity.round(0), z, text)
+
+
+def spike_onset(base, min_ratio=2.0, threshold=3.0):
+    """
+    Districts whose daily updates over the last `window` reporting days jumped against their own earlier
+    baseline, beyond the national change over the same days (so a country-wide ramp-up is not a spike).
+    The onset is the first recent day above the expected level + 3 standard deviations.
+    """
+    series, window = base['updates'], base['window']
+    if series.shape[1] < 2 * window:
+        return pd.DataFrame(columns=FINDING_COLUMNS)
+    baseline, recent = series[:, :-window], series[:, -window:]
+    national = recent.sum() / window / max(baseline.sum() / baseline.shape[1], 1)
+    expected = baseline.mean(axis=1) * national
+    base_std = baseline.std(axis=1) * national
+    recent_mean = recent.mean(axis=1)
+
+    ratio = np.divide(recent_mean, expected, out=np.full_like(recent_mean, np.inf), where=expected > 0)
+    # Poisson floor on the spread, so a flat baseline does not make every uptick significant
+    spread = np.maximum(base_std, np.sqrt(np.maximum(expected, 1))) / np.sqrt(window)
+    z = (recent_mean - expected) / spread
+    mask = (series.sum(axis=1) >= INSIGHT_MIN_UPDATES) & (ratio >= min_ratio) & (z >= threshold)
+
+    above = recent > (expected + 3 * base_std)[:, None]
+    onset = base['days'][-window:][np.where(above.any(axis=1), above.argmax(axis=1), 0)]
+    text = [f"Updates {r:.1f}x the national trend since {day:%d %b} ({total:,.0f} in the last {window} reporting days)"
+            if np.isfinite(r) else f"Updates started on {day:%d %b} ({total:,.0f} in the last {window} reporting days)"
+            for r, day, total in zip(ratio[mask], onset[mask], recent.sum(axis=1)[mask])]
+    return _findings('spike_onset', base['units'], mask, ratio.round(2), z, text)
+
+
+def age_mix_shift(base, min_shift=0.1, threshold=4.0):
+    """
+    Districts where the 17+ share of updates moved between the baseline and the last `window` days
+    (two-proportion z-test over all districts at once).
+    """
+    updates, adult, window = base['updates'], base['adult'], base['window']
+    if updates.shape[1] < 2 * window:
+        return pd.DataFrame(columns=FINDING_COLUMNS)
+    n_base, n_recent = updates[:, :-window].sum(axis=1), updates[:, -window:].sum(axis=1)
+    a_base, a_recent = adult[:, :-window].sum(axis=1), adult[:, -window:].sum(axis=1)
+    eligible = (n_base >= INSIGHT_MIN_UPDATES / 2) & (n_recent >= INSIGHT_MIN_UPDATES / 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_base, p_recent = a_base / n_base, a_recent / n_recent
+        pooled = (a_base + a_recent) / (n_base + n_recent)
+        z = (p_recent - p_base) / np.sqrt(pooled * (1 - pooled) * (1 / n_base + 1 / n_recent))
+    z = np.where(eligible & np.isfinite(z), z, 0)
+    shift = np.where(eligible, p_recent - p_base, 0)
+    mask = (np.abs(z) >= threshold) & (np.abs(shift) >= min_shift)
+    text = [f"17+ share of updates {before:.0%} → {after:.0%} in the last {window} reporting days"
+            for before, after in zip(p_base[mask], p_recent[mask])]
+    return _findings('age_mix_shift', base['units'], mask, shift.round(3), z, text)
+
+
+def mbu_backlog(base, threshold=-1.5):
+    """
+    States whose biometric updates cover the least of their projected MBU demand (robust z of the
+    log coverage across states). Skipped when no biometric updates are loaded.
+    """
+    forecast, biometric = base['mbu'], base['biometric']
+    if forecast.empty or biometric.sum() == 0:
+        return pd.DataFrame(columns=FINDING_COLUMNS)
+    demand = forecast['Total_MBU_Demand'].to_numpy(dtype=float)
+    delivered = biometric.reindex(forecast['State']).fillna(0).to_numpy(dtype=float)
+    eligible = demand > 0
+    coverage = np.divide(delivered, demand, out=np.zeros_like(demand), where=eligible)
+    z = np.zeros_like(demand)
+    z[eligible] = _robust_z(np.log(np.maximum(coverage[eligible], 1e-3)))
+    # Only states with demand actually outstanding; low coverage relative to peers alone is not a backlog
+    mask = eligible & (z <= threshold) & (coverage < 1)
+    text = [f"Biometric updates cover {c:.0%} of the projected MBU demand ({d - b:,.0f} outstanding)"
+            for c, d, b in zip(coverage[mask], demand[mask], delivered[mask])]
+    return _findings('mbu_backlog', forecast[['State']], mask, coverage.round(3), z, text)
+
+
+# rule name → (function, weight in the ranking, title)
+INSIGHT_RULES = {
+    'spike_onset': (spike_onset, 1.2, "Update spike"),
+    'intensity_outliers': (intensity_outliers, 1.0, "Intensity outlier"),
+    'age_mix_shift': (age_mix_shift, 0.8, "Age-mix shift"),
+    'mbu_backlog': (mbu_backlog, 1.0, "MBU backlog"),
+}
+
+
+def rank_findings(findings, size=BRIEFING_SIZE, max_per_rule=INSIGHT_MAX_PER_RULE):
+    """
+    Orders findings by weighted |score|, keeping at most `max_per_rule` per rule, and numbers them.
+    """
+    if findings.empty:
+        return findings.assign(Rank=pd.Series(dtype=int))
+    weights = findings['Rule'].map({name: rule[1] for name, rule in INSIGHT_RULES.items()})
+    ranked = findings.assign(_priority=findings['Score'].abs() * weights)
+    ranked = ranked.sort_values('_priority', ascending=False, kind='stable')
+    ranked = ranked[ranked.groupby('Rule').cumcount() < max_per_rule].head(size)
+    ranked = ranked.drop(columns='_priority').reset_index(drop=True)
+    ranked.insert(0, 'Rank', np.arange(1, len(ranked) + 1))
+    return ranked
+
+
+@timed
+def generate_briefing(df_enr, df_upd, rules=None, size=BRIEFING_SIZE):
+    """
+    National briefing: {'headline': [sentences], 'findings': ranked DataFrame
+    (Rank, Rule, Title, District, State, Value, Score, Finding), 'counts': {rule: findings before ranking}}.
+    """
+    base = build_insight_base(df_enr, df_upd)
+    results = {name: INSIGHT_RULES[name][0](base) for name in (rules or INSIGHT_RULES)}
+    findings = pd.concat([result for result in results.values() if not result.empty] or
+                         [pd.DataFrame(columns=FINDING_COLUMNS)], ignore_index=True)
+
+    total_enr = df_enr['Enrolment_Count'].sum() if not df_enr.empty else 0
+    total_upd = df_upd['Count'].sum() if not df_upd.empty else 0
+    ratio = total_upd / total_enr if total_enr > 0 else 0
+    if ratio > 0.5:
+        headline = [f"🔄 **Maintenance Phase**: Updates ({total_upd:,.0f}) are {ratio:.0%} of enrolments, suggesting a mature ecosystem."]
+    else:
+        headline = ["🆕 **Acquisition Phase**: Focus is still largely on new enrolments over updates."]
+    scored = int((base['updates'].sum(axis=1) >= INSIGHT_MIN_UPDATES).sum())
+    headline.append(f"🔎 {len(findings)} findings across {scored:,} districts with {INSIGHT_MIN_UPDATES}+ updates.")
+
+    return {
+        'headline': headline,
+        'findings': rank_findings(findings, size=size),
+        'counts': {name: len(result) for name, result in results.items()},
+    }
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def cached_briefing(dataset_version, _df_enr, _df_upd):
+    """
+    generate_briefing cached per dataset version; the frames themselves are not hashed.
+    """
+    return generate_briefing(_df_enr, _df_upd)
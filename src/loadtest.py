@@ -0,0 +1,312 @@
+import os
+import random
+import resource
+import shutil
+import threading
+import time
+
+import pandas as pd
+import numpy as np
+
+
+# =============================================================================
+# CONCURRENT-USER LOAD TEST
+# Simulates N dashboard sessions at once. Each session reruns the way a user
+# drives the app: pick a State, then a District, switch sections, go back to
+# All India. Sessions run either
+# - against the compute path (mode 'compute'): the app's data snapshot, date and
+#   State/District filtering and the section's metric jobs via prefetch.fetch,
+#   with the other sections prefetched in the background as app.py does, or
+# - against the full script (mode 'app'): one streamlit AppTest per session.
+# Per session count it reports p50/p95/p99 rerun latency, CPU time and RSS.
+# Synthetic data is the bundled shards repeated with dates shifted back one year
+# per copy, so keys stay distinct and the deduplicating ingest keeps every row.
+#
+#   python src/loadtest.py --scale 4 --sessions 1,4,16 --reruns 20
+#
+# The project modules are imported only after DRISHTI_DATA_DIR (and DRISHTI_WATCH=0)
+# have been set, because the shard location is read at import time.
+# =============================================================================
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+# Repo root holding the bundled shards, and the shard directories as in ingest.DATASET_DIRS
+# (repeated here so that writing the synthetic data imports nothing that reads DRISHTI_DATA_DIR)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARD_DIRS = {
+    'enrolment': 'api_data_aadhar_enrolment',
+    'demographic': 'api_data_aadhar_demographic',
+    'biometric': 'api_data_aadhar_biometric',
+}
+SECTIONS = ['trends', 'seasonal', 'migration', 'age18', 'intensity', 'demographics', 'integrity', 'trivariate']
+# Probability of each kind of interaction per rerun
+ACTIONS = {'section': 0.5, 'state': 0.2, 'district': 0.2, 'all_india': 0.1}
+
+
+def make_synthetic_data(scale, out_dir, source_dir=None):
+    """
+    Writes `scale` copies of the bundled shards to `out_dir` (same directory layout), copy i with
+    its dates moved back i years. Returns {dataset: rows written}.
+    Must run before the project modules are imported (see the header).
+    """
+    source_dir = source_dir or BASE_DIR
+    rows = {}
+    for dataset, shard_dir in SHARD_DIRS.items():
+        source = os.path.join(source_dir, shard_dir)
+        if not os.path.isdir(source):
+            continue
+        target = os.path.join(out_dir, shard_dir)
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(target)
+        rows[dataset] = 0
+        for name in sorted(os.listdir(source)):
+            if not name.endswith('.csv'):
+                continue
+            df = pd.read_csv(os.path.join(source, name), dtype=str)
+            dates = pd.to_datetime(df['date'], format='%d-%m-%Y', errors='coerce')
+            stem = name[:-len('.csv')]
+            for copy in range(scale):
+                shifted = df.assign(date=(dates - pd.DateOffset(years=copy)).dt.strftime('%d-%m-%Y'))
+                shifted.to_csv(os.path.join(target, f'{stem}_copy{copy:03d}.csv'), index=False)
+                rows[dataset] += len(shifted)
+    return rows
+
+
+def _next_view(view, rng, states, districts):
+    # One user interaction: returns the new (state, district, section)
+    state, district, section = view
+    action = rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+    if action == 'section':
+        section = rng.choice([s for s in SECTIONS if s != section])
+    elif action == 'state' or (action == 'district' and state == 'All'):
+        state, district = rng.choice(states), 'All'
+    elif action == 'district':
+        district = rng.choice(districts[state]) if districts.get(state) else 'All'
+    else:
+        state, district = 'All', 'All'
+    return state, district, section
+
+
+class ComputeSession:
+    """
+    One simulated session on the compute path: every rerun filters the current snapshot and
+    fetches the active section's metrics (misses are computed synchronously, as in the app).
+    """
+
+    def __init__(self, store, window=(None, None)):
+        self.store = store
+        self.window = window
+
+    def rerun(self, state, district, section):
+        from data_loader import load_district_crosswalk
+        from prefetch import SECTION_JOBS, fetch, prefetch_sections
+        from time_index import slice_dates
+
+        snapshot = self.store.snapshot()
+        df_enr_full, df_upd_full = (slice_dates(df, *self.window) for df in snapshot['frames'])
+        df_enr, df_upd = df_enr_full, df_upd_full
+        if state != 'All':
+            df_enr, df_upd = df_enr[df_enr['State'] == state], df_upd[df_upd['State'] == state]
+            if district != 'All':
+                df_enr, df_upd = df_enr[df_enr['District'] == district], df_upd[df_upd['District'] == district]
+
+        frames = {'enr': df_enr, 'upd': df_upd, 'enr_full': df_enr_full, 'upd_full': df_upd_full,
+                  'crosswalk_full': load_district_crosswalk(snapshot['version'], *snapshot['frames'])}
+        view_key = (tuple(str(bound) for bound in self.window), state, district,
+                    snapshot['version'], self.store.state_version(state))
+        for fn, frame_names in SECTION_JOBS.get(section, []):
+            fetch(fn, frames, frame_names, view_key)
+        prefetch_sections([s for s in SECTION_JOBS if s != section], frames, view_key)
+
+
+class AppSession:
+    """
+    One simulated session running the whole app script through streamlit's AppTest.
+    """
+
+    def __init__(self, timeout=600):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.app.run()
+        self.view = ('All', 'All', 'trends')
+
+    def rerun(self, state, district, section):
+        old_state, old_district, old_section = self.view
+        if state != old_state:
+            self.app.selectbox(key='state_filter_main').set_value(state)
+            # The District box only exists once a State is selected
+            self.app.run()
+        if state != 'All' and district != old_district:
+            self.app.selectbox(key='dist_filter_main').set_value(district)
+        if section != old_section:
+            self.app.radio(key='active_section').set_value(section)
+        self.app.run()
+        if self.app.exception:
+            raise RuntimeError(self.app.exception[0].value)
+        self.view = (state, district, section)
+
+
+def _rss_mb():
+    # Current resident set size from /proc (Linux); None elsewhere
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _cpu_s():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_level(n_sessions, make_session, states, districts, reruns=20, think_s=0.2, seed=0):
+    """
+    Runs `n_sessions` concurrent sessions of `reruns` interactions each (exponential think time
+    with mean `think_s` between reruns). Returns a dict of latency, CPU and memory figures.
+    """
+    latencies, errors = [], []
+    lock = threading.Lock()
+    started = {}
+    # Sessions are set up first (an AppTest session runs the script once); the clock starts when all are ready
+    barrier = threading.Barrier(n_sessions, action=lambda: started.update(cpu=_cpu_s(), wall=time.perf_counter()))
+
+    def drive(session_id):
+        rng = random.Random(seed * 1000 + session_id)
+        try:
+            session = make_session()
+        except Exception as exc:
+            with lock:
+                errors.append(repr(exc))
+            barrier.abort()
+            return
+        view = ('All', 'All', 'trends')
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            return
+        for _ in range(reruns):
+            time.sleep(rng.expovariate(1 / think_s) if think_s > 0 else 0)
+            view = _next_view(view, rng, states, districts)
+            start = time.perf_counter()
+            try:
+                session.rerun(*view)
+            except Exception as exc:
+                with lock:
+                    errors.append(repr(exc))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=drive, args=(i,), name=f'loadtest-session-{i}') for i in range(n_sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if not started:
+        raise RuntimeError(f"Sessions could not be started: {errors[0] if errors else 'unknown error'}")
+    cpu_s, wall_s = _cpu_s() - started['cpu'], time.perf_counter() - started['wall']
+
+    latency_ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latency_ms, [50, 95, 99]) if len(latency_ms) else (np.nan,) * 3
+    return {
+        'Sessions': n_sessions,
+        'Reruns': len(latencies),
+        'Errors': len(errors),
+        'P50_ms': round(p50, 1),
+        'P95_ms': round(p95, 1),
+        'P99_ms': round(p99, 1),
+        'Max_ms': round(latency_ms.max(), 1) if len(latency_ms) else np.nan,
+        'Reruns_per_s': round(len(latencies) / wall_s, 2),
+        'CPU_s': round(cpu_s, 2),
+        'CPU_util': round(cpu_s / wall_s, 2),
+        'RSS_MB': round(_rss_mb() or np.nan),
+        # ru_maxrss is in KiB on Linux
+        'Peak_RSS_MB': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+        'First_error': errors[0] if errors else '',
+    }
+
+
+def run_load_test(session_counts, mode='compute', reruns=20, think_s=0.2, window=(None, None), seed=0):
+    """
+    Runs one level per session count, clearing the shared metric cache between levels so each
+    starts cold. Returns a DataFrame with one row per level (see run_level).
+    """
+    import prefetch
+    from watcher import get_store
+
+    store = get_store()
+    df_enr, _ = store.snapshot()['frames']
+    states = sorted(df_enr['State'].unique())
+    districts = {state: sorted(group.unique()) for state, group in df_enr.groupby('State')['District']}
+
+    if mode == 'app':
+        make_session = AppSession
+    else:
+        def make_session():
+            return ComputeSession(store, window)
+
+    rows = []
+    for n_sessions in session_counts:
+        prefetch.clear()
+        rows.append(run_level(n_sessions, make_session, states, districts, reruns, think_s, seed))
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    import argparse
+    import logging
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the dashboard.")
+    parser.add_argument('--mode', choices=['compute', 'app'], default='compute',
+                        help="drive the metric compute path directly, or the whole script via AppTest")
+    parser.add_argument('--sessions', default='1,2,4,8', help="comma-separated session counts")
+    parser.add_argument('--reruns', type=int, default=20, help="interactions per session")
+    parser.add_argument('--think', type=float, default=0.2, help="mean think time between reruns (s)")
+    parser.add_argument('--scale', type=int, default=1, help="copies of the bundled shards (1 = as shipped)")
+    parser.add_argument('--data-dir', help="where to write the synthetic shards (default: a temp directory)")
+    parser.add_argument('--backend', choices=['pandas', 'duckdb'], help="metric engine (DRISHTI_BACKEND)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="CSV file for the results")
+    args = parser.parse_args()
+
+    data_dir, written = None, None
+    if args.scale > 1:
+        data_dir = args.data_dir or tempfile.mkdtemp(prefix='drishti-loadtest-')
+        written = make_synthetic_data(args.scale, data_dir)
+        print(f"Synthetic data in {data_dir}: " + ", ".join(f"{name} {rows:,} rows" for name, rows in written.items()))
+        os.environ['DRISHTI_DATA_DIR'] = data_dir
+    os.environ['DRISHTI_WATCH'] = '0'
+    os.environ.setdefault('DRISHTI_PROFILE', '0')
+    if args.backend:
+        os.environ['DRISHTI_BACKEND'] = args.backend
+
+    try:
+        start = time.perf_counter()
+        from watcher import get_store
+        # Session threads have no ScriptRunContext; streamlit warns about it on every cache access
+        logging.getLogger('streamlit.runtime.scriptrunner_utils.script_run_context').setLevel(logging.ERROR)
+        logging.getLogger('streamlit.runtime.caching.cache_data_api').setLevel(logging.ERROR)
+        df_enr, df_upd = get_store().snapshot()['frames']
+        print(f"Loaded in {time.perf_counter() - start:.1f}s (RSS {_rss_mb() or 0:.0f} MB, {os.cpu_count()} CPUs)")
+        if written is not None:
+            # Every copy has distinct keys, so the load must hold scale × the bundled rows
+            expected = (written.get('enrolment', 0), written.get('demographic', 0) + written.get('biometric', 0))
+            if (len(df_enr), len(df_upd)) != expected:
+                raise SystemExit(f"Loaded {len(df_enr):,} enrolment / {len(df_upd):,} update rows from {data_dir}, "
+                                 f"expected {expected[0]:,} / {expected[1]:,} ({args.scale} × the bundled rows)")
+
+        report = run_load_test([int(n) for n in args.sessions.split(',')], args.mode, args.reruns,
+                               args.think, seed=args.seed)
+        print(report.drop(columns='First_error').to_string(index=False))
+        if report['Errors'].any():
+            print("First error:", report.loc[report['Errors'] > 0, 'First_error'].iloc[0])
+        if args.output:
+            report.to_csv(args.output, index=False)
+    finally:
+        if data_dir is not None and args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
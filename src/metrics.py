@@ -1,13 +1,19 @@
 import pandas as pd
-from sklearn.ensemble import IsolationForest
 import numpy as np
 from datetime import datetime
 
+from profiling import timed
+from time_index import parse_dates
+from velocity import build_velocity_panel, compute_velocity
+from panel import build_panel, window_sums, lagged_correlation_fft
+from kernel import GroupIndex, group_sum, shift_within
+
 
 # =============================================================================
 # EXISTING METRICS
 # =============================================================================
 
+@timed
 def calculate_update_intensity(df_upd, df_enr):
     """
     Calculates Update Intensity.
@@ -15,11 +21,11 @@ def calculate_update_intensity(df_upd, df_enr):
     Higher intensity implies active maintenance of Aadhaar details.
     """
     # Aggregate Updates by District
-    upd_agg = df_upd.groupby(['District', 'State'])['Count'].sum().reset_index()
+    upd_agg = group_sum(df_upd, ['District', 'State'], ['Count'])
     upd_agg.rename(columns={'Count': 'Total_Updates'}, inplace=True)
     
     # Aggregate Enrolment (Proxy for Population)
-    enr_agg = df_enr.groupby(['District'])['Enrolment_Count'].sum().reset_index()
+    enr_agg = group_sum(df_enr, ['District'], ['Enrolment_Count'])
     
     # Merge
     merged = upd_agg.merge(enr_agg, on='District', how='left')
@@ -32,6 +38,7 @@ def calculate_update_intensity(df_upd, df_enr):
     
     return merged
 
+@timed
 def calculate_age_distribution(df_enr):
     """
     Calculates age distribution share.
@@ -46,21 +53,22 @@ def calculate_age_distribution(df_enr):
         "18+ Years": total_18_plus
     }
 
+@timed
 def detect_anomalies(df_enr):
     """
     Uses Isolation Forest to detect anomalies in Enrolment Volume.
     Detects districts with unusually low or high enrolment activity.
     """
     # Aggregate by District
-    df_agg = df_enr.groupby('District').agg({
-        'Enrolment_Count': 'sum'
-    }).reset_index()
+    df_agg = group_sum(df_enr, ['District'], ['Enrolment_Count'])
     
     df_agg = df_agg.fillna(0)
     
     # Isolation Forest
     # We use a 2D array for fit (Sample, Feature). Here just 1 feature.
     if len(df_agg) > 5:
+        # scikit-learn is imported on first use (slow import, only this section needs it)
+        from sklearn.ensemble import IsolationForest
         model = IsolationForest(contamination=0.05, random_state=42)
         df_agg['anomaly'] = model.fit_predict(df_agg[['Enrolment_Count']])
         # -1 is anomaly
@@ -75,36 +83,30 @@ def detect_anomalies(df_enr):
 # NEW METRICS: SEASONAL PATTERN ANALYSIS
 # =============================================================================
 
+# Season of each month number (index 0 unused)
+SEASON_BY_MONTH = np.array(['Regular Period'] * 13, dtype=object)
+SEASON_BY_MONTH[[11, 12, 1, 2]] = 'Wedding Season (Nov-Feb)'
+SEASON_BY_MONTH[[4, 5]] = 'Wedding Season (Apr-May)'
+SEASON_BY_MONTH[6] = 'School Admission (Jun)'
+
+
+@timed
 def get_seasonal_patterns(df_upd, df_enr):
     """
     Analyzes seasonal patterns in updates - wedding seasons, school admissions.
     Wedding Season: Nov-Feb, Apr-May (India)
     School Admission: Apr-Jun
     """
-    # Parse month from date
-    df_upd = df_upd.copy()
-    df_upd['Month_Num'] = pd.to_datetime(df_upd['Month'], format='%d-%m-%Y', errors='coerce').dt.month
-
-    # Aggregate by month
-    monthly_updates = df_upd.groupby('Month_Num')['Count'].sum().reset_index()
+    # Aggregate by month of the year (from the load-time month codes)
+    monthly_updates = group_sum(df_upd, ['Month_Num'], ['Count'])
     monthly_updates.columns = ['Month_Num', 'Total_Updates']
 
     # Calculate average
     avg_updates = monthly_updates['Total_Updates'].mean()
     monthly_updates['Deviation_Pct'] = ((monthly_updates['Total_Updates'] - avg_updates) / avg_updates * 100).round(1)
 
-    # Tag seasons
-    def tag_season(month):
-        if month in [11, 12, 1, 2]:
-            return 'Wedding Season (Nov-Feb)'
-        elif month in [4, 5]:
-            return 'Wedding Season (Apr-May)'
-        elif month in [6]:
-            return 'School Admission (Jun)'
-        else:
-            return 'Regular Period'
-
-    monthly_updates['Season'] = monthly_updates['Month_Num'].apply(tag_season)
+    # Tag seasons (one lookup over the month numbers)
+    monthly_updates['Season'] = SEASON_BY_MONTH[monthly_updates['Month_Num'].to_numpy(dtype=int)]
 
     # Month names
     month_names = {1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
@@ -114,15 +116,13 @@ def get_seasonal_patterns(df_upd, df_enr):
     return monthly_updates
 
 
+@timed
 def get_demographic_vs_biometric_seasonal(df_upd):
     """
     Compares demographic vs biometric updates by season.
     Hypothesis: Demographic updates spike during wedding season (name/address changes).
     """
-    df = df_upd.copy()
-    df['Month_Num'] = pd.to_datetime(df['Month'], format='%d-%m-%Y', errors='coerce').dt.month
-
-    seasonal_type = df.groupby(['Month_Num', 'Type'])['Count'].sum().reset_index()
+    seasonal_type = group_sum(df_upd, ['Month_Num', 'Type'], ['Count'])
 
     return seasonal_type
 
@@ -131,21 +131,20 @@ def get_demographic_vs_biometric_seasonal(df_upd):
 # NEW METRICS: MIGRATION/DISASTER SPIKE DETECTION
 # =============================================================================
 
+@timed
 def detect_migration_spikes(df_upd):
     """
     Detects unusual spikes in updates by district - potential migration indicators.
     Uses month-over-month change detection.
     """
-    df = df_upd.copy()
-    df['Date'] = pd.to_datetime(df['Month'], format='%d-%m-%Y', errors='coerce')
-    df['Year_Month'] = df['Date'].dt.strftime('%Y-%m')  # String format for JSON serialization
-
-    # Aggregate by district and month
-    district_monthly = df.groupby(['District', 'State', 'Year_Month'])['Count'].sum().reset_index()
+    # Aggregate by district and month; groups come out ordered by District, Year_Month, State
+    # (Year_Month is a 'YYYY-MM' string for JSON serialization)
+    index = GroupIndex(df_upd, ['District', 'Year_Month', 'State'])
+    district_monthly = index.labels()[['District', 'State', 'Year_Month']]
+    district_monthly['Count'] = index.sum('Count')
 
     # Calculate month-over-month change per district
-    district_monthly = district_monthly.sort_values(['District', 'Year_Month'])
-    district_monthly['Prev_Count'] = district_monthly.groupby('District')['Count'].shift(1)
+    district_monthly['Prev_Count'] = shift_within(district_monthly['Count'], index.codes('District'))
     district_monthly['MoM_Change'] = district_monthly['Count'] - district_monthly['Prev_Count']
     district_monthly['MoM_Change_Pct'] = (district_monthly['MoM_Change'] / district_monthly['Prev_Count'] * 100).round(1)
 
@@ -155,40 +154,26 @@ def detect_migration_spikes(df_upd):
     return district_monthly
 
 
-def get_district_update_velocity(df_upd):
+@timed
+def get_district_update_velocity(df_upd, start=None, end=None):
     """
     Calculates update velocity (rate of change) by district.
     High velocity indicates potential migration or event-driven updates.
+    Velocity is measured per active reporting day (see velocity.compute_velocity),
+    optionally restricted to the [start, end] date window.
     """
-    df = df_upd.copy()
-    df['Date'] = pd.to_datetime(df['Month'], format='%d-%m-%Y', errors='coerce')
-
-    # Get date range per district
-    velocity = df.groupby(['District', 'State']).agg({
-        'Count': 'sum',
-        'Date': ['min', 'max']
-    }).reset_index()
-    velocity.columns = ['District', 'State', 'Total_Updates', 'First_Date', 'Last_Date']
-
-    # Calculate days active
-    velocity['Days_Active'] = (velocity['Last_Date'] - velocity['First_Date']).dt.days + 1
-    velocity['Daily_Velocity'] = (velocity['Total_Updates'] / velocity['Days_Active']).round(2)
-
-    # Rank by velocity
-    velocity['Velocity_Rank'] = velocity['Daily_Velocity'].rank(ascending=False, method='dense')
-
-    return velocity
+    units, days, counts = build_velocity_panel(df_upd)
+    return compute_velocity(units, days, counts, start=start, end=end)
 
 
+@timed
 def detect_geographic_clusters(df_upd, threshold_percentile=90):
     """
     Identifies geographic clusters with unusually high update activity.
     Could indicate mass migration events or disaster recovery.
     """
-    df = df_upd.copy()
-
     # State-level aggregation
-    state_updates = df.groupby('State')['Count'].sum().reset_index()
+    state_updates = group_sum(df_upd, ['State'], ['Count'])
     state_updates.columns = ['State', 'Total_Updates']
 
     # Calculate threshold
@@ -197,7 +182,7 @@ def detect_geographic_clusters(df_upd, threshold_percentile=90):
 
     # District-level within high-activity states
     high_states = state_updates[state_updates['Is_High_Activity']]['State'].tolist()
-    district_in_high = df[df['State'].isin(high_states)].groupby(['State', 'District'])['Count'].sum().reset_index()
+    district_in_high = group_sum(df_upd[df_upd['State'].isin(high_states)], ['State', 'District'], ['Count'])
 
     return state_updates, district_in_high
 
@@ -206,34 +191,27 @@ def detect_geographic_clusters(df_upd, threshold_percentile=90):
 # NEW METRICS: AGE-18 MILESTONE TRACKING
 # =============================================================================
 
+@timed
 def analyze_age_transitions(df_enr, df_upd):
     """
     Analyzes transition patterns from enrollment to updates by age group.
     Key insight: Age 17+ updates should correlate with age 5-17 enrollments from years prior.
     """
     # Enrollment by age group and state
-    enr_by_age = df_enr.groupby('State').agg({
-        'age_0_5': 'sum',
-        'age_5_17': 'sum',
-        'age_18_greater': 'sum',
-        'Enrolment_Count': 'sum'
-    }).reset_index()
-
-    # Updates by age group (17+ as proxy for 18+)
-    upd_demo = df_upd[df_upd['Type'] == 'Demographic'].copy()
-    upd_bio = df_upd[df_upd['Type'] == 'Biometric'].copy()
-
-    # Demographic updates by state
-    if 'demo_age_5_17' in df_upd.columns:
-        demo_age = df_upd.groupby('State').agg({
-            'Count': 'sum'
-        }).reset_index()
-    else:
-        demo_age = df_upd[df_upd['Type'] == 'Demographic'].groupby('State')['Count'].sum().reset_index()
+    enr_by_age = group_sum(df_enr, ['State'], ['age_0_5', 'age_5_17', 'age_18_greater', 'Enrolment_Count'])
+
+    # Updates by state and type in one pass: demographic updates, and age bands over all update types
+    upd_by_type = group_sum(df_upd, ['State', 'Type'], ['Count', 'Age_5_17', 'Age_17_Plus'])
+    demo_age = upd_by_type.loc[upd_by_type['Type'] == 'Demographic', ['State', 'Count']]
+
+    # Updates by age band, all update types (17+ as proxy for 18+)
+    upd_by_age = upd_by_type.groupby('State', sort=True)[['Age_5_17', 'Age_17_Plus']].sum().reset_index()
+    upd_by_age.rename(columns={'Age_5_17': 'Updates_5_17', 'Age_17_Plus': 'Updates_17_Plus'}, inplace=True)
 
     # Merge for transition analysis
     transition = enr_by_age.merge(demo_age, on='State', how='left', suffixes=('', '_upd'))
-    transition['Count'] = transition['Count'].fillna(0)
+    transition = transition.merge(upd_by_age, on='State', how='left')
+    transition[['Count', 'Updates_5_17', 'Updates_17_Plus']] = transition[['Count', 'Updates_5_17', 'Updates_17_Plus']].fillna(0)
 
     # Calculate update rate (updates per enrollment)
     transition['Update_Rate'] = (transition['Count'] / transition['Enrolment_Count'] * 100).round(2)
@@ -241,37 +219,123 @@ def analyze_age_transitions(df_enr, df_upd):
     # Age 18 specific: ratio of 18+ enrollments to total
     transition['Adult_Enrollment_Share'] = (transition['age_18_greater'] / transition['Enrolment_Count'] * 100).round(2)
 
+    # Age-band view of the updates: 17+ share, and 17+ updates per 100 enrolments of the 5-17 cohort
+    age_updates = transition['Updates_5_17'] + transition['Updates_17_Plus']
+    transition['Adult_Update_Share'] = (transition['Updates_17_Plus'] / age_updates.replace(0, np.nan) * 100).round(2)
+    transition['Milestone_Ratio'] = (transition['Updates_17_Plus'] / transition['age_5_17'].replace(0, np.nan) * 100).round(2)
+
     return transition
 
 
+@timed
 def get_age_group_update_patterns(df_upd):
     """
     Breaks down update patterns by age group over time.
     Identifies when 17+ updates spike (potential age-18 milestone updates).
+    Returns Year_Month, Type, Count, Age_5_17, Age_17_Plus.
     """
-    df = df_upd.copy()
-    df['Date'] = pd.to_datetime(df['Month'], format='%d-%m-%Y', errors='coerce')
-    df['Year_Month'] = df['Date'].dt.strftime('%Y-%m')  # String format for JSON serialization
-
-    # We need to get the original age columns before aggregation
-    # For now, work with Type as proxy
-    age_pattern = df.groupby(['Year_Month', 'Type'])['Count'].sum().reset_index()
+    # Year_Month is a 'YYYY-MM' string for JSON serialization
+    age_pattern = group_sum(df_upd, ['Year_Month', 'Type'], ['Count', 'Age_5_17', 'Age_17_Plus'])
 
     return age_pattern
 
 
-def calculate_mbu_demand_forecast(df_enr):
+# Lags of the cohort → update correlation, in periods; the coarsest period giving at least
+# AGE_MILESTONE_MIN_PERIODS periods is used (monthly for multi-year data)
+AGE_MILESTONE_MAX_LAG = 12
+AGE_MILESTONE_MIN_PERIODS = 8
+AGE_MILESTONE_FREQS = ('M', 'W', 'D')
+
+
+def _milestone_freq(dates, freqs=AGE_MILESTONE_FREQS, min_periods=AGE_MILESTONE_MIN_PERIODS):
+    # Coarsest panel frequency with enough periods between the first and last date
+    first, last = dates.min(), dates.max()
+    if pd.isna(first):
+        return freqs[-1]
+    days = (last - first).days
+    periods = {'M': (last.year - first.year) * 12 + last.month - first.month + 1, 'W': days // 7 + 1, 'D': days + 1}
+    return next((freq for freq in freqs if periods[freq] >= min_periods), freqs[-1])
+
+
+@timed
+def get_age_milestone_correlation(df_enr, df_upd, max_lag=AGE_MILESTONE_MAX_LAG, freq=None, min_active_periods=3):
+    """
+    Relates 5-17 enrolment cohorts to later 17+ updates in every district.
+
+    5-17 enrolments (age_5_17) and 17+ updates (Age_17_Plus) are summed into one aligned
+    district × period array and the lagged cross-correlation of enrolments leading updates by
+    0..max_lag periods is computed for all districts in one FFT pass (panel.lagged_correlation_fft).
+    The calendar pattern shared by all districts is removed first, as in flows.py.
+    `freq` ('M', 'W' or 'D') defaults to the coarsest with AGE_MILESTONE_MIN_PERIODS periods.
+
+    Returns (summary, profile):
+    - summary: District, State, Enrolments_5_17, Updates_17_Plus, Adult_Update_Share, Corr_Lag0,
+      Best_Lag, Best_Corr (districts active in both series for `min_active_periods` periods)
+    - profile: Lag, Mean_Corr, Districts_Peaking, Lag_Unit (correlation by lag across districts)
+    """
+    summary_cols = ['District', 'State', 'Enrolments_5_17', 'Updates_17_Plus', 'Adult_Update_Share',
+                    'Corr_Lag0', 'Best_Lag', 'Best_Corr']
+    profile_cols = ['Lag', 'Mean_Corr', 'Districts_Peaking', 'Lag_Unit']
+    frames = []
+    if not df_enr.empty:
+        frames.append(pd.DataFrame({'District': df_enr['District'], 'State': df_enr['State'], 'Date': parse_dates(df_enr),
+                                    'Cohort': df_enr['age_5_17'], 'Adult': 0.0, 'Updates': 0.0}))
+    if not df_upd.empty:
+        frames.append(pd.DataFrame({'District': df_upd['District'], 'State': df_upd['State'], 'Date': parse_dates(df_upd),
+                                    'Cohort': 0.0, 'Adult': df_upd['Age_17_Plus'], 'Updates': df_upd['Count']}))
+    if len(frames) < 2:
+        return pd.DataFrame(columns=summary_cols), pd.DataFrame(columns=profile_cols)
+
+    data = pd.concat(frames, ignore_index=True)
+    freq = freq or _milestone_freq(data['Date'])
+    units, _, values = build_panel(data, ['Cohort', 'Adult', 'Updates'], freq=freq)
+    cohort, adult, updates = values[..., 0], values[..., 1], values[..., 2]
+    active = ((cohort > 0).sum(axis=1) >= min_active_periods) & ((adult > 0).sum(axis=1) >= min_active_periods)
+    if active.sum() < 2:
+        return pd.DataFrame(columns=summary_cols), pd.DataFrame(columns=profile_cols)
+    units = units[active].reset_index(drop=True)
+    cohort, adult, updates = cohort[active], adult[active], updates[active]
+
+    def district_shapes(series):
+        # Unit-norm rows minus their cross-district mean: what is specific to each district
+        centered = series - series.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(centered, axis=1, keepdims=True)
+        shapes = np.divide(centered, norms, out=np.zeros_like(centered), where=norms > 0)
+        return shapes - shapes.mean(axis=0)
+
+    corr = np.clip(lagged_correlation_fft(district_shapes(cohort), district_shapes(adult), max_lag), -1, 1)
+    best_lag = corr.argmax(axis=1)
+    rows = np.arange(len(units))
+
+    summary = pd.DataFrame({
+        'District': units['District'],
+        'State': units['State'],
+        'Enrolments_5_17': cohort.sum(axis=1),
+        'Updates_17_Plus': adult.sum(axis=1),
+        'Adult_Update_Share': (adult.sum(axis=1) / np.where(updates.sum(axis=1) > 0, updates.sum(axis=1), np.nan) * 100).round(2),
+        'Corr_Lag0': corr[:, 0].round(3),
+        'Best_Lag': best_lag,
+        'Best_Corr': corr[rows, best_lag].round(3),
+    })
+    profile = pd.DataFrame({
+        'Lag': np.arange(corr.shape[1]),
+        'Mean_Corr': corr.mean(axis=0).round(3),
+        'Districts_Peaking': np.bincount(best_lag, minlength=corr.shape[1]),
+        'Lag_Unit': {'M': 'months', 'W': 'weeks', 'D': 'days'}[freq],
+    })
+    return summary, profile
+
+
+@timed
+def calculate_mbu_demand_forecast(df_enr, by=('State',)):
     """
     Forecasts Mandatory Biometric Update (MBU) demand based on enrollment age distribution.
     - Age 0-5 enrolled → MBU needed at age 5 (in 0-5 years)
     - Age 5-17 enrolled → MBU needed at age 15 (in 0-10 years)
     - Adult first-time enrollees need update at 10-year intervals
+    `by` sets the geography (('District', 'State') for the per-district forecast).
     """
-    forecast = df_enr.groupby('State').agg({
-        'age_0_5': 'sum',
-        'age_5_17': 'sum',
-        'age_18_greater': 'sum'
-    }).reset_index()
+    forecast = group_sum(df_enr, list(by), ['age_0_5', 'age_5_17', 'age_18_greater'])
 
     # Immediate MBU demand (0-5 approaching age 5)
     forecast['MBU_Immediate'] = (forecast['age_0_5'] * 0.2).round(0)  # ~20% near age 5
@@ -292,48 +356,34 @@ def calculate_mbu_demand_forecast(df_enr):
 # NEW METRICS: TRIVARIATE ANALYSIS (Age × Geography × Time)
 # =============================================================================
 
+@timed
 def trivariate_analysis(df_enr, df_upd):
     """
     Combines Age, Geography, and Time for multi-dimensional analysis.
     Returns data suitable for 3D visualization or heatmaps.
     """
-    # Enrollment: State × Month × Age Groups
-    df_enr_copy = df_enr.copy()
-    df_enr_copy['Date'] = pd.to_datetime(df_enr_copy['Month'], format='%d-%m-%Y', errors='coerce')
-    df_enr_copy['Year_Month'] = df_enr_copy['Date'].dt.strftime('%Y-%m')  # String format
-
-    trivar_enr = df_enr_copy.groupby(['State', 'Year_Month']).agg({
-        'age_0_5': 'sum',
-        'age_5_17': 'sum',
-        'age_18_greater': 'sum',
-        'Enrolment_Count': 'sum'
-    }).reset_index()
+    # Enrollment: State × Month × Age Groups (Year_Month as a 'YYYY-MM' string)
+    trivar_enr = group_sum(df_enr, ['State', 'Year_Month'], ['age_0_5', 'age_5_17', 'age_18_greater', 'Enrolment_Count'])
 
     # Updates: State × Month × Type
-    df_upd_copy = df_upd.copy()
-    df_upd_copy['Date'] = pd.to_datetime(df_upd_copy['Month'], format='%d-%m-%Y', errors='coerce')
-    df_upd_copy['Year_Month'] = df_upd_copy['Date'].dt.strftime('%Y-%m')  # String format
-
-    trivar_upd = df_upd_copy.groupby(['State', 'Year_Month', 'Type'])['Count'].sum().reset_index()
+    trivar_upd = group_sum(df_upd, ['State', 'Year_Month', 'Type'], ['Count'])
 
     return trivar_enr, trivar_upd
 
 
+@timed
 def get_state_month_heatmap_data(df_upd):
     """
     Prepares data for State × Month heatmap visualization.
     Useful for identifying regional seasonal patterns.
     """
-    df = df_upd.copy()
-    df['Date'] = pd.to_datetime(df['Month'], format='%d-%m-%Y', errors='coerce')
-    df['Month_Num'] = df['Date'].dt.month
-
-    heatmap_data = df.groupby(['State', 'Month_Num'])['Count'].sum().reset_index()
+    heatmap_data = group_sum(df_upd, ['State', 'Month_Num'], ['Count'])
     heatmap_pivot = heatmap_data.pivot(index='State', columns='Month_Num', values='Count').fillna(0)
 
     return heatmap_pivot
 
 
+@timed
 def get_enrollment_update_correlation(df_enr, df_upd):
     """
     Calculates correlation between enrollment patterns and update patterns.
@@ -341,8 +391,8 @@ def get_enrollment_update_correlation(df_enr, df_upd):
     Low correlation might indicate event-driven updates (migration, disasters).
     """
     # Aggregate by state
-    enr_state = df_enr.groupby('State')['Enrolment_Count'].sum().reset_index()
-    upd_state = df_upd.groupby('State')['Count'].sum().reset_index()
+    enr_state = group_sum(df_enr, ['State'], ['Enrolment_Count'])
+    upd_state = group_sum(df_upd, ['State'], ['Count'])
 
     merged = enr_state.merge(upd_state, on='State', how='outer').fillna(0)
     merged.columns = ['State', 'Enrollments', 'Updates']
@@ -354,3 +404,71 @@ def get_enrollment_update_correlation(df_enr, df_upd):
     correlation = merged['Enrollments'].corr(merged['Updates'])
 
     return merged, correlation
+
+
+ROLLING_CORRELATION_WINDOW = 7
+
+
+@timed
+def get_district_rolling_correlation(df_enr, df_upd, window=ROLLING_CORRELATION_WINDOW, freq='D'):
+    """
+    Rolling enrollment/update correlation and update-to-enrollment ratio per district.
+
+    Enrollments and updates are summed into one aligned district × period array; trailing
+    window sums of x, y, x², y² and xy (cumulative sums along time) give the Pearson
+    coefficient of every district and window end in a single pass.
+
+    Returns (summary, heatmap):
+    - summary: District, State, Enrollments, Updates, Update_to_Enrollment_Ratio,
+      Latest_Corr, Mean_Corr, Min_Corr (one row per district)
+    - heatmap: rolling correlation pivot (index 'District, State', columns = window end date)
+    """
+    frames = []
+    if not df_enr.empty:
+        frames.append(pd.DataFrame({'District': df_enr['District'], 'State': df_enr['State'],
+                                    'Date': parse_dates(df_enr), 'Enrollments': df_enr['Enrolment_Count'], 'Updates': 0.0}))
+    if not df_upd.empty:
+        frames.append(pd.DataFrame({'District': df_upd['District'], 'State': df_upd['State'],
+                                    'Date': parse_dates(df_upd), 'Enrollments': 0.0, 'Updates': df_upd['Count']}))
+    if not frames:
+        return pd.DataFrame(), pd.DataFrame()
+
+    units, periods, values = build_panel(pd.concat(frames, ignore_index=True), ['Enrollments', 'Updates'], freq=freq)
+    if len(units) == 0:
+        return pd.DataFrame(), pd.DataFrame()
+    x, y = values[..., 0], values[..., 1]
+
+    # Window sums; the first window-1 periods have incomplete windows and are left out
+    n = window_sums(np.ones_like(x), window)
+    sx, sy = window_sums(x, window), window_sums(y, window)
+    sxx, syy, sxy = window_sums(x * x, window), window_sums(y * y, window), window_sums(x * y, window)
+    cov = sxy - sx * sy / n
+    var_x, var_y = sxx - sx * sx / n, syy - sy * sy / n
+    denom = np.sqrt(np.maximum(var_x, 0) * np.maximum(var_y, 0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = np.where(denom > 1e-9, cov / denom, np.nan)
+    corr = np.clip(corr, -1, 1)[:, window - 1:]
+
+    labels = units['District'] + ", " + units['State']
+    heatmap = pd.DataFrame(corr.round(3), index=labels, columns=periods[window - 1:])
+
+    enrollments, updates = x.sum(axis=1), y.sum(axis=1)
+    valid = ~np.isnan(corr)
+    counts = valid.sum(axis=1)
+    rows = np.arange(len(units))
+    # Last defined window per district: first True of the validity mask read backwards
+    last_valid = corr.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1) if corr.shape[1] else np.zeros(len(units), dtype=int)
+    latest = corr[rows, last_valid] if corr.shape[1] else np.full(len(units), np.nan)
+
+    summary = pd.DataFrame({
+        'District': units['District'],
+        'State': units['State'],
+        'Enrollments': enrollments,
+        'Updates': updates,
+        'Update_to_Enrollment_Ratio': (updates / np.where(enrollments > 0, enrollments, np.nan)).round(3),
+        'Latest_Corr': np.where(counts > 0, latest, np.nan).round(3),
+        'Mean_Corr': (np.where(valid, corr, 0).sum(axis=1) / np.where(counts > 0, counts, np.nan)).round(3),
+        'Min_Corr': np.where(counts > 0, np.where(valid, corr, np.inf).min(axis=1, initial=np.inf), np.nan).round(3),
+    })
+
+    return summary, heatmap
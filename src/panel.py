@@ -0,0 +1,117 @@
+import pandas as pd
+import numpy as np
+
+from kernel import GroupIndex
+from time_index import parse_dates
+
+
+# =============================================================================
+# UNIT × PERIOD PANELS
+# Dense (district or state) × (day, week or month) arrays built in one pass,
+# so per-unit time-series metrics can be computed with array operations
+# instead of a groupby per unit.
+# =============================================================================
+
+def _period_index(dates, freq, start):
+    """
+    Maps dates to integer period offsets from `start` ('D' = day, 'W' = 7-day block, 'M' = calendar month).
+    """
+    if freq == 'D':
+        return (dates - start).dt.days.to_numpy()
+    if freq == 'W':
+        return (dates - start).dt.days.to_numpy() // 7
+    if freq == 'M':
+        return ((dates.dt.year - start.year) * 12 + (dates.dt.month - start.month)).to_numpy()
+    raise ValueError(f"Unsupported panel frequency: {freq}")
+
+
+def _period_labels(start, n_periods, freq):
+    if freq == 'D':
+        return pd.date_range(start, periods=n_periods, freq='D')
+    if freq == 'W':
+        return pd.date_range(start, periods=n_periods, freq='7D')
+    return pd.date_range(start.to_period('M').to_timestamp(), periods=n_periods, freq='MS')
+
+
+def build_panel(df, value_cols, unit_cols=('District', 'State'), freq='D', start=None, end=None):
+    """
+    Sums `value_cols` into a dense unit × period array.
+
+    Returns (units, periods, values):
+    - units: DataFrame of the unit keys, one row per panel row (sorted)
+    - periods: DatetimeIndex with the start of each period
+    - values: float array of shape (n_units, n_periods) or (n_units, n_periods, n_values)
+      when `value_cols` is a list
+    Periods without records are zero, so windows over the panel are calendar windows.
+    """
+    single = isinstance(value_cols, str)
+    value_cols = [value_cols] if single else list(value_cols)
+    unit_cols = list(unit_cols)
+
+    dates = parse_dates(df)
+    # A writable copy: under copy-on-write the array behind a Series is read-only
+    mask = dates.notna().to_numpy().copy()
+    if start is not None:
+        mask &= (dates >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (dates <= pd.Timestamp(end)).to_numpy()
+
+    # The load-time key codes come along, so the units are grouped on integers (see kernel.py)
+    data = df if mask.all() else df.loc[mask]
+    dates = dates if mask.all() else dates[mask]
+    if data.empty:
+        shape = (0, 0) if single else (0, 0, len(value_cols))
+        return pd.DataFrame(columns=unit_cols), pd.DatetimeIndex([]), np.zeros(shape)
+
+    first = pd.Timestamp(start) if start is not None else dates.min()
+    last = pd.Timestamp(end) if end is not None else dates.max()
+    n_periods = int(_period_index(pd.Series([last]), freq, first)[0]) + 1
+
+    index = GroupIndex(data, unit_cols)
+    units = index.labels()
+    n_units = len(index)
+    rows = index.rows if index.rows is not None else slice(None)
+
+    flat = index.ids * n_periods + _period_index(dates, freq, first)[rows]
+    values = np.stack([
+        np.bincount(flat, weights=data[col].to_numpy(dtype=float)[rows], minlength=n_units * n_periods)
+        for col in value_cols
+    ], axis=-1).reshape(n_units, n_periods, len(value_cols))
+
+    periods = _period_labels(first, n_periods, freq)
+    return units, periods, (values[..., 0] if single else values)
+
+
+def window_sums(values, window):
+    """
+    Trailing `window`-period sums along the last time axis (shorter windows at the start).
+    """
+    csum = np.cumsum(values, axis=1)
+    out = csum.copy()
+    out[:, window:] = csum[:, window:] - csum[:, :-window]
+    return out
+
+
+def lagged_correlation_fft(x, y, max_lag):
+    """
+    Cross-correlation of each row of `x` with the same row of `y` shifted forward by 0..max_lag periods:
+    out[i, k] ≈ corr(x[i, t], y[i, t + k]), for all rows at once.
+
+    Rows are centered and scaled to unit norm, and the products for every lag come from one
+    zero-padded FFT along time (the standard biased estimator: lag k sums T - k products).
+    Rows without variance give 0. Returns an array of shape (n_rows, max_lag + 1).
+    """
+    n, t = x.shape
+    max_lag = max(0, min(max_lag, t - 1))
+    if n == 0 or t == 0:
+        return np.zeros((n, max_lag + 1))
+
+    def unit_rows(values):
+        centered = values - values.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(centered, axis=1, keepdims=True)
+        return np.divide(centered, norms, out=np.zeros_like(centered), where=norms > 0)
+
+    # Padding to >= 2T turns the circular correlation of the FFT into a linear one
+    size = 1 << int(np.ceil(np.log2(2 * t)))
+    spectrum = np.conj(np.fft.rfft(unit_rows(x), size, axis=1)) * np.fft.rfft(unit_rows(y), size, axis=1)
+    return np.fft.irfft(spectrum, size, axis=1)[:, :max_lag + 1]
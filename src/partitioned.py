@@ -0,0 +1,220 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+from metrics import (
+    calculate_update_intensity, get_district_update_velocity, detect_migration_spikes,
+    analyze_age_transitions, get_age_milestone_correlation, calculate_mbu_demand_forecast
+)
+from time_index import parse_dates
+
+
+# =============================================================================
+# STATE-PARTITIONED MAP-REDUCE
+# The row-level work of the state-decomposable metrics (scanning and grouping
+# millions of records) runs per State partition on a process pool. Each worker
+# reduces its states to partial sums at the grain the metric groups by; the
+# partials are concatenated, re-summed, and the unchanged metrics.py function
+# finishes on that small frame. Counts are integers, so the sums (and therefore
+# the results) are identical to the serial path.
+#
+# Nightly recompute: python src/partitioned.py --workers 8 --check --output <dir>
+# =============================================================================
+
+# metric → (frame names in call order, partial grain per frame as (group keys, summed columns))
+PLANS = {
+    'calculate_update_intensity': (calculate_update_intensity, ('upd', 'enr'), [
+        (['District', 'State'], ['Count']),
+        (['District', 'State'], ['Enrolment_Count']),
+    ]),
+    'get_district_update_velocity': (get_district_update_velocity, ('upd',), [
+        (['District', 'State', 'Date'], ['Count']),
+    ]),
+    'detect_migration_spikes': (detect_migration_spikes, ('upd',), [
+        (['District', 'State', 'Date'], ['Count']),
+    ]),
+    'analyze_age_transitions': (analyze_age_transitions, ('enr', 'upd'), [
+        (['State'], ['age_0_5', 'age_5_17', 'age_18_greater', 'Enrolment_Count']),
+        (['State', 'Type'], ['Count', 'Age_5_17', 'Age_17_Plus']),
+    ]),
+    'get_age_milestone_correlation': (get_age_milestone_correlation, ('enr', 'upd'), [
+        (['District', 'State', 'Date'], ['age_5_17']),
+        (['District', 'State', 'Date'], ['Age_17_Plus', 'Count']),
+    ]),
+    'calculate_mbu_demand_forecast': (calculate_mbu_demand_forecast, ('enr',), [
+        (['State'], ['age_0_5', 'age_5_17', 'age_18_greater']),
+    ]),
+}
+
+# Frames inherited by forked workers (set by the driver before the pool starts)
+_shared_frames = {}
+
+
+def _columns_needed(metric_names):
+    # Columns each frame must ship to the workers: the union of the grains that use it
+    needed = {}
+    for name in metric_names:
+        _, frame_names, grains = PLANS[name]
+        for frame_name, (keys, cols) in zip(frame_names, grains):
+            needed.setdefault(frame_name, {'State'}).update(keys + cols)
+    return needed
+
+
+def balance_partitions(frames, n_partitions):
+    """
+    Groups States into `n_partitions` lists of roughly equal row counts (largest state first,
+    each to the currently lightest partition).
+    """
+    sizes = pd.concat([df['State'] for df in frames.values() if 'State' in df.columns]).value_counts()
+    loads = np.zeros(n_partitions)
+    partitions = [[] for _ in range(n_partitions)]
+    for state, size in sizes.items():
+        target = int(loads.argmin())
+        partitions[target].append(state)
+        loads[target] += size
+    return [states for states in partitions if states]
+
+
+def _partial(df, keys, cols):
+    if 'Date' in keys and not pd.api.types.is_datetime64_any_dtype(df.get('Date')):
+        df = df.assign(Date=parse_dates(df))
+    return df.groupby(keys, sort=False)[cols].sum().reset_index()
+
+
+def map_partition(metric_names, states, frames=None):
+    """
+    Map step for one partition: reduces the rows of `states` to each metric's partial grain.
+    `frames` is None in forked workers, which read the frames inherited from the driver.
+    Returns {metric: [partial frame per input frame]}.
+    """
+    frames = frames if frames is not None else _shared_frames
+    local = {name: df[df['State'].isin(states)] for name, df in frames.items()}
+    return {
+        name: [_partial(local[frame_name], keys, cols)
+               for frame_name, (keys, cols) in zip(PLANS[name][1], PLANS[name][2])]
+        for name in metric_names
+    }
+
+
+def reduce_partials(metric_names, partials):
+    """
+    Reduce step: concatenates the partitions' partials, re-sums them at their grain and runs
+    the metrics.py function on the result.
+    """
+    results = {}
+    for name in metric_names:
+        fn, frame_names, grains = PLANS[name]
+        args = []
+        for i, (keys, cols) in enumerate(grains):
+            combined = pd.concat([partial[name][i] for partial in partials], ignore_index=True)
+            args.append(combined.groupby(keys, sort=True)[cols].sum().reset_index())
+        results[name] = fn(*args)
+    return results
+
+
+def run_partitioned(frames, metric_names=None, workers=None, partitions=None):
+    """
+    Computes the metrics with a state-partitioned map-reduce over a process pool.
+
+    frames: {'enr': df_enr, 'upd': df_upd}. `workers` defaults to the CPU count and
+    `partitions` to the number of workers (more partitions = finer load balancing).
+    With the 'fork' start method the frames are inherited by the workers; otherwise each
+    partition's rows (needed columns only) are pickled to its worker.
+    """
+    metric_names = list(metric_names or PLANS)
+    workers = workers or os.cpu_count() or 1
+    needed = _columns_needed(metric_names)
+    frames = {name: df[[col for col in df.columns if col in needed[name]]]
+              for name, df in frames.items() if name in needed}
+    groups = balance_partitions(frames, partitions or workers)
+
+    if workers == 1:
+        partials = [map_partition(metric_names, states, frames) for states in groups]
+        return reduce_partials(metric_names, partials)
+
+    fork = 'fork' in multiprocessing.get_all_start_methods()
+    global _shared_frames
+    _shared_frames = frames if fork else {}
+    try:
+        context = multiprocessing.get_context('fork' if fork else None)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(map_partition, metric_names, states,
+                                   None if fork else {name: df[df['State'].isin(states)] for name, df in frames.items()})
+                       for states in groups]
+            partials = [future.result() for future in futures]
+    finally:
+        _shared_frames = {}
+    return reduce_partials(metric_names, partials)
+
+
+def run_serial(frames, metric_names=None):
+    """
+    The regular single-process path (metrics.py on the full frames), for comparison.
+    """
+    return {name: PLANS[name][0](*(frames[frame_name] for frame_name in PLANS[name][1]))
+            for name in (metric_names or PLANS)}
+
+
+def compare_results(serial, partitioned):
+    """
+    Returns DataFrame: Metric, Identical, Detail (first difference, if any).
+    """
+    rows = []
+    for name, expected in serial.items():
+        actual = partitioned[name]
+        # Metrics returning several frames are compared frame by frame
+        expected = expected if isinstance(expected, tuple) else (expected,)
+        actual = actual if isinstance(actual, tuple) else (actual,)
+        try:
+            for e, a in zip(expected, actual, strict=True):
+                pd.testing.assert_frame_equal(e.reset_index(drop=True), a.reset_index(drop=True), check_dtype=False)
+            rows.append({'Metric': name, 'Identical': True, 'Detail': ''})
+        except AssertionError as exc:
+            rows.append({'Metric': name, 'Identical': False, 'Detail': str(exc).splitlines()[0]})
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="State-partitioned recompute of the decomposable metrics.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--partitions', type=int)
+    parser.add_argument('--check', action='store_true', help="also run the serial path and compare")
+    parser.add_argument('--output', help="directory for the results (one Parquet file per metric)")
+    args = parser.parse_args()
+
+    from data_loader import load_data
+
+    df_enr, df_upd = load_data()
+    frames = {'enr': df_enr, 'upd': df_upd}
+
+    start = time.perf_counter()
+    results = run_partitioned(frames, workers=args.workers, partitions=args.partitions)
+    partitioned_s = time.perf_counter() - start
+    print(f"Partitioned ({args.workers} workers): {partitioned_s:.2f}s")
+
+    status = 0
+    if args.check:
+        start = time.perf_counter()
+        serial = run_serial(frames)
+        serial_s = time.perf_counter() - start
+        print(f"Serial: {serial_s:.2f}s (speed-up {serial_s / partitioned_s:.2f}x)")
+        report = compare_results(serial, results)
+        print(report.to_string(index=False))
+        status = 0 if report['Identical'].all() else 1
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        for name, result in results.items():
+            if isinstance(result, tuple):
+                for i, part in enumerate(result):
+                    part.to_parquet(os.path.join(args.output, f'{name}_{i}.parquet'), index=False)
+            else:
+                result.to_parquet(os.path.join(args.output, f'{name}.parquet'), index=False)
+
+    raise SystemExit(status)
@@ -0,0 +1,221 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+
+from metrics import (
+    calculate_update_intensity, calculate_age_distribution, detect_anomalies,
+    get_seasonal_patterns, get_demographic_vs_biometric_seasonal,
+    detect_migration_spikes, get_district_update_velocity, detect_geographic_clusters,
+    analyze_age_transitions, get_age_milestone_correlation, calculate_mbu_demand_forecast,
+    trivariate_analysis, get_state_month_heatmap_data, get_enrollment_update_correlation,
+    get_district_rolling_correlation
+)
+from flows import cached_migration_flows
+from hotspots import cached_update_hotspots
+
+# Metric engine: 'pandas' (in-memory frames) or 'duckdb' (SQL over the shards, see duckdb_backend.py)
+BACKEND = os.environ.get('DRISHTI_BACKEND', 'pandas')
+
+# Results kept across reruns/sessions before the oldest are evicted
+MAX_CACHED_RESULTS = 64
+PREFETCH_WORKERS = 4
+
+# Metric jobs behind each dashboard section.
+# Frame names: '*_full' = all-India data, others = data after State/District filter.
+# Jobs in VERSIONED_JOBS are st.cache_data wrappers keyed on (dataset version, date window),
+# passed ahead of the frames; prefetching them warms the cache the app reads.
+SECTION_JOBS = {
+    'trends': [],
+    'seasonal': [
+        (get_seasonal_patterns, ('upd_full', 'enr_full')),
+        (get_demographic_vs_biometric_seasonal, ('upd_full',)),
+    ],
+    'migration': [
+        (get_district_update_velocity, ('upd_full',)),
+        (detect_migration_spikes, ('upd_full',)),
+        (detect_geographic_clusters, ('upd_full',)),
+        (cached_update_hotspots, ('upd_full', 'crosswalk_full')),
+        (cached_migration_flows, ('upd_full',)),
+    ],
+    'age18': [
+        (analyze_age_transitions, ('enr_full', 'upd_full')),
+        (get_age_milestone_correlation, ('enr_full', 'upd_full')),
+        (calculate_mbu_demand_forecast, ('enr_full',)),
+    ],
+    'intensity': [
+        (calculate_update_intensity, ('upd', 'enr')),
+    ],
+    'demographics': [
+        (calculate_age_distribution, ('enr',)),
+    ],
+    'integrity': [
+        (detect_anomalies, ('enr',)),
+    ],
+    'trivariate': [
+        (get_state_month_heatmap_data, ('upd_full',)),
+        (get_enrollment_update_correlation, ('enr_full', 'upd_full')),
+        (trivariate_analysis, ('enr_full', 'upd_full')),
+        (get_district_rolling_correlation, ('enr_full', 'upd_full')),
+    ],
+}
+VERSIONED_JOBS = (cached_update_hotspots, cached_migration_flows)
+
+
+@st.cache_resource
+def _get_executor():
+    """
+    Shared worker pool for background precomputation (one per server process).
+    """
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='drishti-prefetch')
+
+
+@st.cache_resource
+def _get_result_cache():
+    """
+    Futures keyed by (metric name, data scope), shared across sessions.
+    """
+    return {'lock': threading.Lock(), 'futures': OrderedDict()}
+
+
+@st.cache_resource(max_entries=1)
+def _get_duckdb(dataset_version):
+    """
+    DuckDB connection over the shards, or None when the optional package is missing.
+    Its views list the shard files present when it connects, so a new dataset version
+    (shards added, rewritten or removed) opens a fresh connection in place of the old one.
+    """
+    import duckdb_backend
+    return duckdb_backend.connect() if duckdb_backend.is_available() else None
+
+
+def _compute(fn, frames, frame_names, view_key):
+    # With the DuckDB backend the filters are pushed into the shard scans instead of using the frames
+    if BACKEND == 'duckdb':
+        from duckdb_backend import QUERIES
+        con = _get_duckdb(view_key[3])
+        query = QUERIES.get(fn.__name__)
+        if con is not None and query is not None:
+            date_window, state, district = view_key[:3]
+            # date_window holds str() of the bounds; 'None' = open-ended
+            start, end = (None if bound == 'None' else bound for bound in date_window)
+            if all(name.endswith('_full') for name in frame_names):
+                state = district = None
+            return query(con, state=state, district=district, start=start, end=end)
+    if fn in VERSIONED_JOBS:
+        return fn(view_key[3], view_key[0], *(frames[name] for name in frame_names))
+    return fn(*(frames[name] for name in frame_names))
+
+
+def data_scope(frame_names, view_key):
+    """
+    The part of a view that a result computed from `frame_names` depends on.
+    view_key = (date_window, state, district, dataset version, State version). Full-data results
+    only depend on the date window and dataset version, so they are shared by every State/District
+    selection; filtered results change only when their State's rows do.
+    """
+    if any(not name.endswith('_full') for name in frame_names):
+        return (view_key[:3], view_key[4])
+    return (view_key[0], view_key[3])
+
+
+def _job_key(fn, frame_names, view_key):
+    return (fn.__name__, frame_names, data_scope(frame_names, view_key))
+
+
+def _store(cache, key, future):
+    cache['futures'][key] = future
+    cache['futures'].move_to_end(key)
+    while len(cache['futures']) > MAX_CACHED_RESULTS:
+        cache['futures'].popitem(last=False)
+
+
+def _copy_result(result):
+    # Results are shared across sessions; hand out copies so callers can add columns freely
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy()
+    if isinstance(result, tuple):
+        return tuple(_copy_result(item) for item in result)
+    if isinstance(result, dict):
+        return dict(result)
+    return result
+
+
+def fetch(fn, frames, frame_names, view_key):
+    """
+    Returns the result of a metric, reusing a prefetched (or in-flight) computation when available.
+    Computes synchronously on a cache miss.
+    """
+    cache = _get_result_cache()
+    key = _job_key(fn, frame_names, view_key)
+
+    with cache['lock']:
+        future = cache['futures'].get(key)
+        if future is not None and future.done() and future.exception() is not None:
+            # A failed background run is retried synchronously so the error surfaces here
+            future = None
+        if future is not None:
+            cache['futures'].move_to_end(key)
+
+    if future is None:
+        future = Future()
+        future.set_result(_compute(fn, frames, frame_names, view_key))
+        with cache['lock']:
+            _store(cache, key, future)
+
+    return _copy_result(future.result())
+
+
+def submit(fn, frames, frame_names, view_key):
+    """
+    Returns the future of a metric: the cached or in-flight one, else a new background job.
+    Unlike fetch, never blocks (see progressive.py).
+    """
+    cache = _get_result_cache()
+    key = _job_key(fn, frame_names, view_key)
+    with cache['lock']:
+        future = cache['futures'].get(key)
+        if future is not None and future.done() and future.exception() is not None:
+            future = None
+        if future is None:
+            future = _get_executor().submit(_compute, fn, frames, frame_names, view_key)
+            _store(cache, key, future)
+        else:
+            cache['futures'].move_to_end(key)
+    return future
+
+
+def result_copy(future):
+    """
+    The result of a metric future, as a copy the caller may modify.
+    """
+    return _copy_result(future.result())
+
+
+def prefetch_sections(sections, frames, view_key):
+    """
+    Submits the metric jobs of the given sections to the background pool.
+    Jobs already cached or in flight are not submitted again.
+    """
+    executor = _get_executor()
+    cache = _get_result_cache()
+
+    with cache['lock']:
+        for section in sections:
+            for fn, frame_names in SECTION_JOBS.get(section, []):
+                key = _job_key(fn, frame_names, view_key)
+                if key in cache['futures']:
+                    continue
+                _store(cache, key, executor.submit(_compute, fn, frames, frame_names, view_key))
+
+
+def clear():
+    """
+    Drops all cached results (e.g. after the underlying data is reloaded).
+    """
+    cache = _get_result_cache()
+    with cache['lock']:
+        cache['futures'].clear()
@@ -0,0 +1,134 @@
+import pandas as pd
+import numpy as np
+
+from panel import build_panel
+
+
+# =============================================================================
+# PREFIX-SUM CUBES
+# Cumulative sums over (district, day) built once at load time. The total of any
+# district, state or all-India over any date window is then prefix[hi] - prefix[lo]
+# (a set of districts: one such difference per district),
+# and cumulative trendlines are read straight off the prefix arrays.
+# =============================================================================
+
+ENROLMENT_COLS = ['age_0_5', 'age_5_17', 'age_18_greater', 'Enrolment_Count']
+UPDATE_COLS = ['Age_5_17', 'Age_17_Plus', 'Count']
+
+
+def build_prefix_cube(df, value_cols):
+    """
+    Builds prefix sums of `value_cols` per district, per state and for all-India.
+
+    Returns a dict with:
+    - 'columns': value column names (last axis of the prefix arrays)
+    - 'days': DatetimeIndex of calendar days covered
+    - 'district_prefix': (n_districts, n_days + 1, n_values), index via 'district_index'[(District, State)]
+    - 'state_prefix': (n_states, n_days + 1, n_values), index via 'state_index'[State]
+    - 'total_prefix': (n_days + 1, n_values)
+    """
+    value_cols = [col for col in value_cols if col in df.columns]
+    if df.empty or not value_cols:
+        units, days, values = pd.DataFrame(columns=['District', 'State']), pd.DatetimeIndex([]), np.zeros((0, 0, len(value_cols)))
+    else:
+        units, days, values = build_panel(df, value_cols, unit_cols=('District', 'State'), freq='D')
+
+    n_units, n_days = values.shape[0], values.shape[1]
+    district_prefix = np.zeros((n_units, n_days + 1, len(value_cols)))
+    np.cumsum(values, axis=1, out=district_prefix[:, 1:])
+
+    states, state_codes = np.unique(units['State'].astype(str).to_numpy(), return_inverse=True)
+    state_prefix = np.zeros((len(states), n_days + 1, len(value_cols)))
+    np.add.at(state_prefix, state_codes, district_prefix)
+
+    # Cubes are shared across sessions (st.cache_resource); keep them read-only
+    total_prefix = district_prefix.sum(axis=0)
+    for arr in (district_prefix, state_prefix, total_prefix):
+        arr.flags.writeable = False
+
+    return {
+        'columns': value_cols,
+        'days': days,
+        'district_prefix': district_prefix,
+        'district_index': {key: i for i, key in enumerate(zip(units['District'], units['State']))},
+        'state_prefix': state_prefix,
+        'state_index': {state: i for i, state in enumerate(states)},
+        'total_prefix': total_prefix,
+    }
+
+
+def _day_bounds(cube, start=None, end=None):
+    # Prefix positions [lo, hi] so that prefix[hi] - prefix[lo] covers start..end inclusive
+    days = cube['days']
+    lo = days.searchsorted(pd.Timestamp(start)) if start is not None else 0
+    hi = days.searchsorted(pd.Timestamp(end), side='right') if end is not None else len(days)
+    return lo, max(hi, lo)
+
+
+def _prefix_rows(cube, state=None, district=None):
+    """
+    Returns the (n_days + 1, n_values) prefix array for all-India, a state or a district.
+    """
+    n_days, n_values = len(cube['days']), len(cube['columns'])
+    if state is None or state == 'All':
+        return cube['total_prefix']
+    if district is None or district == 'All':
+        i = cube['state_index'].get(state)
+        return cube['state_prefix'][i] if i is not None else np.zeros((n_days + 1, n_values))
+    i = cube['district_index'].get((district, state))
+    return cube['district_prefix'][i] if i is not None else np.zeros((n_days + 1, n_values))
+
+
+def range_totals(cube, start=None, end=None, state=None, district=None, districts=None):
+    """
+    Totals of every value column for the selection and date window, as a Series.
+    Constant time for all-India, a state or a district: one subtraction of two prefix rows.
+    `districts` (an iterable of (District, State) keys) selects a set of districts instead;
+    that costs one subtraction per district. Keys not in the cube count as zero.
+    """
+    lo, hi = _day_bounds(cube, start, end)
+    if districts is not None:
+        rows = [cube['district_index'][key] for key in districts if key in cube['district_index']]
+        prefix = cube['district_prefix'][rows]
+        return pd.Series((prefix[:, hi] - prefix[:, lo]).sum(axis=0), index=cube['columns'])
+    prefix = _prefix_rows(cube, state, district)
+    return pd.Series(prefix[hi] - prefix[lo], index=cube['columns'])
+
+
+def cumulative_series(cube, column, start=None, end=None, state=None, district=None):
+    """
+    Daily and cumulative values of `column` over the window, read off the prefix array.
+    Days without any records are left out (as in the raw data).
+    """
+    if column not in cube['columns'] or len(cube['days']) == 0:
+        return pd.DataFrame(columns=['Date', 'Daily', 'Cumulative'])
+
+    lo, hi = _day_bounds(cube, start, end)
+    prefix = _prefix_rows(cube, state, district)[:, cube['columns'].index(column)]
+    window = prefix[lo:hi + 1] - prefix[lo]
+
+    series = pd.DataFrame({
+        'Date': cube['days'][lo:hi],
+        'Daily': np.diff(window),
+        'Cumulative': window[1:],
+    })
+    return series[series['Daily'] != 0].reset_index(drop=True)
+
+
+def combined_series(cubes, column, start=None, end=None, state=None, district=None):
+    """
+    Daily and cumulative values of `column` summed over several cubes (e.g. Demographic + Biometric).
+    Each cube's cumulative line is carried forward over days on which only the others have records.
+    """
+    parts = [cumulative_series(cube, column, start, end, state, district).set_index('Date') for cube in cubes]
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return pd.DataFrame(columns=['Date', 'Daily', 'Cumulative'])
+
+    all_days = parts[0].index
+    for part in parts[1:]:
+        all_days = all_days.union(part.index)
+
+    daily = sum(part['Daily'].reindex(all_days, fill_value=0) for part in parts)
+    cumulative = sum(part['Cumulative'].reindex(all_days).ffill().fillna(0) for part in parts)
+    return pd.DataFrame({'Date': all_days, 'Daily': daily.to_numpy(), 'Cumulative': cumulative.to_numpy()})
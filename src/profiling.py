@@ -0,0 +1,295 @@
+import contextvars
+import functools
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+
+import pandas as pd
+
+
+# =============================================================================
+# TIMING / MEMORY INSTRUMENTATION
+# Metric and loader functions are wrapped with @timed, app.py opens a span per
+# section and rendering call, and every rerun's records are kept in a bounded
+# in-memory buffer for the debug panel. Appending them to a JSON-lines log for
+# offline analysis is opt-in; the log is rotated (one .1 backup) at a size cap.
+#
+# Environment:
+#   DRISHTI_PROFILE=0          disable recording entirely
+#   DRISHTI_PROFILE_MEMORY=1   also record peak traced memory per span (slow)
+#   DRISHTI_PROFILE_LOG=<path> append every rerun's records to this file (default: no log file)
+#   DRISHTI_PROFILE_LOG_MB=<MB> rotate the log file beyond this size (default 50)
+# =============================================================================
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILE_ENABLED = os.environ.get('DRISHTI_PROFILE', '1') != '0'
+TRACK_MEMORY = os.environ.get('DRISHTI_PROFILE_MEMORY', '0') == '1'
+PROFILE_LOG_PATH = os.environ.get('DRISHTI_PROFILE_LOG') or None
+PROFILE_LOG_MAX_BYTES = int(float(os.environ.get('DRISHTI_PROFILE_LOG_MB', '50')) * 1024 * 1024)
+
+# Most recent records across all sessions and background threads
+_records = deque(maxlen=5000)
+_records_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+# Rerun id of the current script run; background threads record under None
+_current_run = contextvars.ContextVar('drishti_profile_run', default=None)
+# Open spans on this thread, innermost last (for nesting and memory peaks)
+_span_stack = threading.local()
+
+
+def _stack():
+    if not hasattr(_span_stack, 'items'):
+        _span_stack.items = []
+    return _span_stack.items
+
+
+def start_span(name, kind='section'):
+    """
+    Opens a timing span and returns its token (pass it to end_span).
+    """
+    if not PROFILE_ENABLED:
+        return None
+
+    token = {'name': name, 'kind': kind, 'start': time.perf_counter(), 'peak': 0}
+    if TRACK_MEMORY and tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        # The parent's peak so far is kept before the counter is reset for this span
+        if _stack():
+            _stack()[-1]['peak'] = max(_stack()[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        token['mem_start'] = current
+    _stack().append(token)
+    return token
+
+
+def end_span(token):
+    """
+    Closes a span opened with start_span and stores its record.
+    """
+    if token is None:
+        return
+
+    seconds = time.perf_counter() - token['start']
+    stack = _stack()
+    if stack and stack[-1] is token:
+        stack.pop()
+
+    record = {
+        'run': _current_run.get(),
+        'name': token['name'],
+        'kind': token['kind'],
+        'seconds': round(seconds, 6),
+        'thread': threading.current_thread().name,
+        'timestamp': time.time(),
+    }
+    if 'mem_start' in token:
+        _, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, token['peak'])
+        record['peak_kb'] = round((peak - token['mem_start']) / 1024, 1)
+        # Propagate this span's peak to its parent
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+
+    with _records_lock:
+        _records.append(record)
+
+
+class span:
+    """
+    Context manager form of start_span/end_span:
+
+        with span("render:map"):
+            st_folium(m)
+    """
+
+    def __init__(self, name, kind='section'):
+        self.name = name
+        self.kind = kind
+
+    def __enter__(self):
+        self.token = start_span(self.name, self.kind)
+        return self
+
+    def __exit__(self, *exc):
+        end_span(self.token)
+        return False
+
+
+def timed(fn=None, name=None, kind='function'):
+    """
+    Decorator recording the wall time (and optionally peak memory) of each call.
+    Can also wrap a callable directly: plotly_chart = timed(st.plotly_chart, name='render:plotly').
+    """
+    if fn is None:
+        return functools.partial(timed, name=name, kind=kind)
+
+    label = name or f"{fn.__module__}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = start_span(label, kind)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            end_span(token)
+
+    return wrapper
+
+
+def start_run():
+    """
+    Marks the start of a script rerun; records on this thread are tagged with the returned id.
+    """
+    run_id = uuid.uuid4().hex[:12]
+    _current_run.set(run_id)
+    _span_stack.items = []
+    if PROFILE_ENABLED and TRACK_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return run_id
+
+
+def get_records(run_id=None):
+    """
+    Returns the recorded spans as a DataFrame (of one rerun if `run_id` is given).
+    """
+    with _records_lock:
+        records = list(_records)
+    if run_id is not None:
+        records = [r for r in records if r['run'] == run_id]
+    return pd.DataFrame(records, columns=['run', 'name', 'kind', 'seconds', 'peak_kb', 'thread', 'timestamp'])
+
+
+def summarize(records):
+    """
+    Aggregates span records by name: calls, total/mean/max seconds, largest memory peak.
+    """
+    if records.empty:
+        return pd.DataFrame(columns=['name', 'kind', 'calls', 'total_s', 'mean_s', 'max_s', 'peak_kb'])
+    summary = records.groupby(['name', 'kind']).agg(
+        calls=('seconds', 'size'),
+        total_s=('seconds', 'sum'),
+        mean_s=('seconds', 'mean'),
+        max_s=('seconds', 'max'),
+        peak_kb=('peak_kb', 'max'),
+    ).reset_index()
+    return summary.sort_values('total_s', ascending=False).round(4)
+
+
+def export_timings(records, path, max_bytes=PROFILE_LOG_MAX_BYTES):
+    """
+    Appends span records to a JSON-lines file for offline analysis. A file grown past
+    `max_bytes` is first moved to `<path>.1` (replacing the previous one).
+    """
+    if records.empty:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    lines = records.to_json(orient='records', lines=True)
+    with _log_lock:
+        if os.path.exists(path) and os.path.getsize(path) > max_bytes:
+            os.replace(path, path + '.1')
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(lines if lines.endswith('\n') else lines + '\n')
+
+
+def finish_run(run_id, export=True):
+    """
+    Closes a rerun: exports its records to the log file (when DRISHTI_PROFILE_LOG is set) and returns them.
+    """
+    records = get_records(run_id)
+    if export and PROFILE_ENABLED and PROFILE_LOG_PATH:
+        try:
+            export_timings(records, PROFILE_LOG_PATH)
+        except OSError:
+            # Read-only deployments still get the in-app breakdown
+            pass
+    return records
+
+
+# =============================================================================
+# IMPORT-TIME CHECK
+# app.py's top-level imports are what every fresh worker pays before the first
+# render. They are measured in a clean interpreter (python -X importtime) and
+# the heavy geospatial/ML/map libraries must not be among them: those are
+# imported inside the sections that use them.
+#
+#   python src/profiling.py imports     (exit status 1 on a regression)
+# =============================================================================
+
+APP_PATH = os.path.join(BASE_DIR, 'src', 'app.py')
+LAZY_MODULES = ('folium', 'streamlit_folium', 'geopandas', 'sklearn', 'scipy', 'shapely', 'duckdb')
+IMPORT_BUDGET_S = float(os.environ.get('DRISHTI_IMPORT_BUDGET', '5'))
+
+
+def startup_imports(path=APP_PATH):
+    """
+    Module names imported at the top level of a script (imports inside functions/sections excluded).
+    """
+    import ast
+
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure_imports(modules):
+    """
+    Imports `modules` in a fresh interpreter with -X importtime.
+    Returns (total seconds, DataFrame: package, self_s, cumulative_s) for every module loaded.
+    """
+    import subprocess
+    import sys
+
+    code = f"import sys; sys.path.insert(0, {os.path.join(BASE_DIR, 'src')!r}); " + "; ".join(
+        f"import {name}" for name in modules)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, cwd=BASE_DIR)
+    total = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, package = line[len('import time:'):].split('|', 2)
+        rows.append({'package': package.strip(), 'self_s': int(self_us) / 1e6, 'cumulative_s': int(cumulative_us) / 1e6})
+    return total, pd.DataFrame(rows, columns=['package', 'self_s', 'cumulative_s'])
+
+
+def check_startup_imports(path=APP_PATH, budget_s=IMPORT_BUDGET_S):
+    """
+    Measures the top-level imports of app.py. Returns (ok, report lines).
+    Fails when a LAZY_MODULES library is imported at startup or the total exceeds `budget_s`.
+    """
+    total, timings = measure_imports(startup_imports(path))
+    roots = timings['package'].str.split('.').str[0]
+    eager = sorted(set(roots[roots.isin(LAZY_MODULES)]))
+
+    top = timings[~timings['package'].str.contains(r'\.')].nlargest(10, 'cumulative_s')
+    lines = [f"Startup imports: {total:.2f}s (budget {budget_s:.1f}s)"]
+    lines += [f"  {row.package:<28} {row.cumulative_s:6.3f}s" for row in top.itertuples()]
+    if eager:
+        lines.append(f"Imported at startup but should be lazy: {', '.join(eager)}")
+    return not eager and total <= budget_s, lines
+
+
+if __name__ == '__main__':
+    import sys
+
+    if sys.argv[1:2] != ['imports']:
+        raise SystemExit("usage: python src/profiling.py imports")
+    ok, report = check_startup_imports()
+    print("\n".join(report))
+    raise SystemExit(0 if ok else 1)
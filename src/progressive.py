@@ -0,0 +1,187 @@
+import os
+import time
+
+import pandas as pd
+import numpy as np
+import streamlit as st
+
+from prefetch import submit, result_copy
+from profiling import timed
+from time_index import slice_dates
+
+
+# =============================================================================
+# PROGRESSIVE RENDERING
+# On a cold cache a section first draws its metric from a stratified row sample
+# (a bounded number of rows at any data size), with 95% error bounds, while the
+# exact computation runs on the prefetch pool; the chart is then redrawn in the
+# same placeholder with the exact result.
+#
+# Sample: strata are (District, State); each keeps round(f × N_h) rows, at least
+# PROGRESSIVE_MIN_PER_STRATUM (or all of them), f = PROGRESSIVE_SAMPLE_ROWS / N.
+# Count columns are expanded by N_h / n_h, so sums are unbiased. Only metrics made
+# of sums over rows (SAMPLEABLE) are estimated this way; the bounds use the
+# stratified variance of a domain total:
+#   Var(T_G) = Σ_h N_h² (1 - n_h/N_h) s²_h(y·1_G) / n_h
+#
+# Environment:
+#   DRISHTI_PROGRESSIVE=0                disable (always wait for the exact result)
+#   DRISHTI_PROGRESSIVE_ROWS=<rows>      sample size (default 50000)
+# =============================================================================
+
+PROGRESSIVE_ENABLED = os.environ.get('DRISHTI_PROGRESSIVE', '1') != '0'
+PROGRESSIVE_SAMPLE_ROWS = int(os.environ.get('DRISHTI_PROGRESSIVE_ROWS', '50000'))
+PROGRESSIVE_MIN_PER_STRATUM = 5
+STRATA = ['District', 'State']
+
+# Count columns expanded by the sampling weight
+WEIGHTED_COLS = ['Enrolment_Count', 'age_0_5', 'age_5_17', 'age_18_greater', 'Count', 'Age_5_17', 'Age_17_Plus']
+
+# metric name → (frame name, group columns, value column) used for its error bounds
+SAMPLEABLE = {
+    'get_seasonal_patterns': ('upd_full', ['Month_Num'], 'Count'),
+    'get_state_month_heatmap_data': ('upd_full', ['State', 'Month_Num'], 'Count'),
+    'analyze_age_transitions': ('upd_full', ['State'], 'Count'),
+}
+
+
+def stratified_sample(df, size=PROGRESSIVE_SAMPLE_ROWS, min_per_stratum=PROGRESSIVE_MIN_PER_STRATUM, seed=0):
+    """
+    Stratified random sample of `df` (strata: District, State) with about `size` rows.
+
+    Returns the sampled rows in their original order (date-sorted frames stay sorted) with
+    the count columns multiplied by N_h / n_h, plus `_n` (n_h), `_N` (N_h) and `_raw_<col>`
+    (unexpanded values, for the error bounds). None when the sample would be the whole frame.
+    """
+    if df.empty or len(df) <= size:
+        return None
+    strata = df.groupby(STRATA, sort=False, dropna=False).ngroup().to_numpy()
+    population = np.bincount(strata)
+    fraction = size / len(df)
+    target = np.minimum(population, np.maximum(np.round(population * fraction), min_per_stratum)).astype(np.int64)
+
+    # Rank of each row inside its stratum in a random order; the first target[h] rows are kept
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(df)), strata))
+    starts = np.r_[0, np.cumsum(population)[:-1]]
+    ranks = np.empty(len(df), dtype=np.int64)
+    ranks[order] = np.arange(len(df)) - starts[strata[order]]
+    keep = ranks < target[strata]
+
+    sample = df[keep].copy()
+    kept_strata = strata[keep]
+    sample['_n'] = target[kept_strata]
+    sample['_N'] = population[kept_strata]
+    weight = population[kept_strata] / target[kept_strata]
+    for col in WEIGHTED_COLS:
+        if col in sample.columns:
+            sample[f'_raw_{col}'] = sample[col]
+            sample[col] = sample[col] * weight
+    return sample
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+@timed
+def load_samples(dataset_version, _df_enr, _df_upd):
+    """
+    Stratified samples of the enrolment and update frames, built once per dataset version
+    and shared read-only by all sessions. {'enr': sample or None, 'upd': sample or None}.
+    """
+    return {'enr': stratified_sample(_df_enr), 'upd': stratified_sample(_df_upd)}
+
+
+def filter_samples(samples, start=None, end=None, state='All', district='All'):
+    """
+    Applies the dashboard filters to the samples, like app.py does to the frames.
+    Returns {frame name: sample} for 'enr', 'upd', 'enr_full', 'upd_full' (None = no sample).
+    """
+    frames = {}
+    for name, sample in samples.items():
+        if sample is None:
+            frames[name] = frames[f'{name}_full'] = None
+            continue
+        full = slice_dates(sample, start, end)
+        frames[f'{name}_full'] = full
+        if state != 'All':
+            full = full[full['State'] == state]
+            if district != 'All':
+                full = full[full['District'] == district]
+        frames[name] = full
+    return frames
+
+
+def error_bounds(sample, group_cols, value_col, z=1.96):
+    """
+    Estimated totals of `value_col` per group with their 95% half-width, from a stratified sample.
+    Returns DataFrame: group columns, Estimate, Margin, Relative_Margin.
+    """
+    y = sample[f'_raw_{value_col}'].to_numpy(dtype=float)
+    data = sample[STRATA].assign(_y=y, _y2=y * y, _n=sample['_n'], _N=sample['_N'])
+    if 'Month_Num' in group_cols and 'Month_Num' not in sample.columns:
+        data['Month_Num'] = sample['Date'].dt.month
+    for col in group_cols:
+        if col not in data.columns:
+            data[col] = sample[col]
+
+    # Per (stratum, group): Σy and Σy² over the sampled rows in the group (zero elsewhere in the stratum)
+    cells = data.groupby(STRATA + [col for col in group_cols if col not in STRATA], dropna=False).agg(
+        _y=('_y', 'sum'), _y2=('_y2', 'sum'), _n=('_n', 'first'), _N=('_N', 'first')).reset_index()
+    n, big_n = cells['_n'].to_numpy(dtype=float), cells['_N'].to_numpy(dtype=float)
+    mean = cells['_y'] / n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s2 = np.where(n > 1, (cells['_y2'] - n * mean * mean) / (n - 1), 0)
+    cells['_var'] = big_n * big_n * (1 - n / big_n) * np.maximum(s2, 0) / n
+    cells['Estimate'] = cells['_y'] * big_n / n
+
+    bounds = cells.groupby(group_cols)[['Estimate', '_var']].sum().reset_index()
+    bounds['Margin'] = z * np.sqrt(bounds.pop('_var'))
+    bounds['Relative_Margin'] = (bounds['Margin'] / bounds['Estimate'].where(bounds['Estimate'] > 0)).round(4)
+    return bounds
+
+
+def progressive_fetch(fn, frames, sample_frames, frame_names, view_key, render, placeholder=None):
+    """
+    Draws a metric progressively: `render(result, estimate)` is called with a sample-based
+    result (estimate = {'fraction', 'rows', 'bounds', 'relative_margin', 'seconds'}) while the
+    exact job runs, then again with the exact result (estimate=None) in the same placeholder.
+    When the exact result is already available, or the metric cannot be sampled, only the exact
+    result is drawn. Returns the exact result.
+    """
+    placeholder = placeholder or st.empty()
+    future = submit(fn, frames, frame_names, view_key)
+
+    spec = SAMPLEABLE.get(fn.__name__)
+    sampled = [sample_frames.get(name) is not None for name in frame_names]
+    if PROGRESSIVE_ENABLED and spec is not None and not future.done() and any(sampled):
+        start = time.perf_counter()
+        # Frames too small to be sampled are used whole (their part of the estimate is exact)
+        samples = [sample_frames[name] if is_sampled else frames[name] for name, is_sampled in zip(frame_names, sampled)]
+        approximate = fn(*samples)
+        bound_frame = sample_frames.get(spec[0])
+        bounds = error_bounds(bound_frame, spec[1], spec[2]) \
+            if bound_frame is not None and not bound_frame.empty else pd.DataFrame()
+        full_rows = sum(len(frames[name]) for name in frame_names)
+        estimate = {
+            'fraction': sum(len(s) for s in samples) / max(full_rows, 1),
+            'rows': sum(len(s) for s in samples),
+            'bounds': bounds,
+            'relative_margin': float(bounds['Relative_Margin'].median()) if not bounds.empty else float('nan'),
+            'seconds': time.perf_counter() - start,
+        }
+        # The exact job may have finished meanwhile; then the estimate is not worth drawing
+        if not future.done():
+            with placeholder.container():
+                render(approximate, estimate)
+
+    result = result_copy(future)
+    with placeholder.container():
+        render(result, None)
+    return result
+
+
+def estimate_caption(estimate):
+    """
+    One-line note shown under a chart drawn from the sample.
+    """
+    return (f"⏳ Estimate from a {estimate['fraction']:.1%} stratified sample ({estimate['rows']:,} rows), "
+            f"typical 95% margin ±{estimate['relative_margin']:.1%} per group; exact figures follow.")
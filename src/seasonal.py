@@ -0,0 +1,154 @@
+import pandas as pd
+import numpy as np
+import streamlit as st
+
+from panel import build_panel
+from profiling import timed
+from sketches import ALL_INDIA
+
+
+# =============================================================================
+# REGIONAL SEASONAL DECOMPOSITION
+# Monthly updates of every district and state are reshaped into one
+# unit × year × month array (calendar-aligned, NaN outside the data range) and
+# decomposed multiplicatively for all units at once:
+#   trend    = centred 2×12 moving average (needs 13 consecutive months)
+#   seasonal = mean of observed / trend per month-of-year, normalized to mean 1
+#   residual = observed / (trend × seasonal)
+# Units with less than 13 months of history have no moving-average trend; their
+# level (mean of the observed months) stands in for it, so the seasonal index is
+# each month relative to the unit's average month.
+# =============================================================================
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+SEASONAL_LEVELS = {'State': ('State',), 'District': ('District', 'State')}
+
+# Weights of the centred 2×12 moving average
+_TREND_WEIGHTS = np.r_[0.5, np.ones(11), 0.5] / 12
+
+
+def month_cube(df, value_col='Count', unit_cols=('District', 'State')):
+    """
+    Sums `value_col` into a unit × year × month array.
+
+    Returns (units, years, cube): cube has shape (n_units, n_years, 12); months inside the data
+    range without records are 0, months before the first / after the last record are NaN.
+    """
+    units, periods, values = build_panel(df, value_col, unit_cols=unit_cols, freq='M')
+    if len(units) == 0:
+        return units, np.array([], dtype=int), np.zeros((0, 0, 12))
+    lead = periods[0].month - 1
+    n_years = -(-(lead + len(periods)) // 12)
+    cube = np.full((len(units), n_years * 12), np.nan)
+    cube[:, lead:lead + len(periods)] = values
+    years = periods[0].year + np.arange(n_years)
+    return units, years, cube.reshape(len(units), n_years, 12)
+
+
+def decompose_cube(cube):
+    """
+    Multiplicative decomposition of every unit of a unit × year × month array.
+
+    Returns dict of arrays shaped like `cube`: trend, seasonal, residual; plus
+    index (n_units × 12 seasonal indices, NaN for months never observed) and
+    has_trend (n_units bool: a moving-average trend exists).
+    """
+    n_units, n_years, _ = cube.shape
+    flat = cube.reshape(n_units, n_years * 12)
+
+    trend = np.full_like(flat, np.nan)
+    if flat.shape[1] >= len(_TREND_WEIGHTS):
+        windows = np.lib.stride_tricks.sliding_window_view(flat, len(_TREND_WEIGHTS), axis=1)
+        # A window touching a month outside the data range is NaN, so the trend stays undefined there
+        trend[:, 6:flat.shape[1] - 6] = windows @ _TREND_WEIGHTS
+    has_trend = np.isfinite(trend).any(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        level = np.nanmean(flat, axis=1, keepdims=True)
+    trend = np.where(has_trend[:, None], trend, np.broadcast_to(level, flat.shape))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = np.where(trend > 0, flat / trend, np.nan).reshape(n_units, n_years, 12)
+    observed_ratio = np.isfinite(ratio)
+    counts = observed_ratio.sum(axis=1)
+    index = np.where(counts > 0, np.where(observed_ratio, ratio, 0).sum(axis=1) / np.maximum(counts, 1), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.nanmean(index, axis=1, keepdims=True)
+        index = index / np.where(scale > 0, scale, np.nan)
+
+    seasonal = np.broadcast_to(index[:, None, :], cube.shape)
+    trend = trend.reshape(cube.shape)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        residual = cube / (trend * seasonal)
+    return {'trend': trend, 'seasonal': seasonal, 'residual': residual, 'index': index, 'has_trend': has_trend}
+
+
+def _indices_frame(units, cube, parts):
+    # One row per unit: % deviation of each calendar month, peak/trough month, amplitude
+    index = parts['index']
+    frame = units.copy()
+    for month, name in enumerate(MONTH_NAMES):
+        frame[name] = ((index[:, month] - 1) * 100).round(1)
+    observed = np.isfinite(index)
+    any_observed = observed.any(axis=1)
+    peak = np.nanargmax(np.where(observed, index, -np.inf), axis=1)
+    trough = np.nanargmin(np.where(observed, index, np.inf), axis=1)
+    frame['Peak_Month'] = np.where(any_observed, np.array(MONTH_NAMES)[peak], None)
+    frame['Trough_Month'] = np.where(any_observed, np.array(MONTH_NAMES)[trough], None)
+    with np.errstate(invalid='ignore'):
+        frame['Amplitude_Pct'] = ((np.nanmax(np.where(observed, index, np.nan), axis=1) -
+                                   np.nanmin(np.where(observed, index, np.nan), axis=1)) * 100).round(1) \
+            if observed.any() else np.nan
+    frame['Months_Observed'] = np.isfinite(cube).reshape(len(units), -1).sum(axis=1)
+    frame['Method'] = np.where(parts['has_trend'], '2x12 moving average', 'Level (under 13 months)')
+    return frame
+
+
+def _components_frame(units, years, cube, parts):
+    # Long format over the observed months: unit columns, Date, Observed, Trend, Seasonal, Residual
+    n_units = len(units)
+    observed = np.isfinite(cube).reshape(n_units, -1)
+    rows, months = np.nonzero(observed)
+    dates = pd.to_datetime({'year': np.repeat(years, 12)[months], 'month': np.tile(np.arange(1, 13), len(years))[months],
+                            'day': 1})
+    frame = units.iloc[rows].reset_index(drop=True)
+    frame['Date'] = dates.to_numpy()
+    for name, values in [('Observed', cube), ('Trend', parts['trend']), ('Seasonal', parts['seasonal']),
+                         ('Residual', parts['residual'])]:
+        frame[name] = values.reshape(n_units, -1)[rows, months].round(4 if name != 'Observed' else 0)
+    return frame
+
+
+@timed
+def regional_seasonality(df_upd, value_col='Count'):
+    """
+    Seasonal indices and trend/seasonal/residual components for All India, every State and
+    every District, from one month cube per level.
+
+    Returns {level: (indices, components)} for levels 'All India', 'State', 'District':
+    - indices: unit columns, Jan..Dec (% above/below the unit's trend), Peak_Month, Trough_Month,
+      Amplitude_Pct, Months_Observed, Method
+    - components: unit columns, Date, Observed, Trend, Seasonal, Residual (observed months only)
+    """
+    results = {}
+    for level, unit_cols in SEASONAL_LEVELS.items():
+        units, years, cube = month_cube(df_upd, value_col, unit_cols)
+        parts = decompose_cube(cube)
+        results[level] = (_indices_frame(units, cube, parts), _components_frame(units, years, cube, parts))
+        if level == 'State':
+            # All India = sum of the states (they share the month range, so NaNs line up)
+            national = np.where(np.isnan(cube).all(axis=0), np.nan, np.nansum(cube, axis=0))[None] \
+                if len(units) else cube
+            national_units = pd.DataFrame({'State': [ALL_INDIA]}) if len(units) else units
+            national_parts = decompose_cube(national)
+            results[ALL_INDIA] = (_indices_frame(national_units, national, national_parts),
+                                  _components_frame(national_units, years, national, national_parts))
+    return results
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_regional_seasonality(dataset_version, date_window, _df_upd):
+    """
+    regional_seasonality cached per (dataset version, date window); the frame itself is not hashed.
+    """
+    return regional_seasonality(_df_upd)
@@ -0,0 +1,215 @@
+import pandas as pd
+import numpy as np
+
+
+# =============================================================================
+# APPROXIMATE SKETCHES
+# Fixed-size summaries that are updated chunk by chunk during ingestion and can
+# be merged across shards, chunks and states:
+# - HyperLogLog registers (one row per district) for distinct pincodes
+# - KLL compactors for quantiles of the per-record update size
+# Memory depends on the number of districts/states, not on the number of rows.
+# =============================================================================
+
+DISTINCT_PRECISION = 11      # 2^11 registers per district, ~2.3% relative error
+QUANTILE_K = 200             # KLL accuracy parameter, ~1% rank error
+ALL_INDIA = 'All India'
+
+
+def _bit_length(x):
+    # Number of significant bits of each uint64 (0 for 0), by binary search over shifts
+    x = x.copy()
+    length = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= (np.uint64(1) << np.uint64(shift))
+        length[big] += shift
+        x[big] >>= np.uint64(shift)
+    return length + (x > 0)
+
+
+class DistinctCounter:
+    """
+    HyperLogLog distinct counts per key (e.g. pincodes per (District, State)).
+    All keys share one uint8 register matrix (n_keys × 2^precision), updated in bulk.
+    """
+
+    def __init__(self, precision=DISTINCT_PRECISION):
+        self.precision = precision
+        self.keys = {}
+        self.registers = np.zeros((0, 1 << precision), dtype=np.uint8)
+
+    def _rows(self, keys):
+        # Register row of each key, appending rows for keys seen for the first time
+        new = [key for key in dict.fromkeys(keys) if key not in self.keys]
+        for key in new:
+            self.keys[key] = len(self.keys)
+        if new:
+            grown = np.zeros((len(self.keys), self.registers.shape[1]), dtype=np.uint8)
+            grown[:len(self.registers)] = self.registers
+            self.registers = grown
+        return np.array([self.keys[key] for key in keys], dtype=np.int64)
+
+    def add(self, keys, values):
+        """
+        Adds `values` (one per row) to the set of their row's key; `keys` is a DataFrame of key columns.
+        """
+        values = pd.to_numeric(pd.Series(values), errors='coerce')
+        valid = values.notna().to_numpy()
+        if not valid.any():
+            return
+        codes, uniques = pd.MultiIndex.from_frame(keys[valid]).factorize()
+        rows = self._rows(list(uniques))[codes]
+
+        hashes = pd.util.hash_array(values[valid].to_numpy(dtype=np.int64))
+        bucket = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, (rows, bucket), rank.astype(np.uint8))
+
+    def merge(self, other):
+        """
+        Adds another counter's registers (same precision) into this one.
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        rows = self._rows(list(other.keys))
+        np.maximum.at(self.registers, rows, other.registers[list(other.keys.values())])
+        return self
+
+    def estimates(self):
+        """
+        Estimated distinct count per key (array in key insertion order), with the
+        linear-counting correction for small cardinalities.
+        """
+        m = self.registers.shape[1]
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.power(2.0, -self.registers.astype(float)).sum(axis=1)
+        zeros = (self.registers == 0).sum(axis=1)
+        linear = m * np.log(m / np.maximum(zeros, 1))
+        return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+    def to_frame(self, key_names, value_name='Distinct_Est'):
+        keys = pd.DataFrame(list(self.keys), columns=key_names)
+        keys[value_name] = np.round(self.estimates()).astype(np.int64)
+        return keys
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch: level h holds items of weight 2^h; a level above its capacity is
+    sorted and every other item (random offset) is promoted, halving its size.
+    """
+
+    def __init__(self, k=QUANTILE_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                # An odd item out stays at this level so the total weight is preserved
+                keep, items = (items[-1:], items[:-1]) if len(items) % 2 else (items[:0], items)
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = keep
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.n += len(values)
+            self._compress()
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """
+        Approximate quantiles for the probabilities `qs` (NaN when the sketch is empty).
+        """
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return np.full(len(qs), np.nan)
+        weights = np.concatenate([np.full(len(items_h), 2.0 ** h) for h, items_h in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        pos = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        return items[order][np.minimum(pos, len(items) - 1)]
+
+
+class SketchSet:
+    """
+    The sketches maintained during ingestion: distinct pincodes per (District, State) over all
+    datasets, and update-size quantiles per State (plus ALL_INDIA) over the update datasets.
+    """
+
+    def __init__(self, precision=DISTINCT_PRECISION, k=QUANTILE_K):
+        self.k = k
+        self.pincodes = DistinctCounter(precision)
+        self.update_sizes = {}
+        self.rows = 0
+
+    def _sketch(self, state):
+        if state not in self.update_sizes:
+            self.update_sizes[state] = QuantileSketch(self.k, seed=len(self.update_sizes))
+        return self.update_sizes[state]
+
+    def update(self, chunk, dataset, value_cols):
+        """
+        Adds one raw shard chunk (columns state, district, pincode and `value_cols`).
+        Update size = sum of `value_cols` per record; only update datasets feed the quantiles.
+        """
+        if chunk.empty:
+            return self
+        self.rows += len(chunk)
+        self.pincodes.add(chunk[['district', 'state']], chunk['pincode'])
+        if dataset != 'enrolment':
+            sizes = chunk[value_cols].apply(pd.to_numeric, errors='coerce').fillna(0).sum(axis=1).to_numpy()
+            self._sketch(ALL_INDIA).update(sizes)
+            for state, positions in chunk.groupby('state', sort=False).indices.items():
+                self._sketch(state).update(sizes[positions])
+        return self
+
+    def merge(self, other):
+        self.pincodes.merge(other.pincodes)
+        for state, sketch in other.update_sizes.items():
+            self._sketch(state).merge(sketch)
+        self.rows += other.rows
+        return self
+
+    def distinct_pincodes(self):
+        """
+        DataFrame: District, State, Pincodes_Est (estimated active pincodes per district).
+        """
+        return self.pincodes.to_frame(['District', 'State'], 'Pincodes_Est')
+
+    def update_size_percentiles(self, qs=(0.5, 0.9, 0.99)):
+        """
+        DataFrame: State, Records, P50, P90, ... of the per-record update size.
+        """
+        rows = []
+        for state, sketch in self.update_sizes.items():
+            row = {'State': state, 'Records': sketch.n}
+            row.update({f'P{round(q * 100):g}': value for q, value in zip(qs, sketch.quantiles(qs))})
+            rows.append(row)
+        return pd.DataFrame(rows, columns=['State', 'Records'] + [f'P{round(q * 100):g}' for q in qs])
@@ -0,0 +1,107 @@
+import os
+
+import pandas as pd
+import numpy as np
+import shapely
+
+
+# =============================================================================
+# SPATIAL INDEX OVER DISTRICT POLYGONS
+# An STRtree over the GeoJSON district polygons is built once. Points (pincode
+# centroids, map clicks) are assigned to districts in bulk through the tree
+# instead of a linear scan over all geometries, and the assignments give a
+# name crosswalk for districts whose names differ from the GeoJSON.
+# =============================================================================
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PINCODE_CENTROIDS_PATH = os.path.join(BASE_DIR, 'data', 'pincode_centroids.csv')
+
+
+def build_district_index(gdf):
+    """
+    Builds an STRtree over the district polygons of a GeoDataFrame.
+    Returns a dict with the tree and the district/state name of each tree position,
+    or None when there are no geometries.
+    """
+    if gdf.empty or 'geometry' not in gdf.columns:
+        return None
+    geoms = np.asarray(gdf.geometry.values)
+    return {
+        'tree': shapely.STRtree(geoms),
+        'geoms': geoms,
+        'district': gdf['district'].to_numpy() if 'district' in gdf.columns else np.full(len(gdf), None),
+        'state': gdf['state'].to_numpy() if 'state' in gdf.columns else np.full(len(gdf), None),
+    }
+
+
+def load_pincode_centroids(path=PINCODE_CENTROIDS_PATH):
+    """
+    Loads the local pincode → centroid lookup (columns: pincode, latitude, longitude).
+    Returns an empty frame when the file is not present.
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['pincode', 'latitude', 'longitude'])
+    centroids = pd.read_csv(path, usecols=['pincode', 'latitude', 'longitude'])
+    centroids = centroids.dropna().drop_duplicates('pincode')
+    centroids['pincode'] = centroids['pincode'].astype('int64')
+    return centroids
+
+
+def locate_points(index, lon, lat):
+    """
+    Assigns each (lon, lat) point to the position of the district polygon containing it (-1 if none).
+    Bulk query: one STRtree pass for all points.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    result = np.full(len(lon), -1, dtype=np.int64)
+    if index is None or len(lon) == 0:
+        return result
+
+    pts = shapely.points(lon, lat)
+    point_idx, geom_idx = index['tree'].query(pts, predicate='within')
+    # A point on a shared border can fall in two polygons; the first match wins
+    first = np.unique(point_idx, return_index=True)[1]
+    result[point_idx[first]] = geom_idx[first]
+    return result
+
+
+def locate_district(index, lon, lat):
+    """
+    Returns (district, state) of the polygon containing a single point (e.g. a map click), or None.
+    """
+    pos = locate_points(index, [lon], [lat])[0]
+    if pos < 0:
+        return None
+    return index['district'][pos], index['state'][pos]
+
+
+def build_district_crosswalk(df, index, centroids):
+    """
+    Maps each (District, State) of the Aadhaar data to a GeoJSON district by locating its
+    pincode centroids and taking the polygon holding most of its records.
+
+    Returns DataFrame: District, State, Geo_District, Geo_State, Match_Share
+    (share of the district's located records that fell into Geo_District).
+    """
+    columns = ['District', 'State', 'Geo_District', 'Geo_State', 'Match_Share']
+    if index is None or centroids.empty or df.empty or 'pincode' not in df.columns:
+        return pd.DataFrame(columns=columns)
+
+    records = df.groupby(['District', 'State', 'pincode']).size().reset_index(name='Records')
+    records['pincode'] = pd.to_numeric(records['pincode'], errors='coerce')
+    records = records.merge(centroids, on='pincode', how='inner')
+    if records.empty:
+        return pd.DataFrame(columns=columns)
+
+    records['Geo_Pos'] = locate_points(index, records['longitude'], records['latitude'])
+    records = records[records['Geo_Pos'] >= 0]
+
+    votes = records.groupby(['District', 'State', 'Geo_Pos'])['Records'].sum().reset_index()
+    votes['Match_Share'] = votes['Records'] / votes.groupby(['District', 'State'])['Records'].transform('sum')
+    best = votes.sort_values('Records', ascending=False).drop_duplicates(['District', 'State'])
+
+    best['Geo_District'] = index['district'][best['Geo_Pos'].to_numpy()]
+    best['Geo_State'] = index['state'][best['Geo_Pos'].to_numpy()]
+    best['Match_Share'] = best['Match_Share'].round(3)
+    return best[columns].reset_index(drop=True)
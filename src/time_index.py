@@ -0,0 +1,79 @@
+import pandas as pd
+import numpy as np
+
+
+# =============================================================================
+# SORTED TIME INDEX
+# load_data parses the record date once into a 'Date' column and sorts every
+# frame by it, so a date window is two binary searches and a positional slice
+# rather than a boolean mask over the whole table.
+# =============================================================================
+
+def parse_dates(df):
+    """
+    Returns the record date for each row, reusing the 'Date' column parsed at load time.
+    Falls back to parsing 'Month' (dates like '09-03-2025').
+    """
+    if 'Date' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Date']):
+        return df['Date']
+    return pd.to_datetime(df['Month'], format='%d-%m-%Y', errors='coerce')
+
+
+def sort_by_date(df):
+    """
+    Adds the parsed 'Date' column and sorts rows by it (stable; unparseable dates last).
+    """
+    if df.empty:
+        return df
+    df['Date'] = parse_dates(df)
+    return df.sort_values('Date', kind='stable', na_position='last').reset_index(drop=True)
+
+
+def _date_values(df):
+    # Sorted datetime64 values of the rows with a valid date (NaT rows sit at the end)
+    dates = df['Date'].to_numpy()
+    return dates[:len(dates) - int(np.isnat(dates).sum())]
+
+
+def date_bounds(df):
+    """
+    Returns (first, last) record date of a date-sorted frame, or (None, None) if it has none.
+    """
+    if df.empty or 'Date' not in df.columns:
+        return None, None
+    dates = _date_values(df)
+    if len(dates) == 0:
+        return None, None
+    return pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])
+
+
+def slice_dates(df, start=None, end=None):
+    """
+    Returns the rows of a date-sorted frame with start <= Date <= end (both inclusive, either optional).
+    Uses searchsorted on the sorted 'Date' column: O(log n) to locate, plus a positional slice.
+    """
+    if df.empty or (start is None and end is None):
+        return df
+    dates = _date_values(df)
+    lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left') if start is not None else 0
+    hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side='right') if end is not None else len(dates)
+    return df.iloc[lo:hi]
+
+
+def date_window_presets(first, last):
+    """
+    Named date windows for the dashboard filter, relative to the latest record date.
+    Returns {label: (start, end)}; (None, None) means no date restriction.
+    """
+    presets = {"All Dates": (None, None)}
+    if first is None or last is None:
+        return presets
+
+    for days in (7, 30, 90):
+        presets[f"Last {days} Days"] = (last - pd.Timedelta(days=days - 1), last)
+
+    # Calendar quarters covered by the data, latest first
+    for quarter in pd.period_range(first, last, freq='Q')[::-1]:
+        presets[f"Q{quarter.quarter} {quarter.year}"] = (quarter.start_time.normalize(), quarter.end_time.normalize())
+
+    return presets
@@ -0,0 +1,85 @@
+import pandas as pd
+import numpy as np
+
+from panel import build_panel, window_sums
+
+
+# =============================================================================
+# UPDATE VELOCITY ENGINE
+# Velocity = updates per *active* reporting day, so a district that reported on a
+# single day is not ranked above districts reporting steadily over months.
+# =============================================================================
+
+VELOCITY_WINDOWS = (7, 30)
+
+
+def build_velocity_panel(df_upd):
+    """
+    District × day update counts over the full date range (reusable for any date window).
+    """
+    return build_panel(df_upd, 'Count', unit_cols=('District', 'State'), freq='D')
+
+
+def compute_velocity(units, days, counts, start=None, end=None, windows=VELOCITY_WINDOWS):
+    """
+    Computes per-district velocity statistics from a district × day panel in one vectorized pass.
+
+    - Days_Active: days with at least one update
+    - Daily_Velocity: total updates / active days
+    - Velocity_{w}d: mean daily updates over the trailing w calendar days of the window (NaN when shorter)
+    - Acceleration: change in 7-day velocity versus the preceding 7 days (updates/day per day)
+    """
+    # Slice the requested window out of the day axis (days are sorted)
+    lo = days.searchsorted(pd.Timestamp(start)) if start is not None else 0
+    hi = days.searchsorted(pd.Timestamp(end), side='right') if end is not None else len(days)
+    days = days[lo:hi]
+    counts = counts[:, lo:hi]
+
+    if counts.size == 0:
+        return pd.DataFrame(columns=['District', 'State', 'Total_Updates', 'First_Date', 'Last_Date',
+                                     'Days_Active', 'Daily_Velocity', 'Acceleration', 'Velocity_Rank'])
+
+    n_days = counts.shape[1]
+    active = counts > 0
+    has_activity = active.any(axis=1)
+    days_active = active.sum(axis=1)
+    total = counts.sum(axis=1)
+
+    first_idx = active.argmax(axis=1)
+    last_idx = n_days - 1 - active[:, ::-1].argmax(axis=1)
+
+    velocity = units.copy()
+    velocity['Total_Updates'] = total
+    velocity['First_Date'] = days.values[first_idx]
+    velocity['Last_Date'] = days.values[last_idx]
+    velocity['Days_Active'] = days_active
+    velocity['Daily_Velocity'] = np.round(total / np.maximum(days_active, 1), 2)
+
+    for w in windows:
+        # A window longer than the history has no trailing w-day rate
+        velocity[f'Velocity_{w}d'] = np.round(window_sums(counts, w)[:, -1] / w, 2) if w <= n_days else np.nan
+
+    # Acceleration: latest 7-day velocity minus the velocity of the 7 days before it
+    span = min(7, n_days)
+    rolling = window_sums(counts, span) / span
+    prev = rolling[:, max(n_days - 1 - span, 0)]
+    velocity['Acceleration'] = np.round((rolling[:, -1] - prev) / span, 3)
+
+    velocity = velocity[has_activity].reset_index(drop=True)
+    velocity['Velocity_Rank'] = velocity['Daily_Velocity'].rank(ascending=False, method='dense')
+    return velocity
+
+
+def top_k_velocity(velocity, k=20, by='Daily_Velocity', min_active_days=1):
+    """
+    Returns the k districts with the highest `by`, using a partial sort (argpartition).
+    Districts with fewer than `min_active_days` active days are not ranked.
+    """
+    eligible = velocity[velocity['Days_Active'] >= min_active_days]
+    if len(eligible) <= k:
+        return eligible.sort_values(by, ascending=False)
+
+    values = eligible[by].to_numpy()
+    top = np.argpartition(-values, k - 1)[:k]
+    top = top[np.argsort(-values[top], kind='stable')]
+    return eligible.iloc[top]
@@ -0,0 +1,230 @@
+import copy
+import os
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from data_loader import read_datasets, build_prefix_cubes, build_sketches
+from ingest import DATASET_DIRS, list_shards, dataset_fingerprint
+from kernel import add_key_codes
+from profiling import timed
+from time_index import sort_by_date
+
+
+# =============================================================================
+# LIVE SHARD WATCHER
+# A background thread polls the api_data_aadhar_* directories. New shards are
+# read on their own (deduplicated against the persistent ownership index) and
+# appended; changed or deleted shards, and new shards that sort before existing
+# ones (see ingest.deduplicate_shard), trigger a full re-read. The new dataset
+# version (frames, prefix cubes, sketches) is assembled off to the side and then
+# swapped in with a single reference assignment, so readers always see one
+# consistent version. Each State also carries the version in which its rows last
+# changed, which keys the cached metrics of State-filtered views: sessions
+# re-compute only the aggregates whose data actually changed.
+#
+# Environment:
+#   DRISHTI_WATCH=0               disable the watcher (data loads once per process)
+#   DRISHTI_WATCH_INTERVAL=<sec>  polling interval (default 30)
+# =============================================================================
+
+WATCH_ENABLED = os.environ.get('DRISHTI_WATCH', '1') != '0'
+WATCH_INTERVAL = float(os.environ.get('DRISHTI_WATCH_INTERVAL', '30'))
+
+
+def shard_files():
+    """
+    Current shard files per dataset: {dataset: {path: (size, mtime_ns)}}.
+    """
+    files = {}
+    for dataset, shard_dir in DATASET_DIRS.items():
+        files[dataset] = {}
+        for path in list_shards(shard_dir):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Deleted between listing and stat; picked up on the next poll
+                continue
+            files[dataset][path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def _version(files):
+    return dataset_fingerprint([path for paths in files.values() for path in paths])
+
+
+def _state_signatures(df_enr, df_upd):
+    # Per-State (rows, totals) used to detect which States a full re-read changed
+    parts = []
+    if not df_enr.empty:
+        parts.append(df_enr.groupby('State').agg(Enr_Rows=('Enrolment_Count', 'size'), Enr=('Enrolment_Count', 'sum')))
+    if not df_upd.empty:
+        parts.append(df_upd.groupby('State').agg(Upd_Rows=('Count', 'size'), Upd=('Count', 'sum')))
+    if not parts:
+        return {}
+    signatures = pd.concat(parts, axis=1).fillna(0)
+    return {state: tuple(row) for state, row in zip(signatures.index, signatures.itertuples(index=False))}
+
+
+class DatasetStore:
+    """
+    Holds the current dataset version. `snapshot()` returns an immutable dict:
+    version, frames (df_enr, df_upd), cubes, state_versions {State: version}, files, loaded_at.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._snapshot = None
+        self._sketches = None
+
+    def snapshot(self):
+        if self._snapshot is None:
+            self.refresh()
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self.snapshot()['version']
+
+    def state_version(self, state):
+        """
+        Version in which the rows of `state` last changed ('All' = the dataset version).
+        """
+        snapshot = self.snapshot()
+        if state in (None, 'All'):
+            return snapshot['version']
+        return snapshot['state_versions'].get(state, snapshot['version'])
+
+    def sketches(self):
+        """
+        Sketch set of the current version (built on first use, then merged forward on appends).
+        """
+        snapshot = self.snapshot()
+        with self._lock:
+            if self._sketches is not None and self._sketches[0] == snapshot['version']:
+                return self._sketches[1]
+        sketches = build_sketches({dataset: sorted(paths) for dataset, paths in snapshot['files'].items()})
+        with self._lock:
+            if self._snapshot is snapshot:
+                self._sketches = (snapshot['version'], sketches)
+        return sketches
+
+    @timed(name='watcher:refresh', kind='load')
+    def refresh(self):
+        """
+        Brings the store up to date with the shard directories. Returns True when a new version was swapped in.
+        """
+        with self._refresh_lock:
+            files = shard_files()
+            version = _version(files)
+            current = self._snapshot
+            if current is not None and current['version'] == version:
+                return False
+
+            added = self._added_shards(current, files)
+            if added is not None:
+                df_enr, df_upd, changed_states = self._append(current, added)
+            else:
+                df_enr, df_upd = read_datasets()
+                before = _state_signatures(*current['frames']) if current is not None else {}
+                after = _state_signatures(df_enr, df_upd)
+                changed_states = {state for state in set(before) | set(after) if before.get(state) != after.get(state)}
+
+            state_versions = dict(current['state_versions']) if current is not None else {}
+            state_versions.update({state: version for state in changed_states})
+            snapshot = {
+                'version': version,
+                'frames': (df_enr, df_upd),
+                'cubes': build_prefix_cubes(df_enr, df_upd),
+                'state_versions': state_versions,
+                'files': files,
+                'loaded_at': time.time(),
+            }
+            sketches = self._forward_sketches(current, added, version)
+
+            # Swap: one assignment each, readers holding the old snapshot keep a consistent view
+            with self._lock:
+                self._snapshot = snapshot
+                if sketches is not None:
+                    self._sketches = sketches
+            return True
+
+    @staticmethod
+    def _added_shards(current, files):
+        # {dataset: [new paths]} when the only change is new shards, else None (full re-read)
+        if current is None:
+            return None
+        added = {}
+        for dataset, paths in files.items():
+            old = current['files'].get(dataset, {})
+            if any(paths.get(path) != signature for path, signature in old.items()):
+                return None
+            added[dataset] = sorted(set(paths) - set(old))
+            # Keys belong to the first shard in name order: a new shard sorting before an existing
+            # one may own rows already loaded from it, so everything is re-read
+            if added[dataset] and old and added[dataset][0] < max(old):
+                return None
+        return added
+
+    @staticmethod
+    def _append(current, added):
+        new_enr, new_upd = read_datasets(only={path for paths in added.values() for path in paths})
+        df_enr, df_upd = current['frames']
+        # Codes are renumbered over the combined frame, so they stay in sorted label order
+        if not new_enr.empty:
+            df_enr = add_key_codes(sort_by_date(pd.concat([df_enr, new_enr], ignore_index=True)))
+        if not new_upd.empty:
+            df_upd = add_key_codes(sort_by_date(pd.concat([df_upd, new_upd], ignore_index=True)))
+        changed_states = set()
+        for df in (new_enr, new_upd):
+            if not df.empty:
+                changed_states.update(df['State'].unique())
+        return df_enr, df_upd, changed_states
+
+    def _forward_sketches(self, current, added, version):
+        # Sketches are mergeable: appended shards are sketched alone and merged into a copy
+        with self._lock:
+            if added is None or self._sketches is None or current is None or self._sketches[0] != current['version']:
+                return None
+            merged = copy.deepcopy(self._sketches[1])
+        return version, merged.merge(build_sketches(added))
+
+
+class ShardWatcher(threading.Thread):
+    """
+    Daemon thread refreshing a DatasetStore every `interval` seconds.
+    """
+
+    def __init__(self, store, interval=WATCH_INTERVAL):
+        super().__init__(name='drishti-shard-watcher', daemon=True)
+        self.store = store
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self.last_error = None
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.store.refresh()
+                self.last_error = None
+            except Exception as exc:  # a half-written shard must not kill the watcher
+                self.last_error = exc
+
+    def stop(self):
+        self._stop_event.set()
+
+
+@st.cache_resource
+def get_store():
+    """
+    The process-wide dataset store, loaded once and kept current by a ShardWatcher
+    (unless DRISHTI_WATCH=0).
+    """
+    store = DatasetStore()
+    store.refresh()
+    if WATCH_ENABLED:
+        ShardWatcher(store).start()
+    return store